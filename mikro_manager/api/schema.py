@@ -1,7 +1,7 @@
 from pydantic import Field, BaseModel
 from mikro.traits import Position, Representation, Omero, Stage
 from mikro.rath import MikroRath
-from typing import Tuple, Literal, Optional
+from typing import List, Tuple, Literal, Optional
 from enum import Enum
 from mikro.scalars import Store, MetricValue
 from rath.scalars import ID
@@ -249,6 +249,141 @@ class ExportDatasetFragment(BaseModel):
         frozen = True
 
 
+class ExportPositionFragment(Position, BaseModel):
+    """The relative position of a sample on a microscope stage"""
+
+    typename: Optional[Literal["Position"]] = Field(alias="__typename", exclude=True)
+    id: ID
+    name: str
+    "The name of the possition"
+    x: float
+    "pixelSize for x in microns"
+    y: float
+    "pixelSize for y in microns"
+    z: float
+    "pixelSize for z in microns"
+
+    class Config:
+        frozen = True
+
+
+class ExportOmeroFragmentTimepointsEra(BaseModel):
+    """Era(id, created_by, created_through, created_while, name, start, end, created_at)"""
+
+    typename: Optional[Literal["Era"]] = Field(alias="__typename", exclude=True)
+    name: str
+    "The name of the era"
+
+    class Config:
+        frozen = True
+
+
+class ExportOmeroFragmentTimepoints(BaseModel):
+    """The relative position of a sample on a microscope stage"""
+
+    typename: Optional[Literal["Timepoint"]] = Field(alias="__typename", exclude=True)
+    era: ExportOmeroFragmentTimepointsEra
+    delta_t: Optional[float] = Field(alias="deltaT")
+
+    class Config:
+        frozen = True
+
+
+class ExportOmeroFragmentRepresentationFileorigins(BaseModel):
+    """A file an image was converted from"""
+
+    typename: Optional[Literal["OmeroFile"]] = Field(alias="__typename", exclude=True)
+    id: ID
+    file: str
+    "The file"
+
+    class Config:
+        frozen = True
+
+
+class ExportOmeroFragmentRepresentation(Representation, BaseModel):
+    """A Representation is 5-dimensional representation of an image
+
+    Mikro stores each image as sa 5-dimensional representation. The dimensions are:
+    - t: time
+    - c: channel
+    - z: z-stack
+    - x: x-dimension
+    - y: y-dimension
+    """
+
+    typename: Optional[Literal["Representation"]] = Field(
+        alias="__typename", exclude=True
+    )
+    id: ID
+    name: Optional[str]
+    "Cleartext name"
+    store: Optional[Store]
+    file_origins: Tuple[ExportOmeroFragmentRepresentationFileorigins, ...] = Field(
+        alias="fileOrigins"
+    )
+
+    class Config:
+        frozen = True
+
+
+class ExportOmeroFragment(Omero, BaseModel):
+    """Omero is a through model that stores the real world context of an image
+
+    This means that it stores the position (corresponding to the relative displacement to
+    a stage (Both are models)), objective and other meta data of the image.
+
+    """
+
+    typename: Optional[Literal["Omero"]] = Field(alias="__typename", exclude=True)
+    timepoints: Optional[Tuple[Optional[ExportOmeroFragmentTimepoints], ...]]
+    "Associated Timepoints"
+    acquisition_date: Optional[datetime] = Field(alias="acquisitionDate")
+    representation: ExportOmeroFragmentRepresentation
+
+    class Config:
+        frozen = True
+
+
+class ExportDerivedFragmentMetrics(BaseModel):
+    """A metric of a derived image"""
+
+    typename: Optional[Literal["Metric"]] = Field(alias="__typename", exclude=True)
+    id: ID
+    key: str
+    "The Key"
+    value: Optional[MetricValue]
+    "Value"
+
+    class Config:
+        frozen = True
+
+
+class ExportDerivedFragment(Representation, BaseModel):
+    """A Representation is 5-dimensional representation of an image
+
+    Mikro stores each image as sa 5-dimensional representation. The dimensions are:
+    - t: time
+    - c: channel
+    - z: z-stack
+    - x: x-dimension
+    - y: y-dimension
+    """
+
+    typename: Optional[Literal["Representation"]] = Field(
+        alias="__typename", exclude=True
+    )
+    id: ID
+    store: Optional[Store]
+    name: Optional[str]
+    "Cleartext name"
+    metrics: Optional[Tuple[Optional[ExportDerivedFragmentMetrics], ...]]
+    "Associated metrics of this Imasge"
+
+    class Config:
+        frozen = True
+
+
 class GetExportStageQuery(BaseModel):
     stage: Optional[ExportStageFragment]
     'Get a single experiment by ID"\n    \n    Returns a single experiment by ID. If the user does not have access\n    to the experiment, an error will be raised.\n    \n    '
@@ -271,6 +406,107 @@ class GetExportDatasetQuery(BaseModel):
         document = "fragment ExportDataset on Dataset {\n  id\n  name\n  omerofiles {\n    id\n    name\n    type\n    file\n  }\n}\n\nquery GetExportDataset($id: ID!) {\n  dataset(id: $id) {\n    ...ExportDataset\n  }\n}"
 
 
+class GetExportPositionIdsQueryPositions(Position, BaseModel):
+    """The relative position of a sample on a microscope stage"""
+
+    typename: Optional[Literal["Position"]] = Field(alias="__typename", exclude=True)
+    id: ID
+
+    class Config:
+        frozen = True
+
+
+class GetExportPositionIdsQuery(BaseModel):
+    """Gets the ids of all positions of a stage"""
+
+    positions: Optional[Tuple[Optional[GetExportPositionIdsQueryPositions], ...]]
+    "All positions of a stage, ids only"
+
+    class Arguments(BaseModel):
+        id: ID
+
+    class Meta:
+        document = (
+            "query GetExportPositionIds($id: ID!) {\n  positions(stage: $id) {\n    id\n  }\n}"
+        )
+
+
+class GetExportPositionsQuery(BaseModel):
+    """Gets a page of the positions of a stage by their ids"""
+
+    positions: Optional[Tuple[Optional[ExportPositionFragment], ...]]
+    "The positions with the given ids"
+
+    class Arguments(BaseModel):
+        ids: Optional[List[Optional[ID]]] = Field(default=None)
+
+    class Meta:
+        document = (
+            "fragment ExportPosition on Position {\n  id\n  name\n  x\n  y\n  z\n}\n\n"
+            "query GetExportPositions($ids: [ID]) {\n  positions(ids: $ids) {\n"
+            "    ...ExportPosition\n  }\n}"
+        )
+
+
+class GetExportOmerosQueryPosition(Position, BaseModel):
+    """The relative position of a sample on a microscope stage"""
+
+    typename: Optional[Literal["Position"]] = Field(alias="__typename", exclude=True)
+    omeros: Optional[Tuple[Optional[ExportOmeroFragment], ...]]
+    "Associated images through Omero"
+
+    class Config:
+        frozen = True
+
+
+class GetExportOmerosQuery(BaseModel):
+    """Gets the images taken at a position"""
+
+    position: Optional[GetExportOmerosQueryPosition]
+
+    class Arguments(BaseModel):
+        id: ID
+
+    class Meta:
+        document = (
+            "fragment ExportOmero on Omero {\n  timepoints {\n    era {\n      name\n    }\n"
+            "    deltaT\n  }\n  acquisitionDate\n  representation {\n    id\n    name\n    store\n"
+            "    fileOrigins {\n      id\n      file\n    }\n  }\n}\n\n"
+            "query GetExportOmeros($id: ID!) {\n  position(id: $id) {\n    omeros {\n"
+            "      ...ExportOmero\n    }\n  }\n}"
+        )
+
+
+class GetExportDerivedQueryRepresentation(Representation, BaseModel):
+    """An image with its derived images"""
+
+    typename: Optional[Literal["Representation"]] = Field(
+        alias="__typename", exclude=True
+    )
+    derived: Optional[Tuple[Optional[ExportDerivedFragment], ...]]
+    "Derived Images from this Image"
+
+    class Config:
+        frozen = True
+
+
+class GetExportDerivedQuery(BaseModel):
+    """Gets the images derived from an image"""
+
+    representation: Optional[GetExportDerivedQueryRepresentation]
+
+    class Arguments(BaseModel):
+        id: ID
+
+    class Meta:
+        document = (
+            "fragment ExportDerived on Representation {\n  id\n  store\n  name\n  metrics {\n"
+            "    id\n    key\n    value\n  }\n}\n\nquery GetExportDerived($id: ID!) {\n"
+            "  representation(id: $id) {\n    derived(flatten: 4) {\n      ...ExportDerived\n"
+            "    }\n  }\n}"
+        )
+
+
 async def aget_export_stage(
     id: ID, rath: MikroRath = None
 ) -> Optional[ExportStageFragment]:
@@ -357,3 +593,133 @@ def get_export_dataset(
     Returns:
         Optional[ExportDatasetFragment]"""
     return execute(GetExportDatasetQuery, {"id": id}, rath=rath).dataset
+
+
+async def aget_export_position_ids(
+    id: ID, rath: MikroRath = None
+) -> Optional[List[Optional[GetExportPositionIdsQueryPositions]]]:
+    """GetExportPositionIds
+
+
+
+    Arguments:
+        id (ID): id
+        rath (mikro.rath.MikroRath, optional): The mikro rath client
+
+    Returns:
+        Optional[List[Optional[GetExportPositionIdsQueryPositions]]]"""
+    return (await aexecute(GetExportPositionIdsQuery, {"id": id}, rath=rath)).positions
+
+
+def get_export_position_ids(
+    id: ID, rath: MikroRath = None
+) -> Optional[List[Optional[GetExportPositionIdsQueryPositions]]]:
+    """GetExportPositionIds
+
+
+
+    Arguments:
+        id (ID): id
+        rath (mikro.rath.MikroRath, optional): The mikro rath client
+
+    Returns:
+        Optional[List[Optional[GetExportPositionIdsQueryPositions]]]"""
+    return execute(GetExportPositionIdsQuery, {"id": id}, rath=rath).positions
+
+
+async def aget_export_positions(
+    ids: Optional[List[Optional[ID]]] = None, rath: MikroRath = None
+) -> Optional[List[Optional[ExportPositionFragment]]]:
+    """GetExportPositions
+
+
+
+    Arguments:
+        ids (Optional[List[Optional[ID]]], optional): ids.
+        rath (mikro.rath.MikroRath, optional): The mikro rath client
+
+    Returns:
+        Optional[List[Optional[ExportPositionFragment]]]"""
+    return (await aexecute(GetExportPositionsQuery, {"ids": ids}, rath=rath)).positions
+
+
+def get_export_positions(
+    ids: Optional[List[Optional[ID]]] = None, rath: MikroRath = None
+) -> Optional[List[Optional[ExportPositionFragment]]]:
+    """GetExportPositions
+
+
+
+    Arguments:
+        ids (Optional[List[Optional[ID]]], optional): ids.
+        rath (mikro.rath.MikroRath, optional): The mikro rath client
+
+    Returns:
+        Optional[List[Optional[ExportPositionFragment]]]"""
+    return execute(GetExportPositionsQuery, {"ids": ids}, rath=rath).positions
+
+
+async def aget_export_omeros(
+    id: ID, rath: MikroRath = None
+) -> Optional[GetExportOmerosQueryPosition]:
+    """GetExportOmeros
+
+
+
+    Arguments:
+        id (ID): id
+        rath (mikro.rath.MikroRath, optional): The mikro rath client
+
+    Returns:
+        Optional[GetExportOmerosQueryPosition]"""
+    return (await aexecute(GetExportOmerosQuery, {"id": id}, rath=rath)).position
+
+
+def get_export_omeros(
+    id: ID, rath: MikroRath = None
+) -> Optional[GetExportOmerosQueryPosition]:
+    """GetExportOmeros
+
+
+
+    Arguments:
+        id (ID): id
+        rath (mikro.rath.MikroRath, optional): The mikro rath client
+
+    Returns:
+        Optional[GetExportOmerosQueryPosition]"""
+    return execute(GetExportOmerosQuery, {"id": id}, rath=rath).position
+
+
+async def aget_export_derived(
+    id: ID, rath: MikroRath = None
+) -> Optional[GetExportDerivedQueryRepresentation]:
+    """GetExportDerived
+
+
+
+    Arguments:
+        id (ID): id
+        rath (mikro.rath.MikroRath, optional): The mikro rath client
+
+    Returns:
+        Optional[GetExportDerivedQueryRepresentation]"""
+    return (
+        await aexecute(GetExportDerivedQuery, {"id": id}, rath=rath)
+    ).representation
+
+
+def get_export_derived(
+    id: ID, rath: MikroRath = None
+) -> Optional[GetExportDerivedQueryRepresentation]:
+    """GetExportDerived
+
+
+
+    Arguments:
+        id (ID): id
+        rath (mikro.rath.MikroRath, optional): The mikro rath client
+
+    Returns:
+        Optional[GetExportDerivedQueryRepresentation]"""
+    return execute(GetExportDerivedQuery, {"id": id}, rath=rath).representation
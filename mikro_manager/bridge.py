@@ -2,18 +2,58 @@ from pycromanager import Acquisition, Core, JavaObject, JavaClass
 import numpy as np
 from pycromanager import Studio
 import xarray as xr
-from mikro.api.schema import from_xarray, RepresentationFragment, ROIFragment, PositionFragment, StageFragment, create_stage, create_position, OmeroRepresentationInput, PhysicalSizeInput, ObjectiveFragment, create_objective, get_objective, create_instrument, create_stage, PlaneInput, RepresentationViewInput, create_channel, ChannelFragment
+from mikro.api.schema import from_xarray, RepresentationFragment, ROIFragment, PositionFragment, StageFragment, create_stage, create_position, OmeroRepresentationInput, PhysicalSizeInput, ObjectiveFragment, create_objective, get_objective, create_instrument, create_stage, PlaneInput, RepresentationViewInput, create_channel, ChannelFragment, get_representation
 import time
 from koil.vars import check_cancelled
-from typing import Optional, List
+from typing import Callable, Deque, Dict, Iterable, Iterator, Optional, List, Tuple, Type
+from concurrent import futures
+from concurrent.futures import Future
+from collections import deque
 import datetime
-import gc
+import functools
+import contextlib
+import json
+import os
+import logging
+import queue
+import threading
 import dask.array as da
+from .stream import PlaneStream
+from .buffers import Frame, FramePool, dtype_for_bytes_per_pixel
+from .paths import PathPlan, plan_path, serpentine_order
+from .state import HardwareState
+from .cache import FragmentCache, PositionInput, create_positions
+from .upload import UploadQueue
+from .timing import PhaseTimings
+from .focus import FocusLock, FocusLockTimeout
+from .focusmap import FocusMap
+from .moves import DeviceWaits
+from .mosaic import PyramidStore, tile_grid
+from .memory import MemoryGuard
+from .live import LiveStream, bin_frame
+from .encoding import Codec, Encoder
+from .export import export_stage
+from .roi import RoiManager
+from .channels import ChannelAxis, Interleave, channel_events
+from .spool import Spool, SpoolEntry
+from .dedupe import content_digest, plane_digest, upload_key
+
+logger = logging.getLogger(__name__)
+
+ImageProcessFn = Callable[[np.ndarray, dict], object]
 
 
 
 class AbstractAquisition(Acquisition):
-    """ Enables passing of a core object to the acquisition"""
+    """ Enables passing of a core object to the acquisition
+
+    The remote acquisition factory of a core is created once and reused by
+    every acquisition, instead of leaving a new one on the Java side per call.
+    Factories are dropped when the bridge (re)connects (see MMBridge.start),
+    so the id of a core that is gone can never map to its factory.
+    """
+
+    factories: Dict[Tuple[int, int], JavaObject] = {} # by port and core
 
     def __init__(self, *args, core=None, **kwargs):
         self.___core = core
@@ -22,8 +62,12 @@ class AbstractAquisition(Acquisition):
 
     def _create_remote_acquisition(self, **kwargs):
         core = self.___core
-        acq_factory = JavaObject("org.micromanager.remote.RemoteAcquisitionFactory",
-            port=self._port, args=[core])
+        key = (self._port, id(core))
+        if key not in AbstractAquisition.factories:
+            AbstractAquisition.factories[key] = JavaObject(
+                "org.micromanager.remote.RemoteAcquisitionFactory", port=self._port, args=[core]
+            )
+        acq_factory = AbstractAquisition.factories[key]
         show_viewer = kwargs['show_display'] == True and (kwargs['directory'] is not None and kwargs['name'] is not None)
 
         self._remote_acq = acq_factory.create_acquisition(
@@ -48,62 +92,277 @@ class MMBridge:
         self.objective_config = "Objective"
         self.channel_config = "Channel"
 
-        self.auto_focus_offsets = {} # Dict of objective name to offset
+        self.auto_focus_offsets: Dict[str, float] = {} # Dict of objective name to offset
 
         self.xy_stage_config = "XYStage"
         self.z_stage_config = "ZDrive"
         self.instrument_name_config = "So Spim"
         self.instrument_serial_config = "1234"
 
+        self.xy_stage_speed = 5000 # um/s, used to estimate travel times
+        self.xy_stage_settle_time = 0.05 # s
+        self.path_time_budget = 1.0 # s spent refining stage paths
+
         self.active_position = None
         self.active_channel = None
         self.active_objective = None
-        self.active_stage = None
+        self.active_stage: Optional[StageFragment] = None
         self.active_instrument = None
         self.started = False
-
-
-    def start(self):
-        self.core = Core()
-        self.studio = Studio()
-        self.lang = JavaClass('java.lang.System')
+        self.labels: Dict[str, str] = {} # device labels by kind (xy, z)
+
+        self.frames = FramePool(depth=4)
+        self.fast_readout = True # read raw pixels with get_image, tags only on demand
+        # the running LiveStream, for consumers in this process
+        self.live_stream: Optional[LiveStream] = None
+        self.state = HardwareState(ttl=5.0)
+        # the cached camera ROI
+        self.rois = RoiManager(on_change=lambda: self.state.invalidate("camera"))
+
+        self.objectives: FragmentCache[ObjectiveFragment] = FragmentCache(maxsize=64)
+        self.channels: FragmentCache[ChannelFragment] = FragmentCache(maxsize=64)
+        # by stage and coordinates
+        self.positions: FragmentCache[PositionFragment] = FragmentCache(maxsize=4096)
+        # the stage and positions created for a position list
+        self.position_lists: FragmentCache[
+            Tuple[StageFragment, List[PositionFragment]]
+        ] = FragmentCache(maxsize=8)
+
+        self.hardware = threading.RLock() # held while the microscope is acquiring
+        self.uploads = UploadQueue(workers=2, maxsize=4)
+        # stacks stay on disk until they are uploaded
+        self.spool = Spool(os.path.join(os.path.expanduser("~"), ".mikro_manager", "spool"))
+        self.spool_max_age = 7 * 24 * 3600 # s until interrupted acquisitions are discarded
+        self.dedupe = True # hash planes, identical images are only uploaded once
+        self.encoder = Encoder(
+            codec=Codec.ZSTD, level=3, bitshuffle=True, workers=4, preview_factors=(2, 4)
+        )
+        self.timings = PhaseTimings()
+        # devices that were commanded but might still be moving
+        self.devices = DeviceWaits(self.timings)
+        self.focus = FocusLock(self.timings, timeout=10.0) # s until a lost lock fails
+        # where the focus locked, per objective
+        self.focus_map = FocusMap(max_points=256, merge_distance=50.0)
+        self.predictive_focus = True # move the focus drive to the predicted focus before locking
+        self.acquisition_class = AbstractAquisition # runs acquisition events
+        # creates vectors for the core
+        self.vector_class = lambda: JavaObject("mmcorej.DoubleVector")
+        # collect above 70% java heap or 4 GiB RSS
+        self.memory = MemoryGuard(java_threshold=0.7, python_threshold_mb=4096)
+
+    def start(
+        self,
+        core: Optional[Core] = None,
+        studio: Optional[Studio] = None,
+        lang: Optional[JavaObject] = None,
+        runtime: Optional[JavaObject] = None,
+        acquisition_class: Optional[Type[Acquisition]] = None,
+        vector_class: Optional[Callable[[], JavaObject]] = None,
+    ) -> None:
+        """Connects to micro manager
+
+        The core, studio, java.lang.System, java.lang.Runtime, acquisition
+        class and vector class can be replaced, e.g. by the simulated
+        microscope in mikro_manager.testing.simulated.
+        """
+        self.core = core or Core()
+        self.studio = studio or Studio()
+        self.lang = lang or JavaClass('java.lang.System')
+        self.runtime = runtime or JavaClass('java.lang.Runtime').get_runtime()
+        if acquisition_class is not None:
+            self.acquisition_class = acquisition_class
+        if vector_class is not None:
+            self.vector_class = vector_class
+        # factories of a previous core are bound to it
+        AbstractAquisition.factories.clear()
+        self.state.invalidate()
+        self.labels = {}
+        self.devices.clear()
+        self.rois.attach(self.core)
+        self.focus.release()
+        self.frames.allocate(
+            self.core.get_image_height(),
+            self.core.get_image_width(),
+            dtype_for_bytes_per_pixel(self.core.get_bytes_per_pixel()),
+        )
         self.started = True
 
     def on_provide(self):
+        # fragments of a previous connection might not exist on this server
+        for cache in (self.objectives, self.channels, self.positions, self.position_lists):
+            cache.evict()
+
         self.active_instrument = create_instrument(name=self.instrument_name_config, serial_number=self.instrument_serial_config)
 
+        discarded = self.spool.discard_incomplete(max_age=self.spool_max_age)
+        if discarded:
+            age = self.spool_max_age / 3600
+            logger.info(
+                f"Discarded {len(discarded)} interrupted acquisitions older than {age:.0f} h"
+            )
 
-    def get_affine_matrix(self, zstep=1):
-        """ Gets the affine matrix of the currently active pixel size"""
+        pending, incomplete = self.spool.pending(), self.spool.incomplete()
+        if pending:
+            size = self.spool.nbytes(pending) / 2**30
+            logger.warning(
+                f"{len(pending)} acquisitions ({size:.1f} GiB) were not uploaded yet "
+                "and are uploaded again"
+            )
+        if incomplete:
+            size = self.spool.nbytes(incomplete) / 2**30
+            logger.warning(
+                f"{len(incomplete)} interrupted acquisitions ({size:.1f} GiB) "
+                f"are left in {self.spool.directory}"
+            )
+
+
+    def read_pixel_size_affine(self) -> List[float]:
+        """Reads the pixel size affine of the active pixel size config from the core"""
         a = []
         l = self.core.get_pixel_size_affine()
         for i in range(l.size()):
             a.append(l.get(i))
+        return a
+
+    def pixel_size_affine(self) -> List[float]:
+        """Gets the (cached) pixel size affine of the active pixel size config"""
+        return self.state.get("pixel_affine", self.read_pixel_size_affine)
+
+    def pixel_size_um(self) -> float:
+        """Gets the (cached) pixel size of the active pixel size config"""
+        return self.state.get("pixel_size", self.core.get_pixel_size_um)
+
+    def stage_xy(self) -> Tuple[float, float]:
+        """Gets the (cached) position of the xy stage"""
+        return self.state.get(
+            "xy", lambda: (self.core.get_x_position(), self.core.get_y_position())
+        )
+
+    def stage_z(self) -> float:
+        """Gets the (cached) position of the focus device"""
+        return self.state.get("z", self.core.get_position)
+
+    def camera_shape(self) -> Tuple[int, int]:
+        """Gets the (cached) height and width of camera images"""
+        return self.state.get(
+            "camera", lambda: (self.core.get_image_height(), self.core.get_image_width())
+        )
+
+    def ensure_crop(
+        self,
+        crop_physical_height: Optional[float] = None,
+        crop_physical_width: Optional[float] = None,
+    ) -> None:
+        """Crops the camera to a physical region around the image center
+
+        The crop is computed from the sensor size and the pixel affine. The
+        camera is only reconfigured if the crop differs from the active one;
+        without a size the camera is restored to the ROI it had before.
+
+        Args:
+            crop_physical_height (Optional[float], optional): The height of the region in um
+            crop_physical_width (Optional[float], optional): The width of the region in um
+        """
+        with self.timings.phase("roi"):
+            crop = None
+            if crop_physical_height or crop_physical_width:
+                pixel_size = self.pixel_size_um()
+                assert pixel_size, "Pixel size was not set for the active objective, please set it!"
+                crop = self.rois.crop(
+                    pixel_size,
+                    self.pixel_size_affine(),
+                    physical_height=crop_physical_height,
+                    physical_width=crop_physical_width,
+                )
+
+            self.rois.apply(crop)
+
+    def read_image(self) -> Frame:
+        """Reads the last snapped image from the core
+
+        With fast_readout only the raw pixel buffer is transferred and the
+        tags are fetched lazily, otherwise the whole tagged image is read.
+        """
+        if self.fast_readout:
+            height, width = self.camera_shape()
+            pixels = self.core.get_image()
+            if pixels.size == height * width:
+                return Frame(
+                    np.reshape(pixels, (height, width)),
+                    fetch_tags=lambda: dict(self.core.get_tagged_image().tags),
+                )
+
+            # the camera changed behind our back
+            self.state.invalidate("camera")
+
+        tagged_image = self.core.get_tagged_image()
+        return Frame(
+            np.reshape(tagged_image.pix, (tagged_image.tags["Height"], tagged_image.tags["Width"])),
+            tags=tagged_image.tags,
+        )
+
+    def current_config(self, group: str) -> str:
+        """Gets the (cached) current config of a config group"""
+        return self.state.get(f"config:{group}", lambda: self.core.get_current_config(group))
+
+    def device_label(self, kind: str) -> str:
+        """Gets the (cached) label of the xy stage ("xy") or the focus drive ("z")"""
+        if kind not in self.labels:
+            self.labels[kind] = (
+                self.core.get_xy_stage_device() if kind == "xy" else self.core.get_focus_device()
+            )
+        return self.labels[kind]
+
+    def apply_config(self, group: str, config: str, wait: bool = True) -> None:
+        """Applies a config, unless it is already the current one
+
+        Args:
+            group (str): The config group
+            config (str): The config
+            wait (bool, optional): Wait until the devices of the config arrived. Otherwise
+                they move while the next commands are issued (see DeviceWaits). Defaults to True.
+        """
+        if self.current_config(group) == config:
+            return
+
+        self.core.set_config(group, config)
+        self.devices.started(f"config:{group}", lambda: self.core.wait_for_config(group, config))
+        self.state.set(f"config:{group}", config)
+        if group == self.objective_config:
+            self.focus.disturb()
+        # config changes can switch the active pixel size config
+        self.state.invalidate("pixel_size", "pixel_affine")
+
+        if wait:
+            self.devices.settle(f"config:{group}")
+
+    def get_affine_matrix(self, zstep=1):
+        """ Gets the affine matrix of the currently active pixel size"""
+        a = list(self.pixel_size_affine())
 
         a += [0,0,zstep]
-        print(a)
+        logger.debug(f"Affine matrix {a}")
         return np.array(a).reshape(3,3)
-    
+
     def get_current_position(self) -> PositionFragment:
         """ Gets the current position of the stage"""
-        x = 0
-        y= 0
-        z = 0
-
-        x = self.core.get_x_position()
-        y = self.core.get_y_position()
-        z = self.core.get_position()
+        x, y = self.stage_xy()
+        z = self.stage_z()
 
-        print(x, y, z)
+        logger.debug(f"Current position {x} {y} {z}")
 
         if not self.active_stage:
             self.active_stage = create_stage(name="New Stage")
 
-        self.active_position = create_position(stage=self.active_stage, x=x, y=y, z=z)
+        key = (self.active_stage.id, round(x, 2), round(y, 2), round(z, 2))
+        with self.timings.phase("metadata"):
+            self.active_position = self.positions.get_or_create(
+                key, lambda: create_position(stage=self.active_stage, x=x, y=y, z=z)
+            )
 
         return self.active_position
 
-    
+
     def get_current_objective(self):
         """Get the current objective
 
@@ -112,52 +371,385 @@ class MMBridge:
         _type_
             _description_
         """
-        prop = self.core.get_current_config(self.objective_config)
-
-        try: 
-            objective = get_objective(name=prop)
-        except:
-            objective = create_objective(serial_number=f"{prop}", name=prop, magnification=60) #TODO: Read out from config
-
-        
-        self.active_objective = objective
+        prop = self.current_config(self.objective_config)
+        self.active_objective = self.objective_for(prop)
         return self.active_objective
 
     def get_current_channel(self):
         """Get the current channel"""
 
-        prop = self.core.get_current_config(self.channel_config)
-        self.active_channel = create_channel(name=f"{prop}") #TODO: Read out from config
-        return prop
-    
-    def snap_image(self, name: Optional[str] = "Snapped Image") -> RepresentationFragment:
+        prop = self.current_config(self.channel_config)
+        self.active_channel = self.channel_for(prop)
+        return self.active_channel
+
+    def objective_for(self, config: str) -> ObjectiveFragment:
+        """Gets the (cached) objective of an objective config"""
+
+        def fetch() -> ObjectiveFragment:
+            with self.timings.phase("metadata"):
+                try:
+                    return get_objective(name=config)
+                except:
+                    return create_objective(
+                        serial_number=f"{config}", name=config, magnification=60
+                    )  # TODO: Read out from config
+
+        return self.objectives.get_or_create(config, fetch)
+
+    def channel_for(self, config: str) -> ChannelFragment:
+        """Gets the (cached) channel of a channel config"""
+        def fetch() -> ChannelFragment:
+            with self.timings.phase("metadata"):
+                return create_channel(name=f"{config}") #TODO: Read out from config
+
+        return self.channels.get_or_create(config, fetch)
+
+    def submit_upload(
+        self,
+        upload: Callable[[], RepresentationFragment],
+        on_done: Optional[Callable[[], None]] = None,
+    ) -> Future:
+        """Queues an upload in the background, releasing on_done when it fails to queue"""
+
+        def timed_upload() -> RepresentationFragment:
+            with self.timings.phase("upload"):
+                return upload()
+
+        try:
+            return self.uploads.submit(timed_upload, on_done=on_done)
+        except:
+            if on_done:
+                on_done()
+            raise
+
+    def cancel_uploads(self, uploads: Iterable[Future]) -> None:
+        """Cancels queued uploads and waits for the running ones (e.g. before a cleanup)"""
+        for future in uploads:
+            future.cancel()
+        futures.wait(uploads)
+
+    def submit_preview(self, pixels: np.ndarray, name: str) -> Future:
+        """Queues the upload of a 2D preview"""
+        return self.submit_upload(
+            lambda: self.upload_xarray(xr.DataArray(pixels, dims=["y", "x"]), name=name)
+        )
+
+    def upload_xarray(
+        self, data: xr.DataArray, name: str, previews: bool = False, **kwargs
+    ) -> RepresentationFragment:
+        """Compresses and uploads an image (called in the upload threads)
+
+        Args:
+            data (xr.DataArray): The image
+            name (str): The name of the image
+            previews (bool, optional): Also upload the downsampled previews of the encoder.
+                Defaults to False.
+            **kwargs: Passed on to from_xarray
+
+        Returns:
+            RepresentationFragment: The image
+        """
+        representation = from_xarray(self.encoder.encode(data), name=name, **kwargs)
+
+        if previews:
+            for factor, preview in self.encoder.previews(data):
+                from_xarray(
+                    self.encoder.encode(preview),
+                    name=f"{name} (1:{factor})",
+                    origins=[representation],
+                )
+
+        return representation
+
+    def submit_spooled(
+        self,
+        entry: SpoolEntry,
+        shape: Tuple[int, ...],
+        dims: List[str],
+        name: str,
+        previews: bool = False,
+        omero: Optional[OmeroRepresentationInput] = None,
+        views: Optional[List[RepresentationViewInput]] = None,
+        digest: Optional[str] = None,
+    ) -> Future:
+        """Commits a spooled acquisition and queues its upload
+
+        The entry is removed from the spool once the upload succeeded, a
+        failed upload stays in the spool for resume_uploads. With the content
+        digest of the planes, an image that was uploaded before with the same
+        metadata is not uploaded again (see upload_key).
+
+        Args:
+            entry (SpoolEntry): The entry the planes were written to
+            shape (Tuple[int, ...]): The shape of the image
+            dims (List[str]): The dimensions of the image
+            name (str): The name of the image
+            previews (bool, optional): Also upload downsampled previews. Defaults to False.
+            omero (Optional[OmeroRepresentationInput], optional): The metadata of the image
+            views (Optional[List[RepresentationViewInput]], optional): The views of the image
+            digest (Optional[str], optional): The content digest of the planes (see PlaneStream)
+
+        Returns:
+            Future: Resolves to the image
+        """
+        upload = self.describe_upload(
+            shape, dims, name, previews=previews, omero=omero, views=views
+        )
+        if digest and self.dedupe:
+            upload["key"] = upload_key(digest, upload)
+        entry.commit(upload)
+        return self.submit_upload(
+            lambda: self.upload_spooled(entry, upload), on_done=lambda: self.spool.release(entry)
+        )
+
+    def describe_upload(
+        self,
+        shape: Tuple[int, ...],
+        dims: List[str],
+        name: str,
+        previews: bool = False,
+        omero: Optional[OmeroRepresentationInput] = None,
+        views: Optional[List[RepresentationViewInput]] = None,
+    ) -> dict:
+        """Gets the json serializable description of an upload (see submit_spooled)"""
+        return {
+            "name": name,
+            "shape": list(shape),
+            "dims": list(dims),
+            "previews": previews,
+            "omero": json.loads(omero.json(by_alias=True, exclude_none=True)) if omero else None,
+            "views": [
+                json.loads(view.json(by_alias=True, exclude_none=True)) for view in views or []
+            ],
+        }
+
+    def upload_once(
+        self, key: Optional[str], name: str, upload: Callable[[], RepresentationFragment]
+    ) -> RepresentationFragment:
+        """Runs an upload, unless an image was uploaded with the same upload key before
+
+        Called in the upload threads.
+
+        Args:
+            key (Optional[str]): The upload key (see upload_key), None to always upload
+            name (str): The name of the image, for logging
+            upload (Callable[[], RepresentationFragment]): Uploads the image
+
+        Returns:
+            RepresentationFragment: The uploaded, or the previously uploaded image
+        """
+        if key:
+            representation = self.uploaded(key)
+            if representation:
+                logger.info(
+                    f"{name} was uploaded before as {representation.id}, skipping the upload"
+                )
+                return representation
+
+        representation = upload()
+        if key:
+            self.spool.index.record(key, representation.id)
+        return representation
+
+    def upload_spooled(
+        self, entry: SpoolEntry, upload: Optional[dict] = None
+    ) -> RepresentationFragment:
+        """Uploads a committed spool entry and removes it from the spool (in the upload threads)
+
+        Args:
+            entry (SpoolEntry): The committed entry
+            upload (Optional[dict], optional): The description of the upload (see
+                describe_upload). Defaults to the one committed with the entry.
+
+        Returns:
+            RepresentationFragment: The uploaded image
+        """
+        description = entry.upload() if upload is None else upload
+
+        def upload_entry() -> RepresentationFragment:
+            kwargs = {}
+            if description["omero"]:
+                kwargs["omero"] = OmeroRepresentationInput(**description["omero"])
+            if description["views"]:
+                kwargs["views"] = [RepresentationViewInput(**view) for view in description["views"]]
+
+            data = entry.open().reshape(description["shape"])
+            return self.upload_xarray(
+                xr.DataArray(data, dims=description["dims"]),
+                name=description["name"],
+                previews=description["previews"],
+                **kwargs,
+            )
+
+        representation = self.upload_once(description.get("key"), description["name"], upload_entry)
+        entry.remove()
+        return representation
+
+    def upload_frame(
+        self, frame: np.ndarray, name: str, omero: Optional[OmeroRepresentationInput] = None
+    ) -> RepresentationFragment:
+        """Uploads a single plane with previews (called in the upload threads)
+
+        With dedupe the plane is hashed first, so repeated identical frames
+        (e.g. dark or calibration frames) are only uploaded once.
+        """
+        data = frame[np.newaxis]
+        key = None
+        if self.dedupe:
+            upload = self.describe_upload(
+                data.shape, ["z", "y", "x"], name, previews=True, omero=omero
+            )
+            key = upload_key(content_digest([plane_digest(frame)], data.shape, data.dtype), upload)
+
+        return self.upload_once(
+            key,
+            name,
+            lambda: self.upload_xarray(
+                xr.DataArray(data, dims=["z", "y", "x"]), name=name, previews=True, omero=omero
+            ),
+        )
+
+    def uploaded(self, key: str) -> Optional[RepresentationFragment]:
+        """Gets the image that was uploaded with an upload key, None if there is none (anymore)"""
+        id = self.spool.index.get(key)
+        if id is None:
+            return None
+
+        try:
+            with self.timings.phase("metadata"):
+                return get_representation(id)
+        except Exception:
+            # deleted on the server, or uploaded to another server
+            logger.debug(f"Representation {id} is gone, uploading again", exc_info=True)
+            self.spool.index.forget(key)
+            return None
+
+    def submit_pending(self) -> Iterator[Future]:
+        """Queues the uploads of the spooled acquisitions that were not uploaded yet
+
+        Yields:
+            Future: Resolves to an uploaded image, in spool order
+        """
+        for entry in self.spool.pending():
+            if not self.spool.claim(entry):
+                continue
+
+            logger.info(f"Resuming the upload of {entry}")
+            yield self.submit_upload(
+                functools.partial(self.upload_spooled, entry),
+                on_done=functools.partial(self.spool.release, entry),
+            )
+
+    def resume_uploads(self) -> RepresentationFragment:
+        """Resume Uploads
+
+        Uploads the acquisitions that are still spooled on this computer,
+        e.g. because the network dropped or the application crashed while
+        they were uploading. The app also resumes them when it starts.
+
+        Returns:
+            RepresentationFragment: An uploaded image
+        """
+        uploads: Deque[Future] = deque()
+        for future in self.submit_pending():
+            uploads.append(future)
+            while uploads and uploads[0].done():
+                yield uploads.popleft().result()
+
+        while uploads:
+            yield uploads.popleft().result()
+
+    def discard_incomplete(self) -> str:
+        """Discard Interrupted Acquisitions
+
+        Removes the acquisitions that were interrupted (e.g. by a crash)
+        from the spool on this computer. They can not be uploaded, and are
+        otherwise only discarded once they are older than spool_max_age.
+
+        Returns:
+            str: A summary of the discarded acquisitions
+        """
+        incomplete = self.spool.incomplete()
+        nbytes = self.spool.nbytes(incomplete)
+        discarded = self.spool.discard_incomplete()
+        return f"Discarded {len(discarded)} interrupted acquisitions ({nbytes / 2**30:.1f} GiB)"
+
+    def submit_snap(
+        self,
+        name: Optional[str] = "Snapped Image",
+        crop_physical_height: Optional[float] = None,
+        crop_physical_width: Optional[float] = None,
+    ) -> Future:
+        """Snaps an image and queues its upload
+
+        Returns:
+            Future: Resolves to the snapped image
+        """
+        with self.hardware:
+            self.ensure_crop(crop_physical_height, crop_physical_width)
+            with self.timings.phase("snap"):
+                self.core.snap_image()
+                image = self.read_image()
+
+        borrowed = contextlib.ExitStack()
+        frame = borrowed.enter_context(self.frames.copy_in(image.pixels, image.height, image.width))
+        return self.submit_upload(
+            lambda: self.upload_frame(frame, name or "Snapped Image"), on_done=borrowed.close
+        )
+
+    def snap_image(
+        self,
+        name: Optional[str] = "Snapped Image",
+        crop_physical_height: Optional[float] = None,
+        crop_physical_width: Optional[float] = None,
+    ) -> RepresentationFragment:
         """Snap Image 
         
-        Snaps an image and returns it as ne image
+        Snaps an image and returns it as ne image, optionally cropped to a
+        region around the image center
+
+        Args:
+            name (Optional[str]): The name of the image
+            crop_physical_height (Optional[float]): The height of the crop in um
+            crop_physical_width (Optional[float]): The width of the crop in um
 
         Returns
         -------
         RepresentationFragment
             The snapped image
         """
-        self.core.snap_image()
-        tagged_image = self.core.get_tagged_image()
-        image_array = np.reshape(
-                tagged_image.pix,
-                newshape=[1, tagged_image.tags["Height"], tagged_image.tags["Width"]],
-            )
-
-        return from_xarray(xr.DataArray(image_array, dims=["z", "y", "x"]), name=name )
-    
+        return self.submit_snap(
+            name, crop_physical_height=crop_physical_height, crop_physical_width=crop_physical_width
+        ).result()
 
     def move_to_position_xy(self, position: PositionFragment):
         """Moves the stage to the specified position
 
+        """
+        self.start_move_xy(position)
+        self.devices.settle(self.device_label("xy"), self.device_label("z"))
+
+    def start_move_xy(self, position: PositionFragment, objective: Optional[str] = None) -> None:
+        """Starts moving the stage to a position, without waiting
+
+        The focus drive is moved to the predicted focus as well (see preset_focus).
+
+        Args:
+            position (PositionFragment): The position to move to
+            objective (Optional[str], optional): The objective config the position is imaged with,
+                if it is about to change. Defaults to the current one.
         """
         if self.active_position == position:
             return
 
-        self.core.set_xy_position(position.x, position.y)
+        if not np.allclose(self.stage_xy(), (position.x, position.y)):
+            self.core.set_xy_position(position.x, position.y)
+            xy_stage = self.device_label("xy")
+            self.devices.started(xy_stage, lambda: self.core.wait_for_device(xy_stage))
+            self.state.invalidate("xy")
+            self.focus.disturb()
+            self.preset_focus(position.x, position.y, objective=objective)
+
         self.active_position = position
 
 
@@ -166,20 +758,79 @@ class MMBridge:
 
         """
         self.core.set_auto_focus_offset(offset)
-        self.set_auto_focusoffset
+        self.auto_focus_offsets[objective.name] = offset
+        self.focus.disturb()
 
 
 
-    def ensure_focus(self):
+    def preset_focus(self, x: float, y: float, objective: Optional[str] = None) -> None:
+        """Moves the focus drive to the predicted focus of a stage position
+
+        The focus lock then only corrects the remaining error instead of
+        searching for the focal plane. Nothing moves while the focus map knows
+        nothing about the objective.
+
+        Args:
+            x (float): The stage x position in um
+            y (float): The stage y position in um
+            objective (Optional[str], optional): The objective config to predict for. Defaults to
+                the current one.
+        """
+        if not self.predictive_focus:
+            return
+
+        z = self.focus_map.predict(objective or self.current_config(self.objective_config), x, y)
+        if z is None or abs(z - self.stage_z()) < 0.05:
+            return
+
+        logger.debug(f"Presetting the focus to {z:.2f} um")
+        self.core.set_position(z)
+        z_drive = self.device_label("z")
+        self.devices.started(z_drive, lambda: self.core.wait_for_device(z_drive))
+        self.state.set("z", z)
+
+    def record_focus(self) -> None:
+        """Records the locked focus at the current stage position in the focus map"""
         try:
-            dev = self.core.get_auto_focus_device()
-            self.core.set_property(dev, "FocusMaintenance", "On")
-            while not self.core.is_continuous_focus_locked():
-                print("Not locked, sleeping")
-                check_cancelled()
-                time.sleep(0.01)
-        except:
-            pass
+            objective = self.current_config(self.objective_config)
+            x, y = self.stage_xy()
+            self.focus_map.record(
+                objective, x, y, self.stage_z(), offset=self.auto_focus_offsets.get(objective)
+            )
+        except Exception:
+            logger.debug("Could not record the focus", exc_info=True)
+
+    def ensure_focus(self):
+        """Waits until the continuous focus is locked
+
+        Raises:
+            FocusLockTimeout: If the focus does not lock within focus.timeout
+        """
+        with self.timings.phase("focus"):
+            # the lock depends on the stage, the focus drive and the objective, not on e.g. filters
+            self.devices.settle(
+                self.device_label("xy"), self.device_label("z"), f"config:{self.objective_config}"
+            )
+
+            waited = 0.0
+            try:
+                dev = self.core.get_auto_focus_device()
+                waited = self.focus.ensure(
+                    lambda: self.core.set_property(dev, "FocusMaintenance", "On"),
+                    self.core.is_continuous_focus_locked,
+                    objective=self.current_config(self.objective_config),
+                )
+                logger.debug(f"Focus locked after {waited * 1000:.0f} ms")
+            except FocusLockTimeout:
+                raise
+            except:
+                pass
+            finally:
+                # the focus lock moves the focus device
+                self.state.invalidate("z")
+
+            if waited > 0:
+                self.record_focus()
 
 
     def detach_pfs(self):
@@ -188,6 +839,8 @@ class MMBridge:
             self.core.set_property(dev, "FocusMaintenance", "Off")
         except:
             pass
+        finally:
+            self.focus.release()
 
 
     def set_objective(self, objective: ObjectiveFragment, ensure_focus: bool = True) -> None:
@@ -197,106 +850,561 @@ class MMBridge:
         if self.active_objective == objective:
             return
 
-        self.core.set_config("Objective", objective.name)
-         
+        self.apply_config(self.objective_config, objective.name, wait=not ensure_focus)
+
         if ensure_focus:
             assert objective.name in self.auto_focus_offsets, "Please set an autofocus first before using this objective"
-       
+
             if objective.name in self.auto_focus_offsets:
                 self.core.set_auto_focus_offset(self.auto_focus_offsets[objective.name])
                 self.ensure_focus()
 
         self.active_objective = objective
 
-    def set_channel(self, channel: Optional[ChannelFragment]) -> None:
+    def set_channel(self, channel: Optional[ChannelFragment], wait: bool = True) -> None:
         """Set Channel
 
         Set the active channel"""
 
         global current_channel
-        self.core.set_config("Channel", channel.name)
+        self.apply_config(self.channel_config, channel.name, wait=wait)
         current_channel = channel
 
-    
-    def acquire_2d(self, position: Optional[PositionFragment], objective: Optional[ObjectiveFragment], channel: Optional[ChannelFragment]) -> RepresentationFragment:
+    def submit_2d(
+        self,
+        position: Optional[PositionFragment],
+        objective: Optional[ObjectiveFragment],
+        channel: Optional[ChannelFragment],
+        crop_physical_height: Optional[float] = None,
+        crop_physical_width: Optional[float] = None,
+    ) -> Future:
+        """Acquires a 2D image and queues its upload
+
+        Returns:
+            Future: Resolves to the image
+        """
+        with self.hardware:
+            position, objective, channel = self.ensure_environment(position, objective, channel)
+            self.ensure_crop(crop_physical_height, crop_physical_width)
+
+            with self.timings.phase("snap"):
+                self.core.snap_image()
+
+            pixel_size = self.pixel_size_um()
+            assert (
+                pixel_size
+            ), f"Pixel size was not set for this specific objective {objective}, please set it!"
+
+
+            t = self.get_affine_matrix()
+
+            omero = OmeroRepresentationInput(
+                        positions=[position],
+                        acquisitionDate=datetime.datetime.now(),
+                        physicalSize=PhysicalSizeInput(
+                            x=pixel_size, y=pixel_size, z=pixel_size, c=1, t=1
+                        ),
+                        affineTransformation=t,
+                        objective=objective,
+                    )
+
+
+            with self.timings.phase("snap"):
+                image = self.read_image()
+            self.core.clear_circular_buffer()
+
+        borrowed = contextlib.ExitStack()
+        frame = borrowed.enter_context(self.frames.copy_in(image.pixels, image.height, image.width))
+        return self.submit_upload(
+            lambda: self.upload_frame(frame, "Test image", omero=omero), on_done=borrowed.close
+        )
+
+    def live(
+        self, duration: float = 10.0, every: int = 1, binning: int = 1, depth: int = 8
+    ) -> RepresentationFragment:
+        """Live
+
+        Streams the camera in a continuous sequence acquisition and yields a
+        preview of the newest frame. Previews are skipped (instead of slowing
+        the camera down) while uploads are lagging behind.
+
+        Args:
+            duration (float, optional): How long to stream in s, 0 streams until cancelled.
+                Defaults to 10.
+            every (int, optional): Only preview every nth camera frame. Defaults to 1.
+            binning (int, optional): Bin previews by this factor. Defaults to 1.
+            depth (int, optional): The amount of newest frames kept in memory. Defaults to 8.
+
+        Returns:
+            RepresentationFragment: A preview frame
+        """
+        assert every >= 1, "every needs to be at least 1"
+        stream = LiveStream(self.core, self.camera_shape, depth=depth)
+        stop = threading.Event()
+        errors = []
+
+        def run() -> None:
+            try:
+                with self.hardware:
+                    self.ensure_crop()
+                    self.live_stream = stream
+                    stream.run(stop)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                self.live_stream = None
+                self.focus.disturb()
+
+        acquisition = threading.Thread(target=run, name="LiveAcquisition", daemon=True)
+        acquisition.start()
+
+        start = time.monotonic()
+        uploads: Deque[Future] = deque()
+        last = -1
+        next_preview = 0
+        try:
+            while acquisition.is_alive() and (not duration or time.monotonic() - start < duration):
+                while uploads and uploads[0].done():
+                    yield uploads.popleft().result()
+
+                check_cancelled()
+                frame = stream.wait(after=last, timeout=0.1)
+                if frame is None:
+                    continue
+
+                last = frame.index
+                if frame.index < next_preview or len(uploads) >= self.uploads.workers:
+                    continue
+
+                next_preview = frame.index + every
+
+                with self.timings.phase("live"):
+                    pixels = bin_frame(frame.pixels, binning)
+                uploads.append(self.submit_preview(pixels, f"Live {frame.index}"))
+        finally:
+            stop.set()
+            acquisition.join()
+
+        while uploads:
+            yield uploads.popleft().result()
+
+        if errors:
+            raise errors[0]
+
+    def acquire_2d(
+        self,
+        position: Optional[PositionFragment],
+        objective: Optional[ObjectiveFragment],
+        channel: Optional[ChannelFragment],
+        crop_physical_height: Optional[float] = None,
+        crop_physical_width: Optional[float] = None,
+    ) -> RepresentationFragment:
         """ Acquire 2D
 
-        Acquire a 2D image 
+        Acquire a 2D image, optionally cropped to a region around the image
+        center
 
         Args:
             position (Optional[PositionFragment]): The position to move to
             objective (Optional[ObjectiveFragment]): The objective to use
             channel (Optional[ChannelFragment]): The channel to use
+            crop_physical_height (Optional[float]): The height of the crop in um
+            crop_physical_width (Optional[float]): The width of the crop in um
 
         Returns:
             RepresentationFragment: The image
 
         """
+        return self.submit_2d(
+            position,
+            objective,
+            channel,
+            crop_physical_height=crop_physical_height,
+            crop_physical_width=crop_physical_width,
+        ).result()
 
-        position, objective, channel = self.ensure_environment(position, objective, channel)
+    def ensure_environment(self, position: Optional[PositionFragment], objective: Optional[ObjectiveFragment], channel: Optional[ChannelFragment]):
+        with self.timings.phase("environment"):
+            # independent devices are commanded first, so they move at the same time
+            if channel:
+                self.set_channel(channel, wait=False)
+            else:
+                channel = self.get_current_channel()
+
+            if position:
+                # assert current_stage.id == position.stage.id, "Position was not create in current stage, please create a new position."
+                # the focus is preset for the objective the position is imaged with
+                self.start_move_xy(position, objective=objective.name if objective else None)
+            else:
+                position = self.get_current_position()
+
+
+            if objective:
+                self.set_objective(objective)
+            else:
+                objective = self.get_current_objective()
+
+            # waits for the stage and the objective only
+            self.ensure_focus()
+            self.devices.settle()
+            return position, objective, channel
+
+    def run_events(
+        self,
+        events: List[dict],
+        image_process_fn: ImageProcessFn,
+        stop: Optional[threading.Event] = None,
+    ) -> None:
+        """Runs a list of acquisition events through the acquisition engine
 
-        self.core.snap_image()
+        Args:
+            events (List[dict]): The pycromanager acquisition events
+            image_process_fn (Callable): Called with (image, metadata) for every image
+            stop (Optional[threading.Event], optional): Aborts the acquisition when set,
+                images arriving after that are dropped
+        """
 
-        pixel_size = self.core.get_pixel_size_um()
-        assert pixel_size, f"Pixel size was not set for this specific objective {objective}, please set it!"
+        def process(image: np.ndarray, metadata: dict) -> object:
+            if stop is not None and stop.is_set():
+                return None
+            return image_process_fn(image, metadata)
 
+        finished = threading.Event()
+        watcher = None
+        try:
+            with self.timings.phase("acquisition"), self.acquisition_class(
+                core=self.core,
+                directory=None,
+                name=None,
+                show_display=False,
+                image_process_fn=process,
+            ) as acq:
+                if stop is not None:
+                    watcher = threading.Thread(
+                        target=self.abort_when,
+                        args=(acq, stop, finished),
+                        name="AcquisitionWatcher",
+                        daemon=True,
+                    )
+                    watcher.start()
+                acq.acquire(events)
+        finally:
+            finished.set()
+            if watcher is not None:
+                watcher.join()
+
+        # the acquisition engine moves hardware behind our back
+        self.state.invalidate()
+        self.active_position = None
+        self.focus.disturb()
 
-        t = self.get_affine_matrix()
-        print(t)
+        self.release_memory()
 
-        omero = OmeroRepresentationInput(
-                    positions=[position],
-                    acquisitionDate=datetime.datetime.now(),
-                    physicalSize=PhysicalSizeInput(
-                        x=pixel_size, y=pixel_size, z=pixel_size, c=1, t=1
-                    ),
-                    affineTransformation=t,
-                    objective=objective,
-                )
+    def abort_when(
+        self, acquisition: Acquisition, stop: threading.Event, finished: threading.Event
+    ) -> None:
+        """Aborts an acquisition once stop is set, unless it finished before"""
+        while not finished.wait(0.05):
+            if stop.is_set():
+                logger.info("Aborting the acquisition")
+                acquisition.abort()
+                return
 
+    def release_memory(self) -> None:
+        """Collects garbage on both sides of the bridge, if memory use is above the thresholds"""
+        with self.timings.phase("gc"):
+            self.core.clear_circular_buffer()
+            usage = self.memory.collect(self.runtime, self.lang.gc)
+            logger.debug(f"Memory {usage}")
 
-        tagged_image = self.core.get_tagged_image()
-        image_array = np.reshape(
-                tagged_image.pix,
-                newshape=[1, tagged_image.tags["Height"], tagged_image.tags["Width"]],
+
+    def can_sequence_z(self, z_stage: str, length: int) -> bool:
+        """Checks if the focus device can run a z sequence of this length in hardware"""
+        if length < 2:
+            return False
+
+        try:
+            return (
+                self.core.is_stage_sequenceable(z_stage)
+                and self.core.get_stage_sequence_max_length(z_stage) >= length
             )
+        except Exception:
+            return False
 
-        self.core.clear_circular_buffer()
 
-        return from_xarray(image_array, name="Test image", omero=omero)
+    def acquire_z_sequence(
+        self, z_stage: str, z_sequence: np.ndarray, image_process_fn: ImageProcessFn
+    ) -> None:
+        """Acquires a z stack as a single hardware sequence
 
+        Loads all z positions into the focus device and lets the camera trigger
+        through them in one sequence acquisition, instead of moving and snapping
+        plane by plane. The focus device is moved back to where it was before.
 
-    def ensure_environment(self, position: Optional[PositionFragment], objective: Optional[ObjectiveFragment], channel: Optional[ChannelFragment]):
-        if position:
-            #assert current_stage.id == position.stage.id, "Position was not create in current stage, please create a new position."
-            self.move_to(position)
-        else:
-            position = self.get_current_position()
+        Args:
+            z_stage (str): The sequenceable focus device
+            z_sequence (np.ndarray): The absolute z positions in um
+            image_process_fn (Callable): Called with (image, metadata) for every plane
+        """
+        positions = self.vector_class()
+        for z_um in z_sequence:
+            positions.add(float(z_um))
+
+        start_position = self.stage_z()
+        tick = self.timings.ticker("plane")
+        self.core.load_stage_sequence(z_stage, positions)
+        self.core.start_stage_sequence(z_stage)
+        self.core.start_sequence_acquisition(len(z_sequence), 0, True)
+
+        try:
+            index = 0
+            while index < len(z_sequence):
+                check_cancelled()
+                if self.core.get_remaining_image_count() == 0:
+                    assert (
+                        self.core.is_sequence_running()
+                    ), f"Sequence stopped after {index} of {len(z_sequence)} planes"
+                    time.sleep(0.001)
+                    continue
+
+                tagged_image = self.core.pop_next_tagged_image()
+                metadata = dict(tagged_image.tags)
+                tick(metadata.get("Exposure"))
+                metadata["Axes"] = {"subset": 0, "z": index}
+                image = np.reshape(tagged_image.pix, (metadata["Height"], metadata["Width"]))
+                image_process_fn(image, metadata)
+                index += 1
+        finally:
+            self.core.stop_sequence_acquisition()
+            self.core.stop_stage_sequence(z_stage)
+            self.core.clear_circular_buffer()
+
+            # the sequence leaves the focus device at its last position
+            self.core.set_position(z_stage, start_position)
+            self.devices.started(z_stage, lambda: self.core.wait_for_device(z_stage))
+            self.state.set("z", start_position)
+            self.focus.disturb()
+
+
+    def camera_channels(self) -> List[str]:
+        """Gets the (cached) names of the cameras read out at once (e.g. by a Multi Camera)"""
+        return self.state.get(
+            "cameras",
+            lambda: [
+                self.core.get_camera_channel_name(i)
+                for i in range(self.core.get_number_of_camera_channels())
+            ],
+        )
+
+    def can_sequence_channels(self, configs: List[str]) -> bool:
+        """Checks if the devices of the channel configs can switch in a hardware sequence"""
+
+        def read() -> bool:
+            try:
+                for config in configs:
+                    data = self.core.get_config_data(self.channel_config, config)
+                    for i in range(data.size()):
+                        setting = data.get_setting(i)
+                        device, name = setting.get_device_label(), setting.get_property_name()
+                        if not self.core.is_property_sequenceable(
+                            device, name
+                        ) or self.core.get_property_sequence_max_length(device, name) < len(
+                            configs
+                        ):
+                            return False
+                return True
+            except Exception:
+                return False
+
+        return self.state.get(f"sequenceable:{','.join(configs)}", read)
+
+    def resolve_interleave(self, configs: List[str], interleave: Interleave) -> Interleave:
+        """Resolves AUTO: per plane if the channels can be sequenced, otherwise per stack"""
+        interleave = Interleave(interleave)
+        if interleave != Interleave.AUTO:
+            return interleave
+
+        if len(configs) > 1 and self.can_sequence_channels(configs):
+            return Interleave.PLANE
+        return Interleave.STACK
+
+    def channel_views(
+        self, channels: List[ChannelFragment], axis: ChannelAxis
+    ) -> List[RepresentationViewInput]:
+        """Gets the views labelling every c index of an image with its channel"""
+        if axis.cameras:
+            channels = [self.channel_for(name) for name in axis.names()]
+
+        return [
+            RepresentationViewInput(cMin=index, cMax=index, channel=channel)
+            for index, channel in enumerate(channels)
+        ]
+
+    def submit_3d(
+        self,
+        position: Optional[PositionFragment],
+        objective: Optional[ObjectiveFragment],
+        channel: Optional[ChannelFragment],
+        z_steps: int = 2,
+        z_step: float = 0.3,
+        crop_physical_height: Optional[float] = None,
+        crop_physical_width: Optional[float] = None,
+        channels: Optional[List[ChannelFragment]] = None,
+        interleave: Interleave = Interleave.AUTO,
+    ) -> Future:
+        """Acquires a (multi-channel) 3D image stack and queues its upload
+
+        Returns:
+            Future: Resolves to the image
+        """
+        with self.hardware:
+            position, objective, channel = self.ensure_environment(
+                position, objective, channel or (channels[0] if channels else None)
+            )
+            channels = channels or [channel]
+            configs = [channel.name for channel in channels]
+            axis = ChannelAxis(configs, self.camera_channels())
+            interleave = self.resolve_interleave(configs, interleave)
+
+            pixel_size = self.pixel_size_um()
+            assert (
+                pixel_size
+            ), f"Pixel size was not set for this specific objective {objective}, please set it!"
+            assert z_steps * z_step < 100, "Unsafe for current working distqnce"
+
+
+            self.ensure_crop(crop_physical_height, crop_physical_width)
+
+            z_pixel_size = z_step
+
+            t = self.get_affine_matrix(zstep=z_pixel_size)
+            views = []
+            planes = []
+
+            # z stack parameters
+            half_size =  ( z_pixel_size * z_steps ) / 2
+            z_start = -half_size
+            z_end = half_size
+
+            z_sequence = np.linspace(z_start, z_end, z_steps)
 
+            # setup z stage
+            z_stage = self.core.get_focus_device()
+            start_position = self.stage_z()
+            z_pos = start_position
+            self.ensure_focus()
 
-        if objective:
-            self.set_objective(objective)
-        else:
-            objective = self.get_current_objective()
-            
+            # planes are spooled to disk as they arrive, once the focus is locked
+            z_count = max(len(z_sequence), 1)
+            entry = self.spool.create()
+            stream = PlaneStream(depth=len(axis) * z_count, store=entry.store, digest=self.dedupe)
 
-        if channel:
-            self.set_channel(channel)
-        else:
-            channel = self.get_current_channel()
+            # Add relative positions
+            z_sequence += z_pos
+            logger.debug(f"Z sequence {z_sequence}")
 
-        self.ensure_focus()
-        return position, objective, channel
+            views += self.channel_views(channels, axis)
 
 
-    
+            tick = self.timings.ticker("plane")
 
+            def append(image: np.ndarray, metadata: dict) -> Tuple[np.ndarray, dict]:
+                tick(metadata.get("Exposure"))
+                z = metadata.get("Axes", {}).get("z", 0)
+                c = axis.index(metadata) if len(axis) > 1 else 0
+                stream.write(c * z_count + z, image)
+                planes.append(
+                    PlaneInput(
+                        z=z,
+                        c=c,
+                        exposureTime=metadata.get("Exposure"),
+                        deltaT=metadata.get("ElapsedTime-ms"),
+                    )
+                )
+                views.append(RepresentationViewInput(zMin=z, zMax=z))
+
+                return image, metadata
+
+
+            try:
+                if len(axis) == 1 and self.can_sequence_z(z_stage, len(z_sequence)):
+                    self.acquire_z_sequence(z_stage, z_sequence, append)
+                else:
+                    # the acquisition engine merges the events into hardware sequences where it can
+                    self.run_events(
+                        channel_events(
+                            configs,
+                            z_sequence if len(z_sequence) else [z_pos],
+                            self.channel_config,
+                            interleave,
+                            axes={"subset": 0},
+                        ),
+                        append,
+                    )
+            except:
+                stream.close()
+                self.spool.release(entry)
+                raise
+
+            data = stream.to_dask()
+            data = data.reshape((len(axis), z_count, *data.shape[1:]))
+
+
+            omero = OmeroRepresentationInput(
+                    positions=[position],
+                    acquisitionDate=datetime.datetime.now(),
+                    physicalSize=PhysicalSizeInput(
+                        x=pixel_size, y=pixel_size, z=z_pixel_size, c=1, t=1
+                    ),
+                    planes=planes,
+                    affineTransformation=t,
+                    objective=objective,
+                )
+
+            # the upload runs while the hardware is reset
+            future = self.submit_spooled(
+                entry,
+                data.shape,
+                ["c", "z", "y", "x"],
+                "Test Image",
+                previews=True,
+                omero=omero,
+                views=views,
+                digest=stream.content_digest(),
+            )
 
-    def acquire_3d(self, position: Optional[PositionFragment], objective: Optional[ObjectiveFragment], channel: Optional[ChannelFragment], z_steps: int = 2, z_step: float = 0.3, crop_physical_height: Optional[float] = None, crop_physical_width: Optional[float] = None) -> RepresentationFragment:
+            # Reset z stage
+            self.core.set_position(start_position)
+            z_drive = self.device_label("z")
+            self.devices.started(z_drive, lambda: self.core.wait_for_device(z_drive))
+            self.state.invalidate("z")
+            self.focus.disturb()
+            try:
+                self.ensure_focus()
+            except FocusLockTimeout as e:
+                # the stack is already uploading, the next acquisition waits for the focus again
+                logger.warning(f"Focus did not lock again after the stack: {e}")
+            return future
+
+    def acquire_3d(
+        self,
+        position: Optional[PositionFragment],
+        objective: Optional[ObjectiveFragment],
+        channel: Optional[ChannelFragment],
+        z_steps: int = 2,
+        z_step: float = 0.3,
+        crop_physical_height: Optional[float] = None,
+        crop_physical_width: Optional[float] = None,
+        channels: Optional[List[ChannelFragment]] = None,
+        interleave: Interleave = Interleave.AUTO,
+    ) -> RepresentationFragment:
         """Acquire Stack
 
         Acquire a 3D image stack, allowing to move to a new Position, setting 
-        an Objective, and an active channel.
+        an Objective, and an active channel. With several channels all of
+        them are acquired in a single pass, interleaved per plane or per
+        stack. Cameras of a Multi Camera adapter are read out at once, every
+        camera becomes a channel of the image.
 
         Args:
             position (Optional[PositionFragment]): The position to move to
@@ -305,144 +1413,584 @@ class MMBridge:
             auto_focus_offset (Optional[int]): A temporaty autofocus offset
             z_steps (int, optional): The amount of zsteps (around midpoint). Defaults to 2.
             z_step (float, optional): The z-step to take in um. Defaults to 0.3
+            crop_physical_height (Optional[float]): The height of the crop in um
+            crop_physical_width (Optional[float]): The width of the crop in um
+            channels (Optional[List[ChannelFragment]]): The channels to acquire (instead of channel)
+            interleave (Interleave, optional): The order of channels and z planes. Defaults to auto.
 
         Returns:
             RepresentationFragment: The image
         """ 
+        return self.submit_3d(
+            position,
+            objective,
+            channel,
+            z_steps=z_steps,
+            z_step=z_step,
+            crop_physical_height=crop_physical_height,
+            crop_physical_width=crop_physical_width,
+            channels=channels,
+            interleave=interleave,
+        ).result()
+
+    def plan_path(
+        self, points: np.ndarray, refine: bool = True, time_budget: Optional[float] = None
+    ) -> PathPlan:
+        """Plans a short stage path from the current stage position through points"""
+        return plan_path(
+            points,
+            start=self.stage_xy(),
+            refine=refine,
+            time_budget=self.path_time_budget if time_budget is None else time_budget,
+            speed=self.xy_stage_speed,
+            settle_time=self.xy_stage_settle_time,
+        )
 
-        position, objective, channel = self.ensure_environment(position, objective, channel)
+    def optimize_positions(
+        self, positions: List[PositionFragment], refine: bool = True, time_budget: float = 1.0
+    ) -> Tuple[List[PositionFragment], float, float]:
+        """Optimize Positions
 
-        pixel_size = self.core.get_pixel_size_um()
-        assert pixel_size, f"Pixel size was not set for this specific objective {objective}, please set it!"
-        assert z_steps * z_step < 100, "Unsafe for current working distqnce"
+        Reorders positions to minimize the XY travel of the stage, starting from
+        where the stage currently is. The order is found greedily and then refined
+        with 2-opt within the time budget.
+
+        Args:
+            positions (List[PositionFragment]): The positions to visit
+            refine (bool, optional): Refine the greedy order with 2-opt. Defaults to True.
+            time_budget (float, optional): The maximum time to spend refining in s. Defaults to 1.0.
+
+        Returns:
+            List[PositionFragment]: The positions in travel order
+            float: The estimated travel time of the original order in s
+            float: The estimated travel time of the optimized order in s
+        """
+        points = np.array([[position.x, position.y] for position in positions], dtype=float)
+        plan = self.plan_path(points, refine=refine, time_budget=time_budget)
+        logger.info(
+            f"Travel {plan.distance_before:.0f} um ({plan.time_before:.1f} s) -> "
+            f"{plan.distance_after:.0f} um ({plan.time_after:.1f} s)"
+        )
+
+        return [positions[index] for index in plan.order], plan.time_before, plan.time_after
 
+    def acquire_multi(
+        self,
+        positions: List[PositionFragment],
+        channels: List[ChannelFragment],
+        objective: Optional[ObjectiveFragment] = None,
+        z_steps: int = 1,
+        z_step: float = 0.3,
+        serpentine: bool = False,
+        interleave: Interleave = Interleave.AUTO,
+    ) -> RepresentationFragment:
+        """Acquire Multi
 
-        width = None
-        height = None
+        Acquire a z-stack in every channel at every position within a single
+        acquisition. Positions are visited along a short stage path and every
+        position is streamed back as an image as soon as it is complete.
 
-        if crop_physical_width:
-            width =  int(crop_physical_width / pixel_size)
+        Args:
+            positions (List[PositionFragment]): The positions to visit
+            channels (List[ChannelFragment]): The channels to acquire at every position
+            objective (Optional[ObjectiveFragment]): The objective to use
+            z_steps (int, optional): The amount of zsteps (around the position). Defaults to 1.
+            z_step (float, optional): The z-step to take in um. Defaults to 0.3
+            serpentine (bool, optional): Visit positions row by row instead of nearest neighbour
+                first. Defaults to False.
+            interleave (Interleave, optional): The order of channels and z planes. Defaults to auto.
 
-        if crop_physical_height:
-            height = int(crop_physical_height / pixel_size)
+        Returns:
+            RepresentationFragment: The image of one position
+        """
+        assert positions, "Please provide at least one position"
+        assert channels, "Please provide at least one channel"
+        assert z_steps * z_step < 100, "Unsafe for current working distqnce"
 
-        if width or height:
-            camera_width = self.core.get_image_width()
-            camera_height = self.core.get_image_width()
-            assert height is None or height <= camera_height, f"Cannot acquire a roi of {crop_physical_height} µm height with this camera. The field of with this camera and objective is to small"
-            assert width is None or  width <= camera_width, f"Cannot acquire a roi of {crop_physical_width} µm width with this camera. The field of with this camera and objective is to small"
+        with self.hardware:
+            if objective:
+                self.set_objective(objective)
+            else:
+                objective = self.get_current_objective()
+            self.ensure_crop()
+
+            pixel_size = self.pixel_size_um()
+            assert (
+                pixel_size
+            ), f"Pixel size was not set for this specific objective {objective}, please set it!"
+
+            t = self.get_affine_matrix(zstep=z_step)
+
+            points = np.array([[position.x, position.y] for position in positions], dtype=float)
+            if serpentine:
+                order = serpentine_order(points)
+            else:
+                order = self.plan_path(points).order
+
+            configs = [channel.name for channel in channels]
+            axis = ChannelAxis(configs, self.camera_channels())
+            interleave = self.resolve_interleave(configs, interleave)
+            views = self.channel_views(channels, axis)
+            # positions without a focus drive entry keep the current focus
+            z_pos = self.stage_z()
+
+        half_size = (z_step * z_steps) / 2
+        z_offsets = np.linspace(-half_size, half_size, z_steps) if z_steps > 1 else np.zeros(1)
+
+        entries = {index: self.spool.create() for index in order}
+        streams = {
+            index: PlaneStream(
+                depth=len(axis) * len(z_offsets), store=entries[index].store, digest=self.dedupe
+            )
+            for index in order
+        }
+        planes: Dict[int, List[PlaneInput]] = {index: [] for index in order}
+        finished: queue.Queue[Optional[int]] = queue.Queue()
+        stop = threading.Event()
+        errors = []
+
+        events = []
+        for index in order:
+            position = positions[index]
+            z = position.z if position.z is not None else z_pos
+            events += channel_events(
+                configs,
+                z + z_offsets,
+                self.channel_config,
+                interleave,
+                axes={"position": index},
+                x=position.x,
+                y=position.y,
+            )
 
-            height = height or camera_height
-            width = width or camera_width
-            top_left_y = (camera_height - height ) // 2
-            top_left_x = (camera_width - width) // 2
+        tick = self.timings.ticker("plane")
+
+        def append(image: np.ndarray, metadata: dict) -> Tuple[np.ndarray, dict]:
+            tick(metadata.get("Exposure"))
+            axes = metadata.get("Axes", {})
+            position_index = axes["position"]
+            c = axis.index(metadata)
+            z = axes.get("z", 0)
+
+            stream = streams[position_index]
+            stream.write(c * len(z_offsets) + z, image)
+            planes[position_index].append(
+                PlaneInput(
+                    z=z,
+                    c=c,
+                    exposureTime=metadata.get("Exposure"),
+                    deltaT=metadata.get("ElapsedTime-ms"),
+                )
+            )
+            if stream.complete:
+                finished.put(position_index)
 
-            self.core.set_roi(top_left_x, top_left_y, width, height)
+            return image, metadata
 
+        def run() -> None:
+            try:
+                with self.hardware:
+                    self.run_events(events, append, stop=stop)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                finished.put(None)
 
+        acquisition = threading.Thread(target=run, name="MultiAcquisition", daemon=True)
+        acquisition.start()
 
+        uploads: Deque[Future] = deque()
+        try:
+            while True:
+                # images are yielded in acquisition order, as soon as their upload is done
+                while uploads and uploads[0].done():
+                    yield uploads.popleft().result()
+
+                try:
+                    position_index = finished.get(timeout=0.1)
+                except queue.Empty:
+                    check_cancelled()
+                    continue
+
+                if position_index is None:
+                    break
+
+                stream = streams.pop(position_index)
+                data = stream.to_dask()
+                data = data.reshape((len(axis), len(z_offsets), *data.shape[1:]))
+
+                omero = OmeroRepresentationInput(
+                    positions=[positions[position_index]],
+                    acquisitionDate=datetime.datetime.now(),
+                    physicalSize=PhysicalSizeInput(
+                        x=pixel_size, y=pixel_size, z=z_step, c=1, t=1
+                    ),
+                    planes=planes.pop(position_index),
+                    affineTransformation=t,
+                    objective=objective,
+                )
+                uploads.append(
+                    self.submit_spooled(
+                        entries.pop(position_index),
+                        data.shape,
+                        ["c", "z", "y", "x"],
+                        f"Position {position_index}",
+                        omero=omero,
+                        views=views,
+                        digest=stream.content_digest(),
+                    )
+                )
 
+            acquisition.join()
+            while uploads:
+                yield uploads.popleft().result()
+        finally:
+            # a closed or cancelled generator stops the microscope before its streams are removed
+            stop.set()
+            acquisition.join()
+
+            # positions that were not acquired completely are dropped from the spool
+            for stream in streams.values():
+                stream.close()
+            for entry in entries.values():
+                self.spool.release(entry)
+
+        if errors:
+            raise errors[0]
+
+    def acquire_mosaic(
+        self,
+        width: float,
+        height: float,
+        objective: Optional[ObjectiveFragment] = None,
+        channel: Optional[ChannelFragment] = None,
+        overlap: float = 0.1,
+    ) -> RepresentationFragment:
+        """Acquire Mosaic
+
+        Acquire a tiled mosaic of a region around the current stage position.
+        Tiles are scanned row by row in alternating directions and stitched into
+        a multi-resolution pyramid while the scan is running. A downsampled
+        preview is streamed after every row, the full resolution mosaic last.
 
-        z_pixel_size = z_step
+        Args:
+            width (float): The width of the region in um
+            height (float): The height of the region in um
+            objective (Optional[ObjectiveFragment]): The objective to use
+            channel (Optional[ChannelFragment]): The channel to use
+            overlap (float, optional): The overlap of neighbouring tiles. Defaults to 0.1.
 
-        t = self.get_affine_matrix(zstep=z_pixel_size)
-        images = []
-        views = []
-        planes = []
+        Returns:
+            RepresentationFragment: A preview, or the full mosaic
+        """
+        with self.hardware:
+            position, objective, channel = self.ensure_environment(None, objective, channel)
+            self.ensure_crop()
+
+            pixel_size = self.pixel_size_um()
+            assert (
+                pixel_size
+            ), f"Pixel size was not set for this specific objective {objective}, please set it!"
+
+            tile_height, tile_width = self.camera_shape()
+            grid = tile_grid(
+                width,
+                height,
+                tile_height=tile_height,
+                tile_width=tile_width,
+                pixel_size=pixel_size,
+                center=(position.x, position.y),
+                affine=self.pixel_size_affine(),
+                overlap=overlap,
+            )
+            dtype = dtype_for_bytes_per_pixel(self.core.get_bytes_per_pixel())
+            t = self.get_affine_matrix()
+
+        logger.info(f"Mosaic of {grid.rows}x{grid.columns} tiles ({grid.height}x{grid.width} px)")
+        pyramid = PyramidStore(grid.height, grid.width, dtype)
+        submitted = False  # the mosaic upload closes the pyramid once it is done
+        tiles_left = {row: grid.columns for row in range(grid.rows)}
+        finished: queue.Queue[Optional[int]] = queue.Queue()
+        stop = threading.Event()
+        errors = []
+
+        events = [
+            {
+                "axes": {"tile": tile.index},
+                "x": tile.x,
+                "y": tile.y,
+            }
+            for tile in grid.tiles
+        ]
+
+        tick = self.timings.ticker("plane")
+
+        def append(image: np.ndarray, metadata: dict) -> Tuple[np.ndarray, dict]:
+            tick(metadata.get("Exposure"))
+            tile = grid.tiles[metadata.get("Axes", {})["tile"]]
+            with self.timings.phase("stitch"):
+                pyramid.write(tile.top, tile.left, image)
+
+            tiles_left[tile.row] -= 1
+            if tiles_left[tile.row] == 0:
+                finished.put(tile.row)
 
-        # z stack parameters
-        half_size =  ( z_pixel_size * z_steps ) / 2
-        z_start = -half_size
-        z_end = half_size
+            return image, metadata
 
-        z_sequence = np.linspace(z_start, z_end, z_steps)
-        print(z_sequence)
+        def run() -> None:
+            try:
+                with self.hardware:
+                    self.run_events(events, append, stop=stop)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                finished.put(None)
 
+        acquisition = threading.Thread(target=run, name="MosaicAcquisition", daemon=True)
+        acquisition.start()
 
+        uploads: Deque[Future] = deque()
+        try:
+            while True:
+                while uploads and uploads[0].done():
+                    yield uploads.popleft().result()
 
-        # setup z stage
-        z_stage = self.core.get_focus_device()
-        start_position = self.core.get_position(z_stage)
-        z_pos = self.core.get_position(z_stage)
-        self.ensure_focus()
+                try:
+                    row = finished.get(timeout=0.1)
+                except queue.Empty:
+                    check_cancelled()
+                    continue
 
-        # Add relative positions
-        z_sequence += z_pos
-        print(z_sequence)
+                if row is None:
+                    break
 
-        views.append(RepresentationViewInput(cMin=0, cMax=0, channel=current_channel))
+                name = f"Mosaic preview ({row + 1}/{grid.rows} rows)"
+                uploads.append(self.submit_preview(pyramid.preview(), name))
 
+            acquisition.join()
+            if errors:
+                raise errors[0]
 
-        self.acquire_2d()
+            omero = OmeroRepresentationInput(
+                positions=[position],
+                acquisitionDate=datetime.datetime.now(),
+                physicalSize=PhysicalSizeInput(
+                    x=pixel_size, y=pixel_size, z=pixel_size, c=1, t=1
+                ),
+                affineTransformation=t,
+                objective=objective,
+            )
+            views = [RepresentationViewInput(cMin=0, cMax=0, channel=channel)]
+            data = pyramid.to_dask(0)
+            uploads.append(
+                self.submit_upload(
+                    lambda: self.upload_xarray(
+                        xr.DataArray(data, dims=["y", "x"]), name="Mosaic", omero=omero, views=views
+                    ),
+                    on_done=pyramid.close,
+                )
+            )
+            submitted = True
+
+            while uploads:
+                yield uploads.popleft().result()
+        finally:
+            # a closed or cancelled generator stops the scan before the pyramid is removed
+            stop.set()
+            acquisition.join()
+            self.cancel_uploads(uploads)
+            if not submitted:
+                pyramid.close()
+
+    def acquire_timelapse(
+        self,
+        timepoints: int,
+        interval: float,
+        position: Optional[PositionFragment] = None,
+        objective: Optional[ObjectiveFragment] = None,
+        channel: Optional[ChannelFragment] = None,
+        z_steps: int = 1,
+        z_step: float = 0.3,
+        previews: int = 4,
+    ) -> RepresentationFragment:
+        """Acquire Timelapse
+
+        Acquire a (z-stack) time series within a single acquisition. The
+        environment is set up once, timepoints are scheduled relative to the
+        start of the acquisition (so they do not drift) and a binned preview
+        of the middle plane of every timepoint is streamed back as soon as the
+        timepoint is complete. The series is spooled to disk while it is
+        acquired and uploaded once as one image at the end, a failed upload
+        is retried by resume_uploads.
 
-        def append(image, metadata):
-            print(image, metadata)
-            images.append(image)
-            planes.append(PlaneInput(z=metadata.get("Axes", {}).get("z", 0), exposureTime=metadata.get("Exposure"), deltaT=metadata.get("ElapsedTime-ms")))
-            views.append(RepresentationViewInput(zMin=metadata.get("Axes", {}).get("z", 0), zMax=metadata.get("Axes", {}).get("z", 0)))
+        Args:
+            timepoints (int): The amount of timepoints
+            interval (float): The interval between timepoints in s
+            position (Optional[PositionFragment]): The position to move to
+            objective (Optional[ObjectiveFragment]): The objective to use
+            channel (Optional[ChannelFragment]): The channel to use
+            z_steps (int, optional): The amount of zsteps (around midpoint). Defaults to 1.
+            z_step (float, optional): The z-step to take in um. Defaults to 0.3
+            previews (int, optional): Stream a preview of every timepoint binned by this factor,
+                0 for none. Defaults to 4.
 
-            return image, metadata
+        Returns:
+            RepresentationFragment: A preview, or the whole time series
+        """
+        assert timepoints > 0, "Please acquire at least one timepoint"
+        assert interval >= 0, "The interval cannot be negative"
+        assert z_steps * z_step < 100, "Unsafe for current working distqnce"
 
+        with self.hardware:
+            position, objective, channel = self.ensure_environment(position, objective, channel)
+            self.ensure_crop()
 
-        with AbstractAquisition(core=self.core, directory=None, name=None,
-                        show_display=False,
-                        image_process_fn = append) as acq:
-            events = []
-            for index, z_um in enumerate(z_sequence):
+            pixel_size = self.pixel_size_um()
+            assert (
+                pixel_size
+            ), f"Pixel size was not set for this specific objective {objective}, please set it!"
+
+            t = self.get_affine_matrix(zstep=z_step)
+            z_pos = self.stage_z()
+
+        half_size = (z_step * z_steps) / 2
+        z_sequence = z_pos + (
+            np.linspace(-half_size, half_size, z_steps) if z_steps > 1 else np.zeros(1)
+        )
+        depth = len(z_sequence)
+
+        # the series is spooled to disk as it arrives
+        entry = self.spool.create()
+        stream = PlaneStream(depth=timepoints * depth, store=entry.store, digest=self.dedupe)
+        committed = False
+        planes_left = {timepoint: depth for timepoint in range(timepoints)}
+        planes: Dict[int, List[PlaneInput]] = {timepoint: [] for timepoint in range(timepoints)}
+        finished: queue.Queue[Optional[int]] = queue.Queue()
+        stop = threading.Event()
+        errors = []
+
+        events = []
+        for index in range(timepoints):
+            for z_index, z_um in enumerate(z_sequence):
                 events.append(
                     {
-                        "axes": {"subset": 0, "z": index},
+                        "axes": {"time": index, "z": z_index},
                         "z": z_um,
+                        "min_start_time": index * interval,
                     }
                 )
-            
-            acq.acquire(events if events else [{
-                        "axes": {"subset": 0, "z": 0},
-                        "z": z_pos,
-                    }])
-            
-
-        # Memory Leak prevention (pycromanager leaks memory, this at least partially remedies it)
-        del acq
-        gc.collect()
-        self.lang.gc()
-        self.core.clear_circular_buffer()
-
-        # Reset ROI
-        if width or height:
-            self.core.clear_roi()
-
-
-        # Reset z stage
-        self.core.set_position(start_position)
-        self.ensure_focus()
-        data = da.stack(
-            images, axis=0
-        )
 
+        tick = self.timings.ticker("plane")
+
+        def append(image: np.ndarray, metadata: dict) -> Tuple[np.ndarray, dict]:
+            tick(metadata.get("Exposure"))
+            axes = metadata.get("Axes", {})
+            timepoint = axes["time"]
+            z = axes.get("z", 0)
+
+            stream.write(timepoint * depth + z, image)
+            planes[timepoint].append(
+                PlaneInput(
+                    z=z,
+                    t=timepoint,
+                    exposureTime=metadata.get("Exposure"),
+                    deltaT=metadata.get("ElapsedTime-ms"),
+                )
+            )
+            planes_left[timepoint] -= 1
+            if planes_left[timepoint] == 0:
+                finished.put(timepoint)
+
+            return image, metadata
 
-        omero = OmeroRepresentationInput(
+        def run() -> None:
+            try:
+                with self.hardware:
+                    self.run_events(events, append, stop=stop)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                finished.put(None)
+
+        def omero_for(planes: List[PlaneInput]) -> OmeroRepresentationInput:
+            return OmeroRepresentationInput(
                 positions=[position],
                 acquisitionDate=datetime.datetime.now(),
                 physicalSize=PhysicalSizeInput(
-                    x=pixel_size, y=pixel_size, z=z_pixel_size, c=1, t=1
+                    x=pixel_size, y=pixel_size, z=z_step, c=1, t=interval * 1000
                 ),
                 planes=planes,
                 affineTransformation=t,
                 objective=objective,
             )
 
-        return from_xarray(xr.DataArray(data, dims=["z", "y", "x"]), name="Test Image", omero=omero, views=views)
+        views = [RepresentationViewInput(cMin=0, cMax=0, channel=channel)]
+
+        acquisition = threading.Thread(target=run, name="TimelapseAcquisition", daemon=True)
+        acquisition.start()
+
+        uploads: Deque[Future] = deque()
+        try:
+            while True:
+                while uploads and uploads[0].done():
+                    yield uploads.popleft().result()
+
+                try:
+                    timepoint = finished.get(timeout=0.1)
+                except queue.Empty:
+                    check_cancelled()
+                    continue
+
+                if timepoint is None:
+                    break
+
+                if previews and len(uploads) < self.uploads.workers:
+                    # previews are skipped while uploads are lagging behind
+                    with self.timings.phase("preview"):
+                        pixels = bin_frame(
+                            np.asarray(stream.to_dask()[timepoint * depth + depth // 2]), previews
+                        )
+                    uploads.append(self.submit_preview(pixels, f"Timepoint {timepoint} (preview)"))
+
+            acquisition.join()
+            if errors:
+                raise errors[0]
+
+            series = stream.to_dask()
+            data = series.reshape((timepoints, depth, *series.shape[1:]))
+            omero = omero_for(
+                [plane for timepoint in range(timepoints) for plane in planes[timepoint]]
+            )
+            uploads.append(
+                self.submit_spooled(
+                    entry,
+                    data.shape,
+                    ["t", "z", "y", "x"],
+                    "Timelapse",
+                    omero=omero,
+                    views=views,
+                    digest=stream.content_digest(),
+                )
+            )
+            committed = True
+
+            while uploads:
+                yield uploads.popleft().result()
+        finally:
+            # a closed or cancelled generator stops the acquisition before the stream is removed
+            stop.set()
+            acquisition.join()
+            self.cancel_uploads(uploads)
+            if not committed:
+                stream.close()
+                self.spool.release(entry)
 
-    
     def retrieve_positions(self) -> List[PositionFragment]:
         """Retrieve Positions
 
         retrieves positions within a stage context established
         right here
         """
-        self.active_stage = create_stage(name="Latest Stage",  tags=["default"], instrument=self.active_instrument) 
-
         pm = self.studio.positions()
         pos_list = pm.get_position_list()
         positions = []
@@ -459,15 +2007,24 @@ class MMBridge:
             for ipos in range (pos.size()):
                 stage_pos = pos.get(ipos)
                 name = stage_pos.get_stage_device_label()
-                if name == "XYStage":
+                if name == self.xy_stage_config:
                     x = stage_pos.x
                     y = stage_pos.y
-                if name == "ZDrive":
+                if name == self.z_stage_config:
                     z = stage_pos.x
-            
-            positions.append(create_position(self.active_stage, x, y, z, name=pos_name))
 
-        return positions
+            positions.append(PositionInput(x=x, y=y, z=z, name=pos_name))
+
+        def create() -> Tuple[StageFragment, List[PositionFragment]]:
+            stage = create_stage(
+                name="Latest Stage", tags=["default"], instrument=self.active_instrument
+            )
+            with self.timings.phase("metadata"):
+                return stage, create_positions(stage, positions)
+
+        # an unchanged position list maps to the stage created for it before
+        self.active_stage, created = self.position_lists.get_or_create(tuple(positions), create)
+        return created
 
     def retrieve_objectives(self) -> List[ObjectiveFragment]:
         """MM Retrieve Objectives
@@ -479,10 +2036,10 @@ class MMBridge:
         objectives = []
 
         for i in range(t.size()):
-            objectives.append(create_objective(serial_number=f"mmm:{t.get(i)}", name=t.get(i), magnification=60))
+            objectives.append(self.objective_for(t.get(i)))
 
         return objectives
-    
+
     def retrieve_channels(self) -> List[ChannelFragment]:
         """MM Retrieve Channels
 
@@ -493,4 +2050,50 @@ class MMBridge:
         channels = []
 
         for i in range(t.size()):
-            channels.append(create_channel(name=t.get(i)))
+            channels.append(self.channel_for(t.get(i)))
+
+        return channels
+
+    def export_stage(self, stage: StageFragment, directory: str, concurrency: int = 8) -> str:
+        """Export Stage
+
+        Downloads every image (with its derived images) and every original
+        file of a stage into a directory on this computer. Downloads run
+        concurrently and are verified. Objects that were exported into the
+        directory before are skipped, so an interrupted export can be rerun.
+
+        Args:
+            stage (StageFragment): The stage to export
+            directory (str): The export directory
+            concurrency (int, optional): The maximum number of downloads in flight. Defaults to 8.
+
+        Returns:
+            str: A summary of the export
+        """
+        report = export_stage(stage.id, directory, concurrency=concurrency)
+        return (
+            f"Exported {report.exported} objects ({report.bytes / 2**20:.1f} MiB), "
+            f"skipped {report.skipped}, failed {report.failed} into {report.directory}"
+        )
+
+    def acquisition_timings(self, reset: bool = False, histograms: bool = True) -> str:
+        """Acquisition Timings
+
+        Reports where acquisitions spend their time: count, mean, median,
+        95th percentile and maximum wall time (in ms) of every acquisition
+        phase (environment, focus, roi, snap, plane, stitch, acquisition, gc,
+        metadata, upload) and the focus lock time of every objective, with a
+        histogram of every phase. The time between planes is split into the
+        exposure and the readout (everything else, e.g. transfer and moves).
+
+        Args:
+            reset (bool, optional): Reset the statistics after reporting. Defaults to False.
+            histograms (bool, optional): Add the histogram of every phase. Defaults to True.
+
+        Returns:
+            str: The timing report
+        """
+        report = self.timings.report(histograms=histograms)
+        if reset:
+            self.timings.reset()
+        return report
@@ -0,0 +1,135 @@
+"""Preallocated frame buffers for snapped images"""
+import contextlib
+import logging
+import threading
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+FrameKey = Tuple[int, int, np.dtype]
+
+
+def dtype_for_bytes_per_pixel(bytes_per_pixel: int) -> np.dtype:
+    """Gets the numpy dtype of a camera with the given bytes per pixel"""
+    return np.dtype({1: np.uint8, 2: np.uint16, 4: np.uint32}.get(bytes_per_pixel, np.uint16))
+
+
+class Frame:
+    """A camera image read from the core
+
+    ``pixels`` is a (height, width) view of the array decoded from the core,
+    nothing is copied. The full tag map is only fetched when ``tags`` is
+    first accessed, which has to happen before the next image is snapped.
+    """
+
+    def __init__(
+        self,
+        pixels: np.ndarray,
+        fetch_tags: Optional[Callable[[], dict]] = None,
+        tags: Optional[dict] = None,
+    ) -> None:
+        self.pixels = pixels
+        self._fetch_tags = fetch_tags
+        self._tags = tags
+
+    @property
+    def height(self) -> int:
+        """The height of the image in pixels"""
+        return self.pixels.shape[0]
+
+    @property
+    def width(self) -> int:
+        """The width of the image in pixels"""
+        return self.pixels.shape[1]
+
+    @property
+    def tags(self) -> dict:
+        """The metadata of the image (fetched from the core on first access)"""
+        if self._tags is None:
+            self._tags = self._fetch_tags() if self._fetch_tags else {}
+        return self._tags
+
+
+class FramePool:
+    """A pool of preallocated, reusable frame buffers
+
+    Buffers are keyed by (height, width, dtype). Frames are copied into a
+    borrowed buffer once and handed out as is, so callers never pay for another
+    copy. A buffer goes back into the pool once the borrowing context exits;
+    if every buffer of a key is borrowed, the pool grows by one.
+    """
+
+    def __init__(self, depth: int = 4) -> None:
+        self.depth = depth
+        self._free: Dict[FrameKey, List[np.ndarray]] = {}
+        self._allocated: Dict[FrameKey, int] = {}
+        self._lock = threading.Lock()
+
+    def allocate(self, height: int, width: int, dtype: np.dtype) -> None:
+        """Preallocates ``depth`` buffers for frames of this shape
+
+        Args:
+            height (int): The frame height
+            width (int): The frame width
+            dtype (np.dtype): The pixel type
+        """
+        key = (height, width, np.dtype(dtype))
+        with self._lock:
+            free = self._free.setdefault(key, [])
+            while self._allocated.get(key, 0) < self.depth:
+                free.append(np.empty((height, width), dtype=key[2]))
+                self._allocated[key] = self._allocated.get(key, 0) + 1
+
+        logger.info(f"Frame pool holds {self.nbytes / 2**20:.1f} MiB")
+
+    @property
+    def nbytes(self) -> int:
+        """The memory held by all buffers of the pool, borrowed or not"""
+        return sum(h * w * dtype.itemsize * n for (h, w, dtype), n in self._allocated.items())
+
+    @contextlib.contextmanager
+    def borrow(self, height: int, width: int, dtype: np.dtype) -> Iterator[np.ndarray]:
+        """Borrows a buffer from the pool
+
+        The buffer must not be used after the context exits.
+
+        Args:
+            height (int): The frame height
+            width (int): The frame width
+            dtype (np.dtype): The pixel type
+
+        Yields:
+            np.ndarray: A (height, width) buffer with undefined content
+        """
+        key = (height, width, np.dtype(dtype))
+        with self._lock:
+            free = self._free.setdefault(key, [])
+            if free:
+                buffer = free.pop()
+            else:
+                buffer = np.empty((height, width), dtype=key[2])
+                self._allocated[key] = self._allocated.get(key, 0) + 1
+
+        try:
+            yield buffer
+        finally:
+            with self._lock:
+                self._free[key].append(buffer)
+
+    @contextlib.contextmanager
+    def copy_in(self, pixels: np.ndarray, height: int, width: int) -> Iterator[np.ndarray]:
+        """Copies flat camera pixels into a borrowed buffer
+
+        Args:
+            pixels (np.ndarray): The flat pixel array (e.g. ``tagged_image.pix``)
+            height (int): The frame height
+            width (int): The frame width
+
+        Yields:
+            np.ndarray: The (height, width) frame
+        """
+        with self.borrow(height, width, pixels.dtype) as buffer:
+            np.copyto(buffer, np.reshape(pixels, (height, width)))
+            yield buffer
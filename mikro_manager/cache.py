@@ -0,0 +1,138 @@
+"""Caches of the metadata fragments created on the mikro server"""
+import asyncio
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Generic, Hashable, List, Optional, TypeVar
+
+from koil import unkoil
+from mikro.api.schema import PositionFragment, StageFragment, acreate_position
+from pydantic import BaseModel
+
+T = TypeVar("T")
+
+
+class FragmentCache(Generic[T]):
+    """A keyed cache of fragments created on the mikro server
+
+    Creating metadata (objectives, channels, positions) is a GraphQL
+    round-trip and leaves a new object on the server every time. The cache
+    hands out the fragment created the first time a key was seen, and evicts
+    the least recently used key once ``maxsize`` is reached. Concurrent
+    requests for a key that is being created wait for its fragment instead
+    of creating it again.
+    """
+
+    def __init__(self, maxsize: int = 256) -> None:
+        self.maxsize = maxsize
+        self._fragments: "OrderedDict[Hashable, T]" = OrderedDict()
+        self._creating: Dict[Hashable, threading.Lock] = {} # keys that are being created
+        self._lock = threading.Lock()
+
+    def _get(self, key: Hashable) -> T:
+        self._fragments.move_to_end(key)
+        return self._fragments[key]
+
+    def get_or_create(self, key: Hashable, create: Callable[[], T]) -> T:
+        """Gets the fragment for a key, creating it if it is not cached
+
+        Args:
+            key (Hashable): The key (e.g. the config name)
+            create (Callable[[], T]): Creates the fragment on the server
+
+        Returns:
+            T: The fragment
+        """
+        with self._lock:
+            if key in self._fragments:
+                return self._get(key)
+            creating = self._creating.setdefault(key, threading.Lock())
+
+        with creating:
+            with self._lock:
+                if key in self._fragments:
+                    return self._get(key)
+
+            try:
+                fragment = create()
+                self.put(key, fragment)
+            finally:
+                with self._lock:
+                    self._creating.pop(key, None)
+
+        return fragment
+
+    def put(self, key: Hashable, fragment: T) -> None:
+        """Caches a fragment under a key"""
+        with self._lock:
+            self._fragments[key] = fragment
+            self._fragments.move_to_end(key)
+            while len(self._fragments) > self.maxsize:
+                self._fragments.popitem(last=False)
+
+    def evict(self, key: Optional[Hashable] = None) -> None:
+        """Evicts a key, or everything if no key is given"""
+        with self._lock:
+            if key is None:
+                self._fragments.clear()
+            elif key in self._fragments:
+                del self._fragments[key]
+
+    def __contains__(self, key: Hashable) -> bool:
+        """Whether a key is cached"""
+        return key in self._fragments
+
+    def __len__(self) -> int:
+        """The number of cached keys"""
+        return len(self._fragments)
+
+
+class PositionInput(BaseModel):
+    """A position that still needs to be created on a stage"""
+
+    x: Optional[float]
+    y: Optional[float]
+    z: Optional[float]
+    name: Optional[str] = None
+
+    class Config:
+        frozen = True
+
+
+async def acreate_positions(
+    stage: StageFragment, positions: List[PositionInput], concurrency: int = 8
+) -> List[PositionFragment]:
+    """Creates many positions on a stage concurrently
+
+    Args:
+        stage (StageFragment): The stage
+        positions (List[PositionInput]): The positions to create
+        concurrency (int, optional): The maximum number of requests in flight. Defaults to 8.
+
+    Returns:
+        List[PositionFragment]: The created positions, in input order
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def create(position: PositionInput) -> PositionFragment:
+        async with semaphore:
+            return await acreate_position(
+                stage, position.x, position.y, position.z, name=position.name
+            )
+
+    return await asyncio.gather(*[create(position) for position in positions])
+
+
+def create_positions(
+    stage: StageFragment, positions: List[PositionInput], concurrency: int = 8
+) -> List[PositionFragment]:
+    """Creates many positions on a stage concurrently
+
+    Args:
+        stage (StageFragment): The stage
+        positions (List[PositionInput]): The positions to create
+        concurrency (int, optional): The maximum number of requests in flight. Defaults to 8.
+
+    Returns:
+        List[PositionFragment]: The created positions, in input order
+    """
+    return unkoil(acreate_positions, stage, positions, concurrency=concurrency)
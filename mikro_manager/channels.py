@@ -0,0 +1,97 @@
+"""Acquisition events for several channels in one pass"""
+from enum import Enum
+from typing import Any, Dict, List, Optional, Sequence
+
+
+class Interleave(str, Enum):
+    """The order channels are acquired in a multi-channel z-stack"""
+
+    AUTO = "auto"
+    "Per plane if the channel configs can be sequenced in hardware, otherwise per stack"
+    PLANE = "plane"
+    "Every channel at every z plane (z moves once per plane)"
+    STACK = "stack"
+    "A whole z stack per channel (the config changes once per channel)"
+
+
+def channel_events(
+    channels: Sequence[str],
+    z_positions: Sequence[float],
+    group: str,
+    interleave: Interleave,
+    axes: Optional[Dict[str, Any]] = None,
+    **fields: object,
+) -> List[dict]:
+    """Creates the acquisition events of a multi-channel z-stack
+
+    Channels and z are ordered so the acquisition engine can merge
+    consecutive events into hardware sequences where the devices allow it.
+
+    Args:
+        channels (Sequence[str]): The channel configs
+        z_positions (Sequence[float]): The absolute z positions in um
+        group (str): The channel config group
+        interleave (Interleave): The order (PLANE or STACK)
+        axes (Optional[Dict[str, Any]], optional): Further axes of every event (e.g. position)
+        **fields: Further fields of every event (e.g. x and y)
+
+    Returns:
+        List[dict]: The pycromanager acquisition events
+    """
+    assert interleave != Interleave.AUTO, "Resolve the interleave first"
+
+    def event(channel: str, z_index: int) -> dict:
+        return {
+            "axes": {**(axes or {}), "channel": channel, "z": z_index},
+            **fields,
+            "z": float(z_positions[z_index]),
+            "channel": {"group": group, "config": channel},
+        }
+
+    if interleave == Interleave.PLANE:
+        return [
+            event(channel, z_index) for z_index in range(len(z_positions)) for channel in channels
+        ]
+
+    return [event(channel, z_index) for channel in channels for z_index in range(len(z_positions))]
+
+
+class ChannelAxis:
+    """Maps the channels and the cameras of an acquisition to the c axis
+
+    With several cameras (e.g. a Multi Camera adapter) every channel is read
+    out by every camera at once, the cameras of a channel are neighbours on
+    the c axis.
+    """
+
+    def __init__(self, channels: Sequence[str], cameras: Sequence[str] = ()) -> None:
+        self.channels = list(channels)
+        self.cameras = list(cameras) if len(cameras) > 1 else []
+        self._channel_index = {channel: index for index, channel in enumerate(self.channels)}
+        self._camera_index = {camera: index for index, camera in enumerate(self.cameras)}
+
+    def __len__(self) -> int:
+        """The size of the c axis"""
+        return len(self.channels) * max(len(self.cameras), 1)
+
+    def camera(self, metadata: dict) -> int:
+        """Gets the camera index of an image from its metadata"""
+        if not self.cameras:
+            return 0
+
+        camera = metadata.get("Axes", {}).get("camera", metadata.get("Camera"))
+        if isinstance(camera, int):
+            return camera
+        return self._camera_index[camera]
+
+    def index(self, metadata: dict) -> int:
+        """Gets the c index of an image from its metadata"""
+        c = self._channel_index[metadata.get("Axes", {})["channel"]]
+        return c * max(len(self.cameras), 1) + self.camera(metadata)
+
+    def names(self) -> List[str]:
+        """Gets the name of every c index"""
+        if not self.cameras:
+            return list(self.channels)
+
+        return [f"{channel} ({camera})" for channel in self.channels for camera in self.cameras]
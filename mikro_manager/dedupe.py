@@ -0,0 +1,100 @@
+"""Content digests, so identical images are only uploaded once"""
+import hashlib
+import json
+import os
+import threading
+from typing import Any, Dict, Optional, Sequence
+
+import numpy as np
+import numpy.typing as npt
+
+
+def plane_digest(plane: np.ndarray) -> str:
+    """Hashes the pixels of a plane"""
+    return hashlib.blake2b(np.ascontiguousarray(plane).data, digest_size=16).hexdigest()
+
+
+def content_digest(plane_digests: Sequence[str], shape: Sequence[int], dtype: npt.DTypeLike) -> str:
+    """Hashes an image from the digests of its planes, its shape and its pixel type"""
+    content = hashlib.blake2b(digest_size=16)
+    content.update(json.dumps([list(shape), np.dtype(dtype).str]).encode())
+    for digest in plane_digests:
+        content.update(bytes.fromhex(digest))
+    return content.hexdigest()
+
+
+def upload_key(digest: str, upload: Dict[str, Any]) -> str:
+    """Gets the key of an upload: its content and the metadata that describes it
+
+    The acquisition date and the plane timings are left out, so a repeated
+    acquisition of the same pixels (e.g. a dark frame) with the same name,
+    position, objective and channels has the same key.
+
+    Args:
+        digest (str): The content digest of the image
+        upload (Dict[str, Any]): The json serializable upload (see MMBridge.submit_spooled)
+
+    Returns:
+        str: The key
+    """
+    omero = {
+        key: value
+        for key, value in (upload.get("omero") or {}).items()
+        if key not in ("acquisitionDate", "planes")
+    }
+    metadata = {key: value for key, value in upload.items() if key not in ("omero", "key")}
+    return hashlib.blake2b(
+        json.dumps([digest, metadata, omero], sort_keys=True).encode(), digest_size=16
+    ).hexdigest()
+
+
+class UploadIndex:
+    """An append-only index of uploaded images by upload key
+
+    Lines are ``{"key": ..., "id": ...}`` json, a null id forgets a key (e.g.
+    when the image was deleted on the server). A line cut off by a crash is
+    ignored.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._ids: Optional[Dict[str, str]] = None
+        self._lock = threading.Lock()
+
+    def _load(self) -> Dict[str, str]:
+        if self._ids is None:
+            self._ids = {}
+            if os.path.exists(self.path):
+                with open(self.path) as f:
+                    for line in f:
+                        try:
+                            entry = json.loads(line)
+                        except json.JSONDecodeError:
+                            continue
+                        if entry["id"] is None:
+                            self._ids.pop(entry["key"], None)
+                        else:
+                            self._ids[entry["key"]] = entry["id"]
+        return self._ids
+
+    def _append(self, key: str, id: Optional[str]) -> None:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "a") as f:
+            f.write(json.dumps({"key": key, "id": id}) + "\n")
+
+    def get(self, key: str) -> Optional[str]:
+        """Gets the id of the image uploaded with this key, None if there is none"""
+        with self._lock:
+            return self._load().get(key)
+
+    def record(self, key: str, id: str) -> None:
+        """Records that an image was uploaded with this key"""
+        with self._lock:
+            self._load()[key] = id
+            self._append(key, id)
+
+    def forget(self, key: str) -> None:
+        """Forgets a key"""
+        with self._lock:
+            if self._load().pop(key, None) is not None:
+                self._append(key, None)
@@ -0,0 +1,84 @@
+"""Compression and downsampled previews of uploaded images"""
+from enum import Enum
+from typing import List, Optional, Sequence, Tuple
+
+import xarray as xr
+from numcodecs import Blosc
+
+
+class Codec(str, Enum):
+    """The lossless codec images are compressed with before uploading"""
+
+    ZSTD = "zstd"
+    "Blosc with zstd, compresses best"
+    LZ4 = "lz4"
+    "Blosc with lz4, compresses fastest"
+    NONE = "none"
+    "No compression"
+
+
+class Encoder:
+    """Encodes images on their way to the server
+
+    The compressor is attached as the zarr encoding of the array, so the
+    mikro datalayer compresses every chunk while it writes the image. Chunks
+    are compressed in parallel by the default (threaded) dask scheduler of
+    the datalayer. Bit shuffling groups the rarely used high bits of 16 bit
+    camera images, which typically compresses them 2-4x losslessly.
+
+    The encoder also computes downsampled previews of an image (e.g. 2x and
+    4x in x and y) with ``workers`` threads. The scheduler is passed to every
+    compute, as the dask config is shared by all upload threads.
+    """
+
+    def __init__(
+        self,
+        codec: Codec = Codec.ZSTD,
+        level: int = 3,
+        bitshuffle: bool = True,
+        workers: int = 4,
+        preview_factors: Sequence[int] = (2, 4),
+    ) -> None:
+        self.codec = Codec(codec)
+        self.level = level
+        self.bitshuffle = bitshuffle
+        self.workers = workers
+        self.preview_factors = tuple(preview_factors)
+
+    def compressor(self) -> Optional[Blosc]:
+        """Gets the numcodecs compressor of the codec (None for no compression)"""
+        if self.codec == Codec.NONE:
+            return None
+
+        return Blosc(
+            cname=self.codec.value,
+            clevel=self.level,
+            shuffle=Blosc.BITSHUFFLE if self.bitshuffle else Blosc.SHUFFLE,
+        )
+
+    def encode(self, data: xr.DataArray) -> xr.DataArray:
+        """Attaches the compressor to an image (the data is not copied)"""
+        data = data.copy(deep=False)
+        data.encoding["compressor"] = self.compressor()
+        return data
+
+    def previews(self, data: xr.DataArray) -> List[Tuple[int, xr.DataArray]]:
+        """Computes downsampled previews of an image
+
+        Args:
+            data (xr.DataArray): The image, with x and y dimensions
+
+        Returns:
+            List[Tuple[int, xr.DataArray]]: The downsampling factors and previews,
+                skipping factors the image is too small for
+        """
+        previews = []
+        for factor in self.preview_factors:
+            if data.sizes["x"] < factor or data.sizes["y"] < factor:
+                break
+            preview = data.coarsen(x=factor, y=factor, boundary="trim").mean().astype(data.dtype)
+            previews.append(
+                (factor, preview.compute(scheduler="threads", num_workers=self.workers))
+            )
+
+        return previews
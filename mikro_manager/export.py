@@ -0,0 +1,478 @@
+"""Export of the images of a stage to disk"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+from typing import AsyncIterator, Dict, Iterator, List, Literal, Optional, Set, Tuple, Union
+
+import aiohttp
+from koil import unkoil, unkoil_gen
+from mikro.api.schema import aget_stage
+from mikro.datalayer import DataLayer, current_datalayer
+from pydantic import BaseModel
+
+from .api.schema import (
+    ExportDerivedFragment,
+    ExportOmeroFragmentRepresentation,
+    ExportOmeroFragmentRepresentationFileorigins,
+    ExportPositionFragment,
+    ExportStageFragment,
+    ExportStageFragmentPositions,
+    ExportStageFragmentPositionsOmerosRepresentation,
+    ExportStageFragmentPositionsOmerosRepresentationDerived,
+    ExportStageFragmentPositionsOmerosRepresentationFileorigins,
+    aget_export_derived,
+    aget_export_omeros,
+    aget_export_position_ids,
+    aget_export_positions,
+)
+
+logger = logging.getLogger(__name__)
+
+PARTIAL_SUFFIX = ".partial"
+
+# the same objects, fetched with the whole stage or page by page
+ExportPosition = Union[ExportStageFragmentPositions, ExportPositionFragment]
+ExportRepresentation = Union[
+    ExportStageFragmentPositionsOmerosRepresentation,
+    ExportStageFragmentPositionsOmerosRepresentationDerived,
+    ExportOmeroFragmentRepresentation,
+    ExportDerivedFragment,
+]
+ExportFileOrigin = Union[
+    ExportStageFragmentPositionsOmerosRepresentationFileorigins,
+    ExportOmeroFragmentRepresentationFileorigins,
+]
+
+
+class ExportError(Exception):
+    """An exported object does not match its source"""
+
+
+class ExportJob(BaseModel):
+    """A representation store or file that needs to be exported"""
+
+    kind: Literal["store", "file"]
+    id: str
+    source: str
+    "The store path or file key in the datalayer"
+    target: str
+    "The path relative to the export directory"
+
+
+class ExportReport(BaseModel):
+    """The outcome of an export"""
+
+    directory: str
+    exported: int = 0
+    skipped: int = 0
+    "Jobs that were already exported before"
+    failed: int = 0
+    bytes: int = 0
+    "The bytes downloaded by this export"
+
+
+def safe_name(name: Optional[str]) -> str:
+    """Makes a name usable as a file name"""
+    return re.sub(r"[^\w\-. ]", "_", name or "unnamed").strip() or "unnamed"
+
+
+def position_directory(stage_name: str, position: ExportPosition) -> str:
+    """Gets the export directory of a position, relative to the export directory"""
+    return os.path.join(safe_name(stage_name), f"{safe_name(position.name)}_{position.id}")
+
+
+def store_job(representation: ExportRepresentation, directory: str) -> Optional[ExportJob]:
+    """Gets the job exporting the store of a representation (None if it has no store)"""
+    if representation.store is None:
+        return None
+    target = os.path.join(directory, f"{safe_name(representation.name)}_{representation.id}.zarr")
+    return ExportJob(
+        kind="store",
+        id=representation.id,
+        source=getattr(representation.store, "value", representation.store),
+        target=target,
+    )
+
+
+def file_job(origin: ExportFileOrigin, directory: str) -> ExportJob:
+    """Gets the job exporting a file origin"""
+    target = os.path.join(
+        directory, "files", f"{origin.id}_{safe_name(origin.file.split('/')[-1].split('?')[0])}"
+    )
+    return ExportJob(kind="file", id=origin.id, source=origin.file, target=target)
+
+
+def export_jobs(stage: ExportStageFragment) -> List[ExportJob]:
+    """Collects every representation store and file origin of a stage
+
+    Representations referenced from several places (e.g. as derived images)
+    are only exported once.
+
+    Args:
+        stage (ExportStageFragment): The stage, fetched with get_export_stage
+
+    Returns:
+        List[ExportJob]: The jobs, in stage order
+    """
+    jobs: Dict[Tuple[str, str], ExportJob] = {}
+
+    def add(job: Optional[ExportJob]) -> None:
+        if job is not None and (job.kind, job.id) not in jobs:
+            jobs[(job.kind, job.id)] = job
+
+    for position in stage.positions:
+        directory = position_directory(stage.name, position)
+        for omero in position.omeros or []:
+            if omero is None:
+                continue
+
+            representation = omero.representation
+            add(store_job(representation, directory))
+            for derived in representation.derived or []:
+                if derived is not None:
+                    add(store_job(derived, os.path.join(directory, "derived")))
+            for origin in representation.file_origins:
+                add(file_job(origin, directory))
+
+    return list(jobs.values())
+
+
+async def aiter_export_positions(
+    stage_id: str, page_size: int = 50
+) -> AsyncIterator[ExportPositionFragment]:
+    """Iterates over the positions of a stage, fetching them page by page
+
+    The positions query has no ordering, so offset pages can overlap or skip
+    positions that are added while iterating. Instead the ids of the positions
+    are fetched once and ordered, and the pages are fetched by id: every
+    position is yielded once, in id order. Positions added after the ids were
+    fetched are left out, removed ones are skipped.
+
+    Args:
+        stage_id (str): The id of the stage
+        page_size (int, optional): The positions fetched per request. Defaults to 50.
+
+    Yields:
+        ExportPositionFragment: The positions
+    """
+    found = await aget_export_position_ids(stage_id) or []
+    # numeric ids order numerically, without assuming that they are numbers
+    ids = sorted({position.id for position in found if position}, key=lambda id: (len(id), id))
+
+    for start in range(0, len(ids), page_size):
+        page = ids[start : start + page_size]
+        fetched = await aget_export_positions(page) or []
+        by_id = {position.id: position for position in fetched if position is not None}
+        for id in page:
+            if id in by_id:
+                yield by_id[id]
+
+
+async def aiter_export_jobs(
+    stage_id: str, stage_name: str, page_size: int = 50, metadata: Optional[str] = None
+) -> AsyncIterator[ExportJob]:
+    """Iterates over the export jobs of a stage, fetching lazily
+
+    Positions are fetched page by page, the images of a position and the
+    derived images of an image only when the iteration reaches them, so
+    neither the server nor this process ever holds the whole stage.
+
+    Args:
+        stage_id (str): The id of the stage
+        stage_name (str): The name of the stage (names the export directory)
+        page_size (int, optional): The positions fetched per request. Defaults to 50.
+        metadata (Optional[str], optional): A jsonl file the metadata of every position is
+            appended to
+
+    Yields:
+        ExportJob: The jobs, in stage order
+    """
+    seen: Set[Tuple[str, str]] = set()
+
+    def unseen(job: ExportJob) -> bool:
+        if (job.kind, job.id) in seen:
+            return False
+        seen.add((job.kind, job.id))
+        return True
+
+    async for position in aiter_export_positions(stage_id, page_size=page_size):
+        directory = position_directory(stage_name, position)
+        result = await aget_export_omeros(position.id)
+        omeros = [omero for omero in (result.omeros if result else None) or [] if omero is not None]
+
+        if metadata:
+            record = {
+                "position": json.loads(position.json(by_alias=True)),
+                "omeros": [json.loads(omero.json(by_alias=True)) for omero in omeros],
+            }
+            with open(metadata, "a") as f:
+                f.write(json.dumps(record) + "\n")
+
+        for omero in omeros:
+            representation = omero.representation
+            job = store_job(representation, directory)
+            if job and unseen(job):
+                yield job
+
+            for origin in representation.file_origins:
+                origin_job = file_job(origin, directory)
+                if unseen(origin_job):
+                    yield origin_job
+
+            result = await aget_export_derived(representation.id)
+            for derived in (result.derived if result else None) or []:
+                job = store_job(derived, os.path.join(directory, "derived")) if derived else None
+                if job and unseen(job):
+                    yield job
+
+
+def iter_export_jobs(
+    stage_id: str, stage_name: str, page_size: int = 50, metadata: Optional[str] = None
+) -> Iterator[ExportJob]:
+    """Iterates over the export jobs of a stage, fetching lazily (see aiter_export_jobs)"""
+    return unkoil_gen(
+        aiter_export_jobs, stage_id, stage_name, page_size=page_size, metadata=metadata
+    )
+
+
+class ExportManifest:
+    """An append-only log of the jobs that were exported into a directory
+
+    Every finished job is appended as one json line with its file count and
+    size, so an interrupted export resumes where it stopped. A job counts as
+    exported only if its files are still on disk with the recorded size.
+    """
+
+    def __init__(self, directory: str) -> None:
+        self.path = os.path.join(directory, "manifest.jsonl")
+        self.entries: Dict[str, dict] = {}
+
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # a line cut off by a crash
+                    self.entries[f"{entry['kind']}:{entry['id']}"] = entry
+
+    def done(self, job: ExportJob, directory: str) -> bool:
+        """Checks if a job was exported and its files are still intact"""
+        entry = self.entries.get(f"{job.kind}:{job.id}")
+        if entry is None or entry["target"] != job.target:
+            return False
+
+        return local_size(os.path.join(directory, job.target)) == (entry["files"], entry["bytes"])
+
+    def record(self, job: ExportJob, files: int, size: int) -> None:
+        """Records a finished job"""
+        entry = {
+            "kind": job.kind,
+            "id": job.id,
+            "target": job.target,
+            "files": files,
+            "bytes": size,
+        }
+        self.entries[f"{job.kind}:{job.id}"] = entry
+        with open(self.path, "a") as f:
+            f.write(json.dumps(entry) + "\n")
+
+
+def local_size(path: str) -> Tuple[int, int]:
+    """Gets the number of files and bytes below a path (a file or directory)"""
+    if os.path.isfile(path):
+        return 1, os.path.getsize(path)
+
+    files = size = 0
+    for root, _, names in os.walk(path):
+        for name in names:
+            files += 1
+            size += os.path.getsize(os.path.join(root, name))
+    return files, size
+
+
+def md5sum(path: str, chunk_size: int = 2**20) -> str:
+    """Gets the md5 hex digest of a file"""
+    digest = hashlib.md5()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def copy_store(datalayer: DataLayer, source: str, target: str) -> Tuple[int, int]:
+    """Copies a zarr store from the datalayer and verifies every file
+
+    Sizes are always checked. Contents are checked against the S3 ETag, which
+    is the md5 of objects that were not uploaded in parts (all zarr chunks).
+
+    The store is downloaded next to the target and only moved into place once
+    it is complete, so an interrupted copy never looks exported.
+
+    Returns:
+        Tuple[int, int]: The number of files and bytes copied
+    """
+    partial = target + PARTIAL_SUFFIX
+    shutil.rmtree(partial, ignore_errors=True)
+
+    remote = datalayer.fs.find(source, detail=True)
+    root = source.rstrip("/")
+    for path, info in remote.items():
+        local = os.path.join(partial, os.path.relpath(path, root))
+        os.makedirs(os.path.dirname(local), exist_ok=True)
+        datalayer.fs.get_file(path, local)
+        if os.path.getsize(local) != info["size"]:
+            raise ExportError(
+                f"{path} has {os.path.getsize(local)} instead of {info['size']} bytes"
+            )
+
+        etag = str(info.get("ETag", "")).strip('"')
+        if etag and "-" not in etag and md5sum(local) != etag:
+            raise ExportError(f"{path} does not match its checksum")
+
+    shutil.rmtree(target, ignore_errors=True)
+    os.replace(partial, target)
+    return len(remote), sum(info["size"] for info in remote.values())
+
+
+async def adownload_file(
+    session: aiohttp.ClientSession, url: str, target: str, chunk_size: int = 2**20
+) -> Tuple[int, int]:
+    """Downloads a file and verifies its size against the Content-Length
+
+    Returns:
+        Tuple[int, int]: The number of files (1) and bytes downloaded
+    """
+    partial = target + PARTIAL_SUFFIX
+    size = 0
+    async with session.get(url) as response:
+        response.raise_for_status()
+        with open(partial, "wb") as f:
+            async for chunk in response.content.iter_chunked(chunk_size):
+                f.write(chunk)
+                size += len(chunk)
+
+        if response.content_length is not None and size != response.content_length:
+            raise ExportError(f"{url} has {size} instead of {response.content_length} bytes")
+
+    os.replace(partial, target)
+    return 1, size
+
+
+async def aexport_stage(
+    stage_id: str,
+    directory: str,
+    concurrency: int = 8,
+    page_size: int = 50,
+    datalayer: Optional[DataLayer] = None,
+) -> ExportReport:
+    """Exports every image and file of a stage to a local directory
+
+    The stage is walked lazily (see aiter_export_jobs) while representation
+    stores and file origins are downloaded concurrently (at most
+    ``concurrency`` at a time), so the first downloads start right away and
+    memory stays bounded. Jobs that were exported into the directory before
+    are skipped, so an interrupted export can simply be restarted.
+
+    Args:
+        stage_id (str): The id of the stage
+        directory (str): The export directory
+        concurrency (int, optional): The maximum number of downloads in flight. Defaults to 8.
+        page_size (int, optional): The positions fetched per request. Defaults to 50.
+        datalayer (Optional[DataLayer], optional): The datalayer. Defaults to the active one.
+
+    Returns:
+        ExportReport: The outcome
+    """
+    datalayer = datalayer or current_datalayer.get()
+    assert datalayer, "No datalayer set, please connect to mikro first"
+    endpoint_url = datalayer.endpoint_url
+
+    stage = await aget_stage(stage_id)
+    assert stage, f"Stage {stage_id} does not exist"
+
+    os.makedirs(directory, exist_ok=True)
+    metadata = os.path.join(directory, f"{safe_name(stage.name)}_{stage_id}.jsonl")
+    if os.path.exists(metadata):
+        os.remove(metadata)
+
+    manifest = ExportManifest(directory)
+    report = ExportReport(directory=directory)
+    semaphore = asyncio.Semaphore(concurrency)
+    loop = asyncio.get_running_loop()
+
+    async def export(job: ExportJob, session: aiohttp.ClientSession) -> None:
+        target = os.path.join(directory, job.target)
+        try:
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            if job.kind == "store":
+                files, size = await loop.run_in_executor(
+                    None, copy_store, datalayer, job.source, target
+                )
+            else:
+                files, size = await adownload_file(session, f"{endpoint_url}{job.source}", target)
+        except Exception:
+            logger.error(f"Could not export {job.kind} {job.id}", exc_info=True)
+            report.failed += 1
+            return
+        finally:
+            semaphore.release()
+
+        manifest.record(job, files, size)
+        report.exported += 1
+        report.bytes += size
+
+    tasks: Set[asyncio.Task] = set()
+    async with aiohttp.ClientSession() as session:
+        async for job in aiter_export_jobs(
+            stage_id, stage.name, page_size=page_size, metadata=metadata
+        ):
+            if manifest.done(job, directory):
+                report.skipped += 1
+                continue
+
+            # walking the stage waits while the downloads are saturated
+            await semaphore.acquire()
+            task = asyncio.create_task(export(job, session))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+
+        await asyncio.gather(*tasks)
+
+    logger.info(
+        f"Exported {report.exported} objects, skipped {report.skipped}, {report.failed} failed"
+    )
+    return report
+
+
+def export_stage(
+    stage_id: str,
+    directory: str,
+    concurrency: int = 8,
+    page_size: int = 50,
+    datalayer: Optional[DataLayer] = None,
+) -> ExportReport:
+    """Exports every image and file of a stage to a local directory
+
+    Args:
+        stage_id (str): The id of the stage
+        directory (str): The export directory
+        concurrency (int, optional): The maximum number of downloads in flight. Defaults to 8.
+        page_size (int, optional): The positions fetched per request. Defaults to 50.
+        datalayer (Optional[DataLayer], optional): The datalayer. Defaults to the active one.
+
+    Returns:
+        ExportReport: The outcome
+    """
+    return unkoil(
+        aexport_stage,
+        stage_id,
+        directory,
+        concurrency=concurrency,
+        page_size=page_size,
+        datalayer=datalayer,
+    )
@@ -0,0 +1,121 @@
+"""Waiting for the continuous focus device to lock"""
+import logging
+import threading
+import time
+from typing import Callable, Optional
+
+from koil.vars import check_cancelled
+
+from .timing import PhaseTimings
+
+logger = logging.getLogger(__name__)
+
+
+class FocusLockTimeout(TimeoutError):
+    """The continuous focus did not lock in time (e.g. the lock was lost)"""
+
+
+class FocusLock:
+    """Waits for the continuous focus device to lock
+
+    The lock state is polled with an adaptive interval: quick polls right
+    after a disturbance (most locks settle within a few ms), backing off to
+    ``max_interval`` for slow locks, so a long wait does not flood the core
+    with round-trips. Waits longer than ``timeout`` raise FocusLockTimeout
+    instead of hanging the worker.
+
+    Every move that can break the lock (stage, objective, offset, an
+    acquisition) has to be reported with ``disturb``. While nothing was
+    disturbed since the last successful lock, ``ensure`` only checks the lock
+    once instead of re-engaging the device.
+
+    Lock times are recorded per objective as the "lock:<objective>" phase.
+    """
+
+    def __init__(
+        self,
+        timings: Optional[PhaseTimings] = None,
+        timeout: float = 10.0,
+        min_interval: float = 0.002,
+        max_interval: float = 0.1,
+        backoff: float = 1.5,
+    ) -> None:
+        self.timings = timings or PhaseTimings()
+        self.timeout = timeout
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.maintaining = False
+        self._disturbed = True
+        self._lock = threading.Lock()
+
+    def disturb(self) -> None:
+        """Reports that the lock might have been broken"""
+        with self._lock:
+            self._disturbed = True
+
+    def release(self) -> None:
+        """Reports that focus maintenance was switched off"""
+        with self._lock:
+            self.maintaining = False
+            self._disturbed = True
+
+    @property
+    def stable(self) -> bool:
+        """True if nothing disturbed the lock since it was last confirmed"""
+        return not self._disturbed
+
+    def ensure(
+        self, engage: Callable[[], None], is_locked: Callable[[], bool], objective: str = "default"
+    ) -> float:
+        """Makes sure the focus is locked
+
+        Args:
+            engage (Callable[[], None]): Switches focus maintenance on
+            is_locked (Callable[[], bool]): Reads the lock state from the core
+            objective (str, optional): The objective the lock time is recorded for
+
+        Raises:
+            FocusLockTimeout: If the focus does not lock within the timeout
+
+        Returns:
+            float: The time waited in s (0 if the lock was stable)
+        """
+        if self.stable and self.maintaining and is_locked():
+            return 0.0
+
+        with self._lock:
+            self._disturbed = False
+
+        if not self.maintaining:
+            engage()
+            self.maintaining = True
+
+        waited = self.wait(is_locked)
+        self.timings.record(f"lock:{objective}", waited)
+        return waited
+
+    def wait(self, is_locked: Callable[[], bool]) -> float:
+        """Polls is_locked until it is True
+
+        Raises:
+            FocusLockTimeout: If the focus does not lock within the timeout
+
+        Returns:
+            float: The time waited in s
+        """
+        start = time.perf_counter()
+        interval = self.min_interval
+
+        while not is_locked():
+            waited = time.perf_counter() - start
+            if waited > self.timeout:
+                # a lost lock (e.g. out of range) has to be engaged again
+                self.release()
+                raise FocusLockTimeout(f"Focus did not lock within {self.timeout} s")
+
+            check_cancelled()
+            time.sleep(interval)
+            interval = min(interval * self.backoff, self.max_interval)
+
+        return time.perf_counter() - start
@@ -0,0 +1,152 @@
+"""Where the focus locked, to preset the focus drive at new positions"""
+import threading
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+import numpy as np
+from pydantic import BaseModel
+
+
+class FocusPoint(BaseModel):
+    """A position the continuous focus locked at"""
+
+    x: float
+    "The stage x position in um"
+    y: float
+    "The stage y position in um"
+    z: float
+    "The position of the focus drive after the lock in um"
+    offset: Optional[float]
+    "The autofocus offset the focus locked with"
+
+    class Config:
+        frozen = True
+
+
+class FocusSurface:
+    """A plane fitted to focus points, corrected by the residuals of nearby points
+
+    With fewer than three points the surface is flat at the mean z. The
+    residuals of the fit are interpolated by inverse distance weighting, so
+    the surface passes through every point and bends with the plate.
+    """
+
+    def __init__(self, points: List[FocusPoint], power: float = 2.0) -> None:
+        self.power = power
+        self.xy = np.array([(point.x, point.y) for point in points], dtype=float)
+        self.z = np.array([point.z for point in points], dtype=float)
+
+        if len(points) >= 3 and np.linalg.matrix_rank(np.c_[self.xy, np.ones(len(points))]) == 3:
+            self.plane, *_ = np.linalg.lstsq(
+                np.c_[self.xy, np.ones(len(points))], self.z, rcond=None
+            )
+        else:
+            self.plane = np.array([0.0, 0.0, self.z.mean()])
+
+        self.residuals = self.z - self._plane(self.xy)
+
+    def _plane(self, xy: np.ndarray) -> np.ndarray:
+        return xy @ self.plane[:2] + self.plane[2]
+
+    def __call__(self, x: float, y: float) -> float:
+        """Predicts the focus z at a stage position"""
+        xy = np.array([x, y], dtype=float)
+        distances = np.linalg.norm(self.xy - xy, axis=1)
+        nearest = int(np.argmin(distances))
+        if distances[nearest] < 1e-6:
+            return float(self.z[nearest])
+
+        weights = distances ** -self.power
+        correction = float(weights @ self.residuals / weights.sum())
+        return float(self._plane(xy[np.newaxis])[0]) + correction
+
+
+class FocusMap:
+    """Learns where the sample is in focus, per objective
+
+    Every successful lock of the continuous focus is recorded with its stage
+    position. Before the stage moves, the focus drive can be set to the
+    predicted focus of the target, so the lock only has to correct the
+    remaining error instead of searching for the focal plane (e.g. on a
+    tilted plate).
+
+    Points closer than ``merge_distance`` to a new point are replaced by it,
+    only the newest ``max_points`` are kept per objective.
+    """
+
+    def __init__(self, max_points: int = 256, merge_distance: float = 50.0) -> None:
+        self.max_points = max_points
+        self.merge_distance = merge_distance # um
+        self._points: Dict[str, Deque[FocusPoint]] = {}
+        self._surfaces: Dict[str, FocusSurface] = {}
+        self._lock = threading.Lock()
+
+    def record(
+        self, objective: str, x: float, y: float, z: float, offset: Optional[float] = None
+    ) -> None:
+        """Records a position the focus locked at
+
+        Args:
+            objective (str): The objective config
+            x (float): The stage x position in um
+            y (float): The stage y position in um
+            z (float): The position of the focus drive in um
+            offset (Optional[float], optional): The autofocus offset
+        """
+        point = FocusPoint(x=x, y=y, z=z, offset=offset)
+        with self._lock:
+            points = self._points.get(objective)
+            if points is None or (offset is not None and points and points[-1].offset != offset):
+                # a new offset shifts the whole surface
+                points = deque(maxlen=self.max_points)
+                self._points[objective] = points
+
+            for old in [
+                old for old in points if np.hypot(old.x - x, old.y - y) < self.merge_distance
+            ]:
+                points.remove(old)
+            points.append(point)
+            self._surfaces.pop(objective, None)
+
+    def points(self, objective: str) -> List[FocusPoint]:
+        """Gets the recorded points of an objective, oldest first"""
+        with self._lock:
+            return list(self._points.get(objective, []))
+
+    def predict(self, objective: str, x: float, y: float) -> Optional[float]:
+        """Predicts the focus z at a stage position
+
+        Args:
+            objective (str): The objective config
+            x (float): The stage x position in um
+            y (float): The stage y position in um
+
+        Returns:
+            Optional[float]: The focus z in um, None if nothing was recorded for the objective
+        """
+        with self._lock:
+            surface = self._surfaces.get(objective)
+            if surface is None:
+                points = self._points.get(objective)
+                if not points:
+                    return None
+                surface = self._surfaces[objective] = FocusSurface(list(points))
+
+        return surface(x, y)
+
+    def tilt(self, objective: str) -> Optional[Tuple[float, float]]:
+        """Gets the fitted tilt of the sample (um z per um x and y), None if unknown"""
+        with self._lock:
+            points = list(self._points.get(objective, []))
+
+        if len(points) < 3:
+            return None
+        surface = FocusSurface(points)
+        return float(surface.plane[0]), float(surface.plane[1])
+
+    def clear(self, objective: Optional[str] = None) -> None:
+        """Forgets the points of an objective, or of every objective"""
+        with self._lock:
+            for key in [objective] if objective else list(self._points):
+                self._points.pop(key, None)
+                self._surfaces.pop(key, None)
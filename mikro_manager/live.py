@@ -0,0 +1,121 @@
+"""Live streaming of camera frames"""
+import logging
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Optional, Tuple
+
+import numpy as np
+from pycromanager import Core
+
+from .buffers import Frame
+
+logger = logging.getLogger(__name__)
+
+
+class LiveFrame(Frame):
+    """A frame of a live stream"""
+
+    def __init__(self, pixels: np.ndarray, index: int, timestamp: float) -> None:
+        super().__init__(pixels)
+        self.index = index # the number of the frame in the stream, skipped frames count too
+        self.timestamp = timestamp # time.monotonic() when the frame was read
+
+
+def bin_frame(pixels: np.ndarray, binning: int) -> np.ndarray:
+    """Bins a frame by averaging binning x binning pixels (cropping the remainder)"""
+    if binning <= 1:
+        return pixels
+
+    height, width = (pixels.shape[0] // binning) * binning, (pixels.shape[1] // binning) * binning
+    binned = (
+        pixels[:height, :width]
+        .reshape(height // binning, binning, width // binning, binning)
+        .mean(axis=(1, 3))
+    )
+    return binned.astype(pixels.dtype)
+
+
+class LiveStream:
+    """Streams the newest camera frames of a continuous sequence acquisition
+
+    The circular buffer is drained as fast as the camera fills it, but only
+    the newest frame is transferred on every poll; frames the camera produced
+    in between are counted as skipped. The newest ``depth`` frames are kept
+    for consumers in this process (e.g. autofocus), everything older is
+    dropped.
+    """
+
+    def __init__(
+        self,
+        core: Core,
+        shape: Callable[[], Tuple[int, int]],
+        depth: int = 8,
+        poll_interval: float = 0.001,
+    ) -> None:
+        self.core = core
+        self.shape = shape
+        self.poll_interval = poll_interval
+        self.frames: Deque[LiveFrame] = deque(maxlen=depth)
+        self.received = 0
+        self.skipped = 0
+        self._new_frame = threading.Condition()
+
+    def run(self, stop: threading.Event, interval_ms: float = 0) -> None:
+        """Runs the stream until stop is set
+
+        Args:
+            stop (threading.Event): Stops the stream
+            interval_ms (float, optional): The interval between camera frames in ms
+                (0 is as fast as possible)
+        """
+        self.core.start_continuous_sequence_acquisition(interval_ms)
+        try:
+            while not stop.is_set():
+                count = self.core.get_remaining_image_count()
+                if count == 0:
+                    if not self.core.is_sequence_running():
+                        raise Exception("The camera stopped the live stream")
+                    time.sleep(self.poll_interval)
+                    continue
+
+                height, width = self.shape()
+                pixels = self.core.get_last_image()
+                self.core.clear_circular_buffer()
+
+                with self._new_frame:
+                    self.skipped += count - 1
+                    self.received += count
+                    self.frames.append(
+                        LiveFrame(
+                            np.reshape(pixels, (height, width)), self.received - 1, time.monotonic()
+                        )
+                    )
+                    self._new_frame.notify_all()
+        finally:
+            self.core.stop_sequence_acquisition()
+            self.core.clear_circular_buffer()
+            logger.info(f"Live stream received {self.received} frames, skipped {self.skipped}")
+
+    def latest(self) -> Optional[LiveFrame]:
+        """Gets the newest frame, None if there is none yet"""
+        with self._new_frame:
+            return self.frames[-1] if self.frames else None
+
+    def wait(self, after: int = -1, timeout: Optional[float] = None) -> Optional[LiveFrame]:
+        """Waits for a frame newer than the given index
+
+        Args:
+            after (int, optional): The index of the last frame seen. Defaults to -1.
+            timeout (Optional[float], optional): The maximum time to wait in s
+
+        Returns:
+            Optional[LiveFrame]: The newest frame, None on timeout
+        """
+        with self._new_frame:
+            self._new_frame.wait_for(
+                lambda: self.frames and self.frames[-1].index > after, timeout=timeout
+            )
+            if self.frames and self.frames[-1].index > after:
+                return self.frames[-1]
+            return None
@@ -1,8 +1,11 @@
+import asyncio
+import contextvars
 import logging
 
 import sys
 from arkitekt.builders import publicqt
 from arkitekt.qt.magic_bar import MagicBar, ProcessState
+from rekuest.agents.hooks import background
 
 
 from qtpy import QtCore, QtGui, QtWidgets
@@ -40,7 +43,7 @@ class MikroManager(QtWidgets.QMainWindow):
         self.watching = False
         self.watching_bitmap = QtGui.QPixmap(get_asset_file("idle.png"))
         self.idle_bitmap = QtGui.QPixmap(get_asset_file("idle.png"))
-       
+
 
         self.center_label = QtWidgets.QLabel()
         self.center_label.setPixmap(self.idle_bitmap)
@@ -68,9 +71,14 @@ class MikroManager(QtWidgets.QMainWindow):
         self.statusBar = QtWidgets.QStatusBar()
         self.setStatusBar(self.statusBar)
 
+        self.timings_label = QtWidgets.QLabel()
+        self.timings_label.setFont(QtGui.QFontDatabase.systemFont(QtGui.QFontDatabase.FixedFont))
+        self.timings_label.setTextInteractionFlags(QtCore.Qt.TextSelectableByMouse)
+
         self.centralWidget = QtWidgets.QWidget()
         layout = QtWidgets.QVBoxLayout()
         layout.addWidget(self.center_label)
+        layout.addWidget(self.timings_label)
         layout.addWidget(self.button)
         layout.addWidget(self.magic_bar)
         self.centralWidget.setLayout(layout)
@@ -81,18 +89,54 @@ class MikroManager(QtWidgets.QMainWindow):
         self.bridge = MMBridge()
 
         self.app.rekuest.register()(self.bridge.snap_image)
+        self.app.rekuest.register()(self.bridge.live)
         self.app.rekuest.register()(self.bridge.acquire_2d)
         self.app.rekuest.register()(self.bridge.acquire_3d)
+        self.app.rekuest.register()(self.bridge.acquire_multi)
+        self.app.rekuest.register()(self.bridge.acquire_mosaic)
+        self.app.rekuest.register()(self.bridge.acquire_timelapse)
         self.app.rekuest.register()(self.bridge.retrieve_positions)
+        self.app.rekuest.register()(self.bridge.optimize_positions)
         self.app.rekuest.register()(self.bridge.move_to_position_xy)
         self.app.rekuest.register()(self.bridge.set_auto_focusoffset)
+        self.app.rekuest.register()(self.bridge.acquisition_timings)
+        self.app.rekuest.register()(self.bridge.export_stage)
+        self.app.rekuest.register()(self.bridge.resume_uploads)
+        self.app.rekuest.register()(self.bridge.discard_incomplete)
+        background(self.resume_uploads, name="resume_uploads")
         self.setWindowTitle("Mikro-Manager")
 
         self.connected = False
         self.on_connect()
 
+        self.timings_timer = QtCore.QTimer(self)
+        self.timings_timer.timeout.connect(self.update_timings)
+        self.timings_timer.start(1000)
+
 
 
+    async def resume_uploads(self) -> None:
+        """Resumes the uploads that were interrupted when the app was last closed
+
+        Runs when the agent starts.
+        """
+        loop = asyncio.get_running_loop()
+        # the uploads need the mikro client of the agent's context
+        context = contextvars.copy_context()
+        futures = await loop.run_in_executor(
+            None, lambda: context.run(lambda: list(self.bridge.submit_pending()))
+        )
+        for future in futures:
+            try:
+                representation = await asyncio.wrap_future(future)
+                logger.info(f"Resumed the upload of {representation.name}")
+            except Exception:
+                logger.error("Could not resume an upload", exc_info=True)
+
+    def update_timings(self) -> None:
+        """Shows the acquisition timings in the window"""
+        self.timings_label.setText(self.bridge.timings.report(histograms=True))
+
     def on_connect(self):
         try:
             self.bridge.start()
@@ -106,10 +150,10 @@ class MikroManager(QtWidgets.QMainWindow):
             self.connected = False
             self.magic_bar.magicb.setDisabled(True)
 
-    
 
 
-    
+
+
 
 
 def main(**kwargs) -> None:
@@ -0,0 +1,110 @@
+"""Garbage collection of the python and java heaps between acquisitions"""
+import gc
+import logging
+import os
+from typing import Any, Callable, Optional
+
+from pydantic import BaseModel
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+
+
+def python_rss() -> Optional[int]:
+    """Gets the resident memory of this process in bytes, None if unknown"""
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+class MemoryUsage(BaseModel):
+    """The memory used by the Java and the Python side of the bridge"""
+
+    java_used_mb: Optional[float]
+    "The used Java heap in MiB"
+    java_max_mb: Optional[float]
+    "The maximum Java heap in MiB"
+    python_rss_mb: Optional[float]
+    "The resident memory of the Python process in MiB"
+
+
+class MemoryGuard:
+    """Collects garbage only when memory use crosses a threshold
+
+    A forced full collection on both sides of the bridge takes hundreds of ms.
+    Instead, the Java heap (through java.lang.Runtime) and the Python RSS are
+    checked after every acquisition, and each side is only collected when it
+    uses more than its threshold. Collections are counted and logged, so a
+    leak shows up as a growing collection rate instead of a crash.
+    """
+
+    def __init__(self, java_threshold: float = 0.7, python_threshold_mb: float = 4096) -> None:
+        self.java_threshold = java_threshold
+        self.python_threshold_mb = python_threshold_mb
+        self.java_collections = 0
+        self.python_collections = 0
+
+    def usage(self, runtime: Optional[Any] = None) -> MemoryUsage:
+        """Measures the memory use
+
+        Args:
+            runtime (Optional[Any], optional): The java.lang.Runtime of the Java side
+
+        Returns:
+            MemoryUsage: The memory use
+        """
+        java_used = java_max = None
+        if runtime is not None:
+            try:
+                java_used = (runtime.total_memory() - runtime.free_memory()) / MB
+                java_max = runtime.max_memory() / MB
+            except Exception:
+                logger.debug("Could not read the Java heap", exc_info=True)
+
+        rss = python_rss()
+        return MemoryUsage(
+            java_used_mb=java_used,
+            java_max_mb=java_max,
+            python_rss_mb=rss / MB if rss is not None else None,
+        )
+
+    def collect(self, runtime: Optional[Any], collect_java: Callable[[], None]) -> MemoryUsage:
+        """Collects garbage on the sides that are above their threshold
+
+        Args:
+            runtime (Optional[Any]): The java.lang.Runtime of the Java side
+            collect_java (Callable[[], None]): Runs the Java garbage collector (e.g. System.gc)
+
+        Returns:
+            MemoryUsage: The memory use before collecting
+        """
+        usage = self.usage(runtime)
+
+        if usage.python_rss_mb is not None and usage.python_rss_mb > self.python_threshold_mb:
+            gc.collect()
+            self.python_collections += 1
+            logger.info(f"Collected python garbage at {usage.python_rss_mb:.0f} MiB RSS")
+
+        if (
+            usage.java_used_mb is None
+            or not usage.java_max_mb
+            or usage.java_used_mb / usage.java_max_mb > self.java_threshold
+        ):
+            collect_java()
+            self.java_collections += 1
+            logger.info(
+                f"Collected java garbage at {usage.java_used_mb} of {usage.java_max_mb} MiB heap"
+            )
+
+        return usage
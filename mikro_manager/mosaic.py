@@ -0,0 +1,212 @@
+"""Tiling of large regions and their stitched pyramids"""
+import math
+import shutil
+import threading
+from typing import List, Optional, Sequence, Tuple
+
+import dask.array as da
+import numpy as np
+import zarr
+from pydantic import BaseModel
+
+
+class Tile(BaseModel):
+    """One field of view of a mosaic"""
+
+    index: int
+    "The position of the tile in acquisition order"
+    row: int
+    column: int
+    x: float
+    "The stage x position of the tile center in um"
+    y: float
+    "The stage y position of the tile center in um"
+    top: int
+    "The offset of the tile in the mosaic in pixels"
+    left: int
+    "The offset of the tile in the mosaic in pixels"
+
+
+class TileGrid(BaseModel):
+    """The tiles covering a region, in serpentine order"""
+
+    tiles: List[Tile]
+    rows: int
+    columns: int
+    height: int
+    "The height of the mosaic in pixels"
+    width: int
+    "The width of the mosaic in pixels"
+
+
+def pixel_to_stage(pixel_size: float, affine: Optional[Sequence[float]] = None) -> np.ndarray:
+    """Gets the 2x2 matrix mapping pixel offsets to stage offsets
+
+    Args:
+        pixel_size (float): The pixel size in um, used if the affine is not set
+        affine (Optional[Sequence[float]], optional): The micro manager pixel size affine
+            (a, b, tx, c, d, ty)
+
+    Returns:
+        np.ndarray: The matrix
+    """
+    if affine is not None and len(affine) >= 6:
+        matrix = np.array([[affine[0], affine[1]], [affine[3], affine[4]]], dtype=float)
+        if np.linalg.det(matrix) != 0:
+            return matrix
+
+    return np.eye(2) * pixel_size
+
+
+def tile_grid(
+    width: float,
+    height: float,
+    tile_height: int,
+    tile_width: int,
+    pixel_size: float,
+    center: Tuple[float, float],
+    affine: Optional[Sequence[float]] = None,
+    overlap: float = 0.1,
+) -> TileGrid:
+    """Computes the tiles covering a physical region around a center
+
+    Neighbouring tiles overlap by the given fraction. Rows are scanned in
+    alternating directions (serpentine), so the stage never travels back
+    across the whole region.
+
+    Args:
+        width (float): The width of the region in um
+        height (float): The height of the region in um
+        tile_height (int): The height of a tile (the camera image) in pixels
+        tile_width (int): The width of a tile (the camera image) in pixels
+        pixel_size (float): The pixel size in um
+        center (Tuple[float, float]): The stage position of the region center in um
+        affine (Optional[Sequence[float]], optional): The pixel size affine, maps pixel to stage
+            axes
+        overlap (float, optional): The overlap of neighbouring tiles. Defaults to 0.1.
+
+    Returns:
+        TileGrid: The tiles
+    """
+    assert 0 <= overlap < 1, "The overlap needs to be in [0, 1)"
+    matrix = pixel_to_stage(pixel_size, affine)
+
+    step_y = max(int(tile_height * (1 - overlap)), 1)
+    step_x = max(int(tile_width * (1 - overlap)), 1)
+    rows = max(math.ceil((height / pixel_size - tile_height) / step_y), 0) + 1
+    columns = max(math.ceil((width / pixel_size - tile_width) / step_x), 0) + 1
+    mosaic_height = (rows - 1) * step_y + tile_height
+    mosaic_width = (columns - 1) * step_x + tile_width
+
+    tiles: List[Tile] = []
+    for row in range(rows):
+        for column in range(columns) if row % 2 == 0 else reversed(range(columns)):
+            top, left = row * step_y, column * step_x
+            offset = np.array(
+                [left + (tile_width - mosaic_width) / 2, top + (tile_height - mosaic_height) / 2]
+            )
+            x, y = np.array(center, dtype=float) + matrix @ offset
+            tiles.append(
+                Tile(index=len(tiles), row=row, column=column, x=x, y=y, top=top, left=left)
+            )
+
+    return TileGrid(
+        tiles=tiles, rows=rows, columns=columns, height=mosaic_height, width=mosaic_width
+    )
+
+
+def downsample(block: np.ndarray) -> np.ndarray:
+    """Halves a 2D block by averaging 2x2 pixels (odd edges are repeated)"""
+    height, width = block.shape
+    if height % 2 or width % 2:
+        block = np.pad(block, ((0, height % 2), (0, width % 2)), mode="edge")
+
+    mean = block.reshape(block.shape[0] // 2, 2, block.shape[1] // 2, 2).mean(axis=(1, 3))
+    return mean.astype(block.dtype)
+
+
+class PyramidStore:
+    """A chunked multi-resolution mosaic, stitched tile by tile
+
+    Level 0 holds the full resolution, every further level halves it until
+    the largest side fits ``min_size``. Writing a tile updates the affected
+    region of every level right away, so a downsampled preview is available
+    while the scan is still running. Overlapping pixels are taken from the
+    latest tile.
+
+    The levels live in a temporary zarr store on disk, so the mosaic is never
+    held in memory.
+    """
+
+    def __init__(
+        self,
+        height: int,
+        width: int,
+        dtype: np.dtype,
+        chunks: int = 512,
+        min_size: int = 256,
+        store: Optional[zarr.storage.BaseStore] = None,
+    ) -> None:
+        self.store = store if store is not None else zarr.TempStore(prefix="mikro_manager_mosaic_")
+        self.group = zarr.group(store=self.store, overwrite=True)
+        self.levels: List[zarr.Array] = []
+        self._lock = threading.Lock()
+
+        level = 0
+        while True:
+            self.levels.append(
+                self.group.zeros(
+                    str(level),
+                    shape=(height, width),
+                    chunks=(min(chunks, height), min(chunks, width)),
+                    dtype=dtype,
+                )
+            )
+            if max(height, width) <= min_size:
+                break
+            height, width = math.ceil(height / 2), math.ceil(width / 2)
+            level += 1
+
+    def write(self, top: int, left: int, image: np.ndarray) -> None:
+        """Writes a tile and updates the downsampled levels
+
+        Args:
+            top (int): The offset of the tile in the mosaic in pixels
+            left (int): The offset of the tile in the mosaic in pixels
+            image (np.ndarray): The tile
+        """
+        with self._lock:
+            height, width = self.levels[0].shape
+            bottom, right = min(top + image.shape[0], height), min(left + image.shape[1], width)
+            self.levels[0][top:bottom, left:right] = image[: bottom - top, : right - left]
+
+            for source, target in zip(self.levels, self.levels[1:]):
+                top, left = top // 2, left // 2
+                bottom, right = min(math.ceil(bottom / 2), target.shape[0]), min(
+                    math.ceil(right / 2), target.shape[1]
+                )
+                target[top:bottom, left:right] = downsample(
+                    source[top * 2 : bottom * 2, left * 2 : right * 2]
+                )
+
+    def level_for(self, size: int) -> int:
+        """Gets the finest level whose largest side fits size"""
+        for index, level in enumerate(self.levels):
+            if max(level.shape) <= size:
+                return index
+        return len(self.levels) - 1
+
+    def preview(self, size: int = 1024) -> np.ndarray:
+        """Gets a consistent in-memory copy of the finest level fitting size"""
+        with self._lock:
+            return self.levels[self.level_for(size)][:]
+
+    def to_dask(self, level: int = 0) -> da.Array:
+        """Gets a lazy array of a level"""
+        return da.from_zarr(self.levels[level])
+
+    def close(self) -> None:
+        """Deletes the temporary store"""
+        path = getattr(self.store, "path", None)
+        if isinstance(self.store, zarr.TempStore) and path:
+            shutil.rmtree(path, ignore_errors=True)
@@ -0,0 +1,70 @@
+"""Waiting for commanded devices only when their position is needed"""
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from .timing import PhaseTimings
+
+
+class DeviceWaits:
+    """Keeps track of devices that were commanded without waiting for them
+
+    Micro-Manager starts a stage move or a config change and returns before
+    the device arrived, so commands to independent devices (e.g. the xy
+    stage and a filter wheel) overlap in hardware when they are issued back
+    to back. The core is not thread safe, so commands are still issued from
+    one thread; instead of waiting for the whole system, every step then
+    only waits for the devices it needs (``wait_for_device`` or
+    ``wait_for_config``).
+
+    Waits are recorded as the "settle:<device>" phase.
+    """
+
+    def __init__(self, timings: Optional[PhaseTimings] = None) -> None:
+        self.timings = timings or PhaseTimings()
+        self._pending: Dict[str, Callable[[], None]] = {}
+        self._lock = threading.Lock()
+
+    def started(self, device: str, wait: Callable[[], None]) -> None:
+        """Reports that a device was commanded
+
+        Args:
+            device (str): The device (e.g. its label, or "config:<group>")
+            wait (Callable[[], None]): Blocks until the device arrived
+        """
+        with self._lock:
+            self._pending[device] = wait
+
+    @property
+    def pending(self) -> List[str]:
+        """The devices that might still be moving"""
+        with self._lock:
+            return list(self._pending)
+
+    def settle(self, *devices: str) -> float:
+        """Waits until devices arrived
+
+        Args:
+            *devices (str): The devices to wait for, every pending device if none is given
+
+        Returns:
+            float: The time waited in s
+        """
+        with self._lock:
+            devices = devices or tuple(self._pending)
+            waits = [
+                (device, self._pending.pop(device)) for device in devices if device in self._pending
+            ]
+
+        start = time.perf_counter()
+        for device, wait in waits:
+            device_start = time.perf_counter()
+            wait()
+            self.timings.record(f"settle:{device}", time.perf_counter() - device_start)
+
+        return time.perf_counter() - start
+
+    def clear(self) -> None:
+        """Forgets every pending device (e.g. after a system wide wait)"""
+        with self._lock:
+            self._pending.clear()
@@ -0,0 +1,234 @@
+"""Short stage paths through many positions"""
+import time
+from typing import List, Optional, Tuple
+
+import numpy as np
+from pydantic import BaseModel
+
+
+def travel_distance(points: np.ndarray, order: Optional[List[int]] = None) -> float:
+    """Gets the XY distance a stage travels when visiting points in order
+
+    Args:
+        points (np.ndarray): The (n, 2) stage coordinates in um
+        order (Optional[List[int]], optional): The visiting order. Defaults to list order.
+
+    Returns:
+        float: The travelled distance in um
+    """
+    ordered = points if order is None else points[order]
+    if len(ordered) < 2:
+        return 0.0
+    return float(np.linalg.norm(np.diff(ordered, axis=0), axis=1).sum())
+
+
+def nearest_neighbour_order(
+    points: np.ndarray, start: Optional[Tuple[float, float]] = None
+) -> List[int]:
+    """Orders points by always travelling to the closest unvisited one
+
+    Args:
+        points (np.ndarray): The (n, 2) stage coordinates in um
+        start (Optional[Tuple[float, float]], optional): Where the stage currently is.
+            Defaults to the first point.
+
+    Returns:
+        List[int]: The visiting order as indices into points
+    """
+    if len(points) == 0:
+        return []
+
+    remaining = list(range(len(points)))
+    if start is None:
+        current = np.asarray(points[0], dtype=float)
+    else:
+        current = np.asarray(start, dtype=float)
+
+    order = []
+    while remaining:
+        distances = np.linalg.norm(points[remaining] - current, axis=1)
+        index = remaining.pop(int(np.argmin(distances)))
+        order.append(index)
+        current = points[index]
+
+    return order
+
+
+def serpentine_order(points: np.ndarray, row_tolerance: Optional[float] = None) -> List[int]:
+    """Orders points row by row, reversing every other row
+
+    Points whose y coordinates are within row_tolerance are treated as one row,
+    which matches well plates and tile grids.
+
+    Args:
+        points (np.ndarray): The (n, 2) stage coordinates in um
+        row_tolerance (Optional[float], optional): The maximum y spread of a row in um.
+            Defaults to half the median spacing between distinct y coordinates.
+
+    Returns:
+        List[int]: The visiting order as indices into points
+    """
+    if len(points) == 0:
+        return []
+
+    by_y = sorted(range(len(points)), key=lambda i: points[i][1])
+
+    if row_tolerance is None:
+        steps = np.diff(sorted(set(float(p[1]) for p in points)))
+        row_tolerance = float(np.median(steps)) / 2 if len(steps) else 0.0
+
+    rows: List[List[int]] = [[by_y[0]]]
+    for index in by_y[1:]:
+        if points[index][1] - points[rows[-1][0]][1] <= row_tolerance:
+            rows[-1].append(index)
+        else:
+            rows.append([index])
+
+    order = []
+    for row_index, row in enumerate(rows):
+        row.sort(key=lambda i: points[i][0], reverse=row_index % 2 == 1)
+        order += row
+
+    return order
+
+
+def travel_time(
+    points: np.ndarray,
+    order: Optional[List[int]] = None,
+    speed: float = 5000,
+    settle_time: float = 0.05,
+) -> float:
+    """Estimates the time a stage takes to visit points in order
+
+    Both stage axes move at the same time, so a move takes as long as its
+    longer axis needs, plus the settle time of the stage.
+
+    Args:
+        points (np.ndarray): The (n, 2) stage coordinates in um
+        order (Optional[List[int]], optional): The visiting order. Defaults to list order.
+        speed (float, optional): The stage speed in um/s. Defaults to 5000.
+        settle_time (float, optional): The settle time after every move in s. Defaults to 0.05.
+
+    Returns:
+        float: The estimated travel time in s
+    """
+    ordered = points if order is None else points[order]
+    if len(ordered) < 2:
+        return 0.0
+    moves = np.abs(np.diff(ordered, axis=0)).max(axis=1)
+    return float(moves.sum() / speed + settle_time * len(moves))
+
+
+def two_opt(
+    points: np.ndarray,
+    order: List[int],
+    start: Optional[Tuple[float, float]] = None,
+    time_budget: float = 1.0,
+) -> List[int]:
+    """Refines a visiting order by reversing segments that shorten the path
+
+    The path is open: it starts at start (or the first point of order) and
+    ends wherever it ends. Refinement stops when no reversal improves the path
+    anymore or when the time budget is used up.
+
+    Args:
+        points (np.ndarray): The (n, 2) stage coordinates in um
+        order (List[int]): The order to refine
+        start (Optional[Tuple[float, float]], optional): Where the stage currently is.
+        time_budget (float, optional): The maximum time to spend in s. Defaults to 1.0.
+
+    Returns:
+        List[int]: The refined order
+    """
+    if start is not None:
+        path = np.vstack([np.asarray(start, dtype=float)[np.newaxis], points[order]])
+        tour = [-1] + list(order)
+    else:
+        path = points[order].astype(float)
+        tour = list(order)
+
+    n = len(tour)
+    deadline = time.monotonic() + time_budget
+    improved = True
+
+    while improved and time.monotonic() < deadline:
+        improved = False
+        for i in range(1, n - 1):
+            a, b = path[i - 1], path[i]
+            c = path[i + 1 :]
+            d = path[i + 2 :]
+
+            removed = np.linalg.norm(a - b) + np.append(np.linalg.norm(c[:-1] - d, axis=1), 0.0)
+            added = np.linalg.norm(c - a, axis=1) + np.append(np.linalg.norm(b - d, axis=1), 0.0)
+            gains = removed - added
+
+            j = int(np.argmax(gains))
+            if gains[j] > 1e-9:
+                j += i + 1
+                path[i : j + 1] = path[i : j + 1][::-1].copy()
+                tour[i : j + 1] = tour[i : j + 1][::-1]
+                improved = True
+
+            if time.monotonic() > deadline:
+                break
+
+    return [index for index in tour if index != -1]
+
+
+class PathPlan(BaseModel):
+    """A visiting order for a list of stage positions"""
+
+    order: List[int]
+    "The visiting order as indices into the positions"
+    distance_before: float
+    "The travel distance of the original order in um"
+    distance_after: float
+    "The travel distance of the planned order in um"
+    time_before: float
+    "The estimated travel time of the original order in s"
+    time_after: float
+    "The estimated travel time of the planned order in s"
+
+
+def plan_path(
+    points: np.ndarray,
+    start: Optional[Tuple[float, float]] = None,
+    refine: bool = True,
+    time_budget: float = 1.0,
+    speed: float = 5000,
+    settle_time: float = 0.05,
+) -> PathPlan:
+    """Plans a short visiting order for stage positions
+
+    Starts from the nearest neighbour order and refines it with 2-opt within
+    the time budget.
+
+    Args:
+        points (np.ndarray): The (n, 2) stage coordinates in um
+        start (Optional[Tuple[float, float]], optional): Where the stage currently is.
+        refine (bool, optional): Refine the greedy order with 2-opt. Defaults to True.
+        time_budget (float, optional): The maximum time to spend refining in s. Defaults to 1.0.
+        speed (float, optional): The stage speed in um/s. Defaults to 5000.
+        settle_time (float, optional): The settle time after every move in s. Defaults to 0.05.
+
+    Returns:
+        PathPlan: The planned order with its estimated cost before and after
+    """
+    points = np.asarray(points, dtype=float)
+    original = list(range(len(points)))
+    order = nearest_neighbour_order(points, start=start)
+    if refine:
+        order = two_opt(points, order, start=start, time_budget=time_budget)
+
+    def with_start(o: List[int]) -> Tuple[np.ndarray, List[int]]:
+        if start is None:
+            return points, o
+        return np.vstack([points, np.asarray(start, dtype=float)[np.newaxis]]), [len(points)] + o
+
+    return PathPlan(
+        order=order,
+        distance_before=travel_distance(*with_start(original)),
+        distance_after=travel_distance(*with_start(order)),
+        time_before=travel_time(*with_start(original), speed=speed, settle_time=settle_time),
+        time_after=travel_time(*with_start(order), speed=speed, settle_time=settle_time),
+    )
@@ -0,0 +1,202 @@
+"""The camera region of interest"""
+import logging
+import math
+import threading
+from typing import Callable, Optional, Sequence, Tuple
+
+import numpy as np
+from pycromanager import Core
+from pydantic import BaseModel
+
+from .mosaic import pixel_to_stage
+
+logger = logging.getLogger(__name__)
+
+
+class Crop(BaseModel):
+    """A camera ROI in sensor pixels"""
+
+    x: int
+    "The left edge on the sensor"
+    y: int
+    "The top edge on the sensor"
+    width: int
+    height: int
+
+    class Config:
+        frozen = True
+
+
+def centered_crop(
+    sensor_height: int,
+    sensor_width: int,
+    pixel_size: float,
+    affine: Optional[Sequence[float]] = None,
+    physical_height: Optional[float] = None,
+    physical_width: Optional[float] = None,
+) -> Optional[Crop]:
+    """Computes the smallest centered crop covering a physical region
+
+    The region is axis aligned on the stage, so with a rotated pixel affine
+    the crop covers the bounding box of the rotated region. A side that is not
+    given spans the whole sensor.
+
+    Args:
+        sensor_height (int): The height of the sensor in pixels
+        sensor_width (int): The width of the sensor in pixels
+        pixel_size (float): The pixel size in um, used if the affine is not set
+        affine (Optional[Sequence[float]], optional): The micro manager pixel size affine
+            (a, b, tx, c, d, ty)
+        physical_height (Optional[float], optional): The height of the region in um
+        physical_width (Optional[float], optional): The width of the region in um
+
+    Returns:
+        Optional[Crop]: The crop, None if it is the whole sensor
+    """
+    if not physical_height and not physical_width:
+        return None
+
+    matrix = pixel_to_stage(pixel_size, affine)
+    # a side that is not given spans the field of view of the sensor on the stage
+    field_width, field_height = np.abs(matrix) @ (sensor_width, sensor_height)
+    extent = (physical_width or field_width, physical_height or field_height)
+
+    # bounding box of the region in pixels
+    width, height = np.abs(np.linalg.inv(matrix)) @ extent
+    assert not physical_width or width <= sensor_width, (
+        f"Cannot acquire a roi of {physical_width} µm width with this camera. "
+        "The field of view of this camera and objective is too small"
+    )
+    assert not physical_height or height <= sensor_height, (
+        f"Cannot acquire a roi of {physical_height} µm height with this camera. "
+        "The field of view of this camera and objective is too small"
+    )
+
+    width = max(int(math.ceil(min(width, sensor_width))), 1)
+    height = max(int(math.ceil(min(height, sensor_height))), 1)
+    if (height, width) == (sensor_height, sensor_width):
+        return None
+
+    return Crop(
+        x=(sensor_width - width) // 2, y=(sensor_height - height) // 2, width=width, height=height
+    )
+
+
+def read_roi(core: Core) -> Crop:
+    """Reads the current camera ROI (a java.awt.Rectangle) from the core"""
+    roi = core.get_roi()
+    return Crop(
+        x=int(roi.get_x()),
+        y=int(roi.get_y()),
+        width=int(roi.get_width()),
+        height=int(roi.get_height()),
+    )
+
+
+class RoiManager:
+    """Keeps track of the camera ROI and only reconfigures it on changes
+
+    Setting or clearing the ROI stalls most cameras for a long time. The
+    active crop is cached, so consecutive acquisitions with the same crop
+    (or without one) never touch the camera. The camera is only ever
+    reconfigured if this manager cropped it, so an ROI set in micro manager
+    is kept for acquisitions that do not ask for a crop, and restored after
+    the ones that do.
+
+    The sensor size is read once per connection, by clearing the ROI before
+    the first crop.
+    """
+
+    def __init__(self, on_change: Optional[Callable[[], None]] = None) -> None:
+        self.on_change = on_change # called after the camera was reconfigured
+        self.core: Optional[Core] = None
+        self.active: Optional[Crop] = None # None is not cropped by this manager
+        self.user: Optional[Crop] = None # the ROI set in micro manager, None for the whole sensor
+        self.sensor: Optional[Tuple[int, int]] = None # height, width
+        self.changes = 0
+        self.reuses = 0
+        self._lock = threading.Lock()
+
+    def attach(self, core: Core) -> None:
+        """Starts managing the ROI of a (newly connected) core"""
+        with self._lock:
+            self.core = core
+            self.active = None
+            self.user = None
+            self.sensor = None
+
+    def _attached(self) -> Core:
+        assert self.core is not None, "No core attached, please connect first"
+        return self.core
+
+    def _changed(self) -> None:
+        self.changes += 1
+        if self.on_change:
+            self.on_change()
+
+    def sensor_shape(self) -> Tuple[int, int]:
+        """Gets the (cached) height and width of the whole sensor"""
+        with self._lock:
+            if self.sensor is None:
+                core = self._attached()
+                roi = read_roi(core)
+                core.clear_roi()
+                height, width = core.get_image_height(), core.get_image_width()
+                self.sensor = (height, width)
+
+                full = Crop(x=0, y=0, width=width, height=height)
+                if roi != full:
+                    # restored by apply(None)
+                    self.user = roi
+                    self.active = full
+                self._changed()
+
+            return self.sensor
+
+    def crop(
+        self,
+        pixel_size: float,
+        affine: Optional[Sequence[float]] = None,
+        physical_height: Optional[float] = None,
+        physical_width: Optional[float] = None,
+    ) -> Optional[Crop]:
+        """Computes the centered crop of a physical region (see centered_crop)"""
+        if not physical_height and not physical_width:
+            return None
+
+        height, width = self.sensor_shape()
+        return centered_crop(
+            height,
+            width,
+            pixel_size,
+            affine,
+            physical_height=physical_height,
+            physical_width=physical_width,
+        )
+
+    def apply(self, crop: Optional[Crop]) -> bool:
+        """Crops the camera, unless the crop is already active
+
+        Args:
+            crop (Optional[Crop]): The crop, None to restore the ROI set in micro manager
+
+        Returns:
+            bool: Whether the camera was reconfigured
+        """
+        with self._lock:
+            if crop == self.active:
+                self.reuses += 1
+                return False
+
+            core = self._attached()
+            if crop is None and self.user is not None:
+                core.set_roi(self.user.x, self.user.y, self.user.width, self.user.height)
+            elif crop is None:
+                core.clear_roi()
+            else:
+                core.set_roi(crop.x, crop.y, crop.width, crop.height)
+
+            logger.debug(f"Camera ROI {crop}")
+            self.active = crop
+            self._changed()
+            return True
@@ -0,0 +1,175 @@
+"""The on-disk spool of acquisitions that were not uploaded yet"""
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Set
+
+import dask.array as da
+import zarr
+
+from .dedupe import UploadIndex
+
+
+class SpoolEntry:
+    """An acquisition spooled to disk until its upload succeeded
+
+    The planes live in a zarr directory store (``<id>.zarr``), the upload
+    (name, dims and metadata) is committed as ``<id>.json`` once the
+    acquisition finished. An entry without its json was interrupted while
+    acquiring.
+    """
+
+    def __init__(self, directory: str, id: str) -> None:
+        self.id = id
+        self.store_path = os.path.join(directory, f"{id}.zarr")
+        self.upload_path = os.path.join(directory, f"{id}.json")
+
+    def __repr__(self) -> str:
+        """Shows the id of the entry"""
+        return f"SpoolEntry({self.id})"
+
+    @property
+    def store(self) -> zarr.DirectoryStore:
+        """The store the planes are written into"""
+        return zarr.DirectoryStore(self.store_path)
+
+    @property
+    def committed(self) -> bool:
+        """Whether the acquisition finished and the upload was committed"""
+        return os.path.exists(self.upload_path)
+
+    def commit(self, upload: Dict[str, Any]) -> None:
+        """Commits the upload of a finished acquisition
+
+        Args:
+            upload (Dict[str, Any]): The json serializable upload (name, dims, metadata)
+        """
+        partial = f"{self.upload_path}.partial"
+        with open(partial, "w") as f:
+            json.dump(upload, f)
+            f.flush()
+            os.fsync(f.fileno())
+
+        # an entry is either committed completely or not at all
+        os.replace(partial, self.upload_path)
+
+    def upload(self) -> Dict[str, Any]:
+        """Reads the committed upload"""
+        with open(self.upload_path) as f:
+            return json.load(f)
+
+    def open(self) -> da.Array:
+        """Opens the spooled planes as a lazy dask array"""
+        return da.from_zarr(zarr.open_array(self.store, mode="r"))
+
+    @property
+    def modified(self) -> float:
+        """When the entry was last written to (seconds since the epoch)"""
+        paths = [path for path in (self.upload_path, self.store_path) if os.path.exists(path)]
+        return max((os.path.getmtime(path) for path in paths), default=0.0)
+
+    @property
+    def nbytes(self) -> int:
+        """The size of the spooled planes on disk"""
+        size = 0
+        for root, _, files in os.walk(self.store_path):
+            size += sum(os.path.getsize(os.path.join(root, file)) for file in files)
+        return size
+
+    def remove(self) -> None:
+        """Removes the entry from disk (after its upload succeeded)"""
+        if os.path.exists(self.upload_path):
+            os.remove(self.upload_path)
+        shutil.rmtree(self.store_path, ignore_errors=True)
+
+
+class Spool:
+    """A directory on the acquisition PC that acquisitions are spooled to
+
+    Planes are written to disk as they arrive, so an acquisition is only
+    limited by the disk and not by memory. Entries are kept until their
+    upload succeeded: after a crash or a network drop, the committed entries
+    can be uploaded again from disk. Entries of interrupted acquisitions can
+    not be uploaded and are discarded (see discard_incomplete).
+
+    The spool also keeps the index of uploaded images by content (see
+    UploadIndex), so identical images are only uploaded once.
+    """
+
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+        self.index = UploadIndex(os.path.join(directory, "uploads.jsonl"))
+        self._active: Set[str] = set() # entries this process is acquiring or uploading
+        self._lock = threading.Lock()
+
+    def create(self) -> SpoolEntry:
+        """Creates a new entry (ids sort by creation time)"""
+        os.makedirs(self.directory, exist_ok=True)
+        entry = SpoolEntry(self.directory, f"{time.time_ns():020d}_{uuid.uuid4().hex[:8]}")
+        with self._lock:
+            self._active.add(entry.id)
+        return entry
+
+    def claim(self, entry: SpoolEntry) -> bool:
+        """Marks an entry as being uploaded by this process, False if it already is"""
+        with self._lock:
+            if entry.id in self._active:
+                return False
+            self._active.add(entry.id)
+            return True
+
+    def release(self, entry: SpoolEntry) -> None:
+        """Marks an entry as no longer being acquired or uploaded by this process"""
+        with self._lock:
+            self._active.discard(entry.id)
+
+    def entries(self) -> List[SpoolEntry]:
+        """Gets every entry on disk, oldest first"""
+        if not os.path.isdir(self.directory):
+            return []
+
+        ids = {
+            name.rsplit(".", 1)[0]
+            for name in os.listdir(self.directory)
+            if name.endswith(".zarr") or name.endswith(".json")
+        }
+        return [SpoolEntry(self.directory, id) for id in sorted(ids)]
+
+    def pending(self) -> List[SpoolEntry]:
+        """Gets the committed entries that were not uploaded yet, oldest first"""
+        with self._lock:
+            active = set(self._active)
+        return [entry for entry in self.entries() if entry.committed and entry.id not in active]
+
+    def incomplete(self) -> List[SpoolEntry]:
+        """Gets the entries of acquisitions that were interrupted (e.g. by a crash)"""
+        with self._lock:
+            active = set(self._active)
+        return [entry for entry in self.entries() if not entry.committed and entry.id not in active]
+
+    def discard_incomplete(self, max_age: Optional[float] = None) -> List[SpoolEntry]:
+        """Removes the entries of interrupted acquisitions from disk
+
+        Args:
+            max_age (Optional[float], optional): Only remove entries that were not written to
+                for this many seconds. Defaults to every interrupted entry.
+
+        Returns:
+            List[SpoolEntry]: The removed entries
+        """
+        now = time.time()
+        discarded = [
+            entry
+            for entry in self.incomplete()
+            if max_age is None or now - entry.modified > max_age
+        ]
+        for entry in discarded:
+            entry.remove()
+        return discarded
+
+    def nbytes(self, entries: Optional[List[SpoolEntry]] = None) -> int:
+        """Gets the size of the spool (or some of its entries) on disk"""
+        return sum(entry.nbytes for entry in (entries if entries is not None else self.entries()))
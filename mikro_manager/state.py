@@ -0,0 +1,63 @@
+"""A cache of hardware state that is expensive to read"""
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class HardwareState:
+    """A local cache of hardware state read through the core
+
+    Every read through the pycromanager bridge is a round-trip to the Java
+    core. Values are kept for ``ttl`` seconds; values the bridge writes itself
+    are stored (or invalidated) directly, so they never have to be read back.
+    A ``ttl`` of 0 disables caching.
+    """
+
+    def __init__(self, ttl: float = 5.0) -> None:
+        self.ttl = ttl
+        self._values: Dict[str, Tuple[float, Any]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str, read: Callable[[], T]) -> T:
+        """Gets a cached value, reading it from the core when it is stale
+
+        Args:
+            key (str): The state key (e.g. "xy" or "config:Objective")
+            read (Callable[[], T]): Reads the value from the core
+
+        Returns:
+            T: The value
+        """
+        with self._lock:
+            entry = self._values.get(key)
+
+        if entry is not None and time.monotonic() - entry[0] < self.ttl:
+            return entry[1]
+
+        value = read()
+        self.set(key, value)
+        return value
+
+    def peek(self, key: str) -> Optional[Any]:
+        """Gets a cached value without reading from the core, None if stale"""
+        with self._lock:
+            entry = self._values.get(key)
+
+        if entry is not None and time.monotonic() - entry[0] < self.ttl:
+            return entry[1]
+        return None
+
+    def set(self, key: str, value: object) -> None:
+        """Stores a value that is known to be the current hardware state"""
+        with self._lock:
+            self._values[key] = (time.monotonic(), value)
+
+    def invalidate(self, *keys: str) -> None:
+        """Forgets the given keys, or everything if no key is given"""
+        with self._lock:
+            if not keys:
+                self._values.clear()
+            for key in keys:
+                self._values.pop(key, None)
@@ -0,0 +1,84 @@
+"""Streaming of acquired planes into a chunked store"""
+import shutil
+from typing import Dict, Optional, Set
+
+import dask.array as da
+import numpy as np
+import zarr
+
+from .dedupe import content_digest, plane_digest
+
+
+class PlaneStream:
+    """A chunked store that planes are written into as they arrive
+
+    Every plane of a stack becomes its own chunk in a zarr store on the
+    acquisition PC, so only the plane that is currently being written lives in
+    memory. The finished stack is exposed as a lazy dask array, which lets
+    ``from_xarray`` read and upload it chunk by chunk instead of
+    materializing the whole stack.
+
+    With ``digest`` every plane is hashed as it is written, so the content of
+    the stack is known without reading it back (see content_digest).
+    """
+
+    def __init__(
+        self, depth: int, store: Optional[zarr.storage.BaseStore] = None, digest: bool = False
+    ) -> None:
+        self.depth = depth
+        self.store = store if store is not None else zarr.TempStore(prefix="mikro_manager_")
+        self.digest = digest
+        self.array: Optional[zarr.Array] = None
+        self.written: Set[int] = set()
+        self.digests: Dict[int, str] = {}
+
+    def write(self, index: int, image: np.ndarray) -> None:
+        """Writes a plane into its chunk
+
+        Args:
+            index (int): The z index of the plane
+            image (np.ndarray): The plane (y, x)
+        """
+        if self.array is None:
+            self.array = zarr.open_array(
+                self.store,
+                mode="w",
+                shape=(self.depth, *image.shape),
+                chunks=(1, *image.shape),
+                dtype=image.dtype,
+                compressor=None,
+            )
+
+        self.array[index] = image
+        self.written.add(index)
+        if self.digest:
+            self.digests[index] = plane_digest(image)
+
+    @property
+    def complete(self) -> bool:
+        """Whether every plane of the stack was written"""
+        return len(self.written) == self.depth
+
+    def content_digest(self) -> Optional[str]:
+        """Gets the digest of the stack, None if the planes were not hashed or are incomplete"""
+        if not self.digest or not self.complete or self.array is None:
+            return None
+        return content_digest(
+            [self.digests[index] for index in range(self.depth)], self.array.shape, self.array.dtype
+        )
+
+    def to_dask(self) -> da.Array:
+        """Gets the stack as a lazy dask array (z, y, x)
+
+        Returns:
+            da.Array: The stack, chunked one plane per chunk
+        """
+        assert self.array is not None, "No plane was written to this stream"
+        return da.from_zarr(self.array)
+
+    def close(self) -> None:
+        """Removes the chunks from disk"""
+        self.array = None
+        path = getattr(self.store, "path", None)
+        if path:
+            shutil.rmtree(path, ignore_errors=True)
@@ -0,0 +1,173 @@
+"""An in-memory fake of the mikro server for tests"""
+import itertools
+import threading
+from typing import Dict, List, Optional, Protocol, Tuple, Type, TypeVar
+
+import numpy as np
+import xarray as xr
+from mikro.scalars import XArrayInput
+from pydantic import BaseModel
+
+
+class FakeFragment(BaseModel):
+    """A fragment as returned by the fake mikro api"""
+
+    id: str
+    name: Optional[str] = None
+
+
+F = TypeVar("F", bound=FakeFragment)
+
+
+class FakeStage(FakeFragment):
+    """A stage"""
+
+
+class FakePosition(FakeFragment):
+    """A position on a stage"""
+
+    x: Optional[float] = None
+    y: Optional[float] = None
+    z: Optional[float] = None
+    stage: Optional[FakeStage] = None
+
+
+class FakeObjective(FakeFragment):
+    """An objective"""
+
+    serial_number: Optional[str] = None
+    magnification: Optional[float] = None
+
+
+class FakeChannel(FakeFragment):
+    """A channel"""
+
+
+class FakeInstrument(FakeFragment):
+    """An instrument"""
+
+    serial_number: Optional[str] = None
+
+
+class FakeRepresentation(FakeFragment):
+    """An uploaded image"""
+
+    shape: Tuple[int, ...]
+    nbytes: int
+
+
+class Patcher(Protocol):
+    """Anything that can replace attributes (e.g. a pytest monkeypatch fixture)"""
+
+    def setattr(self, target: object, name: str, value: object) -> None:
+        """Replaces an attribute of the target"""
+
+
+class FakeMikro:
+    """A local stand-in for the parts of the mikro api the bridge uses
+
+    Uploads run the same client side validation as mikro (conversion into a
+    rechunked ctzyx array) and materialize the data, but never touch the
+    network. Everything that was created is kept for assertions, and the
+    uploaded bytes are counted.
+    """
+
+    def __init__(self) -> None:
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self.created: Dict[str, List[FakeFragment]] = {}
+        self.uploaded_bytes = 0
+
+    def _create(self, kind: str, model: Type[F], **kwargs) -> F:
+        with self._lock:
+            fragment = model(id=str(next(self._ids)), **kwargs)
+            self.created.setdefault(kind, []).append(fragment)
+        return fragment
+
+    def from_xarray(
+        self, xarray: xr.DataArray, name: Optional[str] = None, **kwargs
+    ) -> FakeRepresentation:
+        """Validates and materializes an image like mikro, without uploading it"""
+        data = np.asarray(XArrayInput.validate(xarray).value.data)
+        with self._lock:
+            self.uploaded_bytes += data.nbytes
+        return self._create(
+            "representations", FakeRepresentation, name=name, shape=data.shape, nbytes=data.nbytes
+        )
+
+    def get_representation(self, id: str, **kwargs) -> FakeRepresentation:
+        """Gets an uploaded image"""
+        for representation in self.created.get("representations", []):
+            if representation.id == id and isinstance(representation, FakeRepresentation):
+                return representation
+        raise Exception(f"Representation {id} does not exist")
+
+    def create_instrument(
+        self, name: str, serial_number: Optional[str] = None, **kwargs
+    ) -> FakeInstrument:
+        """Creates an instrument"""
+        return self._create("instruments", FakeInstrument, name=name, serial_number=serial_number)
+
+    def create_stage(self, name: str, **kwargs) -> FakeStage:
+        """Creates a stage"""
+        return self._create("stages", FakeStage, name=name)
+
+    def create_position(
+        self, stage: FakeStage, x: float, y: float, z: float, name: Optional[str] = None, **kwargs
+    ) -> FakePosition:
+        """Creates a position"""
+        return self._create("positions", FakePosition, name=name, x=x, y=y, z=z, stage=stage)
+
+    def create_positions(
+        self, stage: FakeStage, positions: list, concurrency: int = 8
+    ) -> List[FakePosition]:
+        """Creates many positions (see mikro_manager.cache.create_positions)"""
+        return [self.create_position(stage, p.x, p.y, p.z, name=p.name) for p in positions]
+
+    def get_objective(self, name: str, **kwargs) -> FakeObjective:
+        """Gets an objective by name"""
+        for objective in self.created.get("objectives", []):
+            if objective.name == name and isinstance(objective, FakeObjective):
+                return objective
+        raise Exception(f"Objective {name} does not exist")
+
+    def create_objective(
+        self, serial_number: str, name: str, magnification: float, **kwargs
+    ) -> FakeObjective:
+        """Creates an objective"""
+        return self._create(
+            "objectives",
+            FakeObjective,
+            name=name,
+            serial_number=serial_number,
+            magnification=magnification,
+        )
+
+    def create_channel(self, name: str, **kwargs) -> FakeChannel:
+        """Creates a channel"""
+        return self._create("channels", FakeChannel, name=name)
+
+    def install(self, monkeypatch: Patcher) -> "FakeMikro":
+        """Replaces the mikro api calls of the bridge with this fake
+
+        Args:
+            monkeypatch (Patcher): A pytest monkeypatch fixture
+
+        Returns:
+            FakeMikro: This fake
+        """
+        from mikro_manager import bridge
+
+        for name in (
+            "from_xarray",
+            "create_instrument",
+            "create_stage",
+            "create_position",
+            "create_positions",
+            "get_objective",
+            "create_objective",
+            "create_channel",
+            "get_representation",
+        ):
+            monkeypatch.setattr(bridge, name, getattr(self, name))
+        return self
@@ -0,0 +1,694 @@
+"""A simulated microscope with the pycromanager interfaces the bridge uses"""
+import time
+from typing import Callable, Dict, Generic, List, NamedTuple, Optional, Tuple, TypeVar, Union
+
+import numpy as np
+
+from mikro_manager.bridge import MMBridge
+
+
+V = TypeVar("V")
+
+
+class SimulatedVector(Generic[V]):
+    """Mimics the java vectors (StrVector, DoubleVector) of the core"""
+
+    def __init__(self, values: Optional[List[V]] = None) -> None:
+        self.values = list(values or [])
+
+    def add(self, value: V) -> None:
+        """Appends a value"""
+        self.values.append(value)
+
+    def size(self) -> int:
+        """The number of values"""
+        return len(self.values)
+
+    def get(self, index: int) -> V:
+        """Gets a value"""
+        return self.values[index]
+
+
+class SimulatedPropertySetting(NamedTuple):
+    """Mimics the PropertySetting of a config"""
+
+    device: str
+    name: str
+
+    def get_device_label(self) -> str:
+        """The device of the setting"""
+        return self.device
+
+    def get_property_name(self) -> str:
+        """The property of the setting"""
+        return self.name
+
+
+class SimulatedConfiguration(SimulatedVector[SimulatedPropertySetting]):
+    """Mimics the Configuration (a list of property settings) of a config"""
+
+    def get_setting(self, index: int) -> SimulatedPropertySetting:
+        """Gets a property setting"""
+        return self.values[index]
+
+
+class SimulatedRectangle(NamedTuple):
+    """A stand-in for java.awt.Rectangle"""
+
+    x: int
+    y: int
+    width: int
+    height: int
+
+    def get_x(self) -> float:
+        """The left edge in pixels"""
+        return float(self.x)
+
+    def get_y(self) -> float:
+        """The top edge in pixels"""
+        return float(self.y)
+
+    def get_width(self) -> float:
+        """The width in pixels"""
+        return float(self.width)
+
+    def get_height(self) -> float:
+        """The height in pixels"""
+        return float(self.height)
+
+
+class SimulatedTaggedImage(NamedTuple):
+    """Mimics the TaggedImage (pixels and metadata) of the core"""
+
+    pix: np.ndarray
+    tags: dict
+
+
+class SimulatedCore:
+    """A stand-in for the pycromanager Core of a simple widefield microscope
+
+    Simulates a camera of configurable size, bit depth and exposure, an xy
+    stage with a configurable speed, a focus drive and a continuous focus
+    device that needs ``focus_lock_latency`` seconds to lock after every move.
+    The focal plane of the sample is tilted by ``focus_tilt`` (um z per um x
+    and y); the focus device searches for it at ``focus_search_speed`` um/s.
+    Changing the ROI stalls the camera for ``roi_latency`` seconds, switching
+    a config takes ``config_latency`` seconds (unless the configs are switched in
+    a hardware sequence, see ``channel_sequencing``). With ``z_sequencing``
+    the focus drive runs z stacks as hardware sequences. With several ``cameras``
+    every snap reads out all of them, like a Multi Camera adapter.
+    With ``realtime`` the simulation sleeps for exposures, stage moves and
+    lock times, so timings behave like on a real instrument. Like in
+    Micro-Manager, stage moves and config changes return right away; the
+    devices are busy until they arrived (see ``wait_for_device``) and snaps
+    wait for every device.
+    """
+
+    def __init__(
+        self,
+        width: int = 512,
+        height: int = 512,
+        bit_depth: int = 16,
+        exposure: float = 10,
+        stage_speed: float = 5000,
+        focus_lock_latency: float = 0.0,
+        focus_tilt: Tuple[float, float] = (0.0, 0.0),
+        focus_search_speed: float = 100.0,
+        roi_latency: float = 0.0,
+        config_latency: float = 0.0,
+        channel_sequencing: bool = False,
+        z_sequencing: bool = False,
+        cameras: int = 1,
+        pixel_size: float = 0.65,
+        configs: Optional[Dict[str, List[str]]] = None,
+        realtime: bool = True,
+        seed: int = 0,
+    ) -> None:
+        self.sensor_width = width
+        self.sensor_height = height
+        self.bit_depth = bit_depth
+        self.exposure = exposure  # ms
+        self.stage_speed = stage_speed  # um/s
+        self.focus_lock_latency = focus_lock_latency  # s
+        self.focus_tilt = focus_tilt  # um z per um x and y
+        self.focus_search_speed = focus_search_speed  # um/s
+        self.roi_latency = roi_latency  # s
+        self.config_latency = config_latency  # s
+        self.channel_sequencing = channel_sequencing
+        self.z_sequencing = z_sequencing
+        self.cameras = cameras
+        self.pixel_size = pixel_size  # um
+        self.realtime = realtime
+        self.configs = configs or {"Objective": ["10x", "60x"], "Channel": ["DAPI", "GFP", "RFP"]}
+
+        self.current_configs = {group: values[0] for group, values in self.configs.items()}
+        self.properties: Dict[Tuple[str, str], str] = {}
+        self.auto_focus_offset = 0.0
+        self.roi = (0, 0, width, height)
+        self.xy = (0.0, 0.0)
+        self.z = 0.0
+        self.start_time = time.perf_counter()
+        self.focus_disturbed_at = self.start_time
+        self.focus_search: Optional[float] = None # s the pending lock searches for the focal plane
+        self.busy_until: Dict[str, float] = {} # perf_counter() when a moving device arrives
+
+        dtype = np.uint8 if bit_depth <= 8 else np.uint16
+        rng = np.random.default_rng(seed)
+        self.sensor = rng.integers(0, 2**bit_depth, size=(height, width), dtype=dtype)
+        self.last_image: Optional[np.ndarray] = None
+
+        self.sequence_started: Optional[float] = None
+        self.sequence_count: Optional[int] = None # images of a finite sequence
+        self.stage_sequence: List[float] = []
+        self.stage_sequence_running = False
+        self.sequence_interval = 0.0
+        self.sequence_consumed = 0
+
+        # commands that were issued, for assertions in tests
+        self.calls: Dict[str, int] = {}
+
+    def _count(self, name: str) -> None:
+        self.calls[name] = self.calls.get(name, 0) + 1
+
+    def _sleep(self, seconds: float) -> None:
+        if self.realtime and seconds > 0:
+            time.sleep(seconds)
+
+    def _start(self, device: str, seconds: float) -> float:
+        """Keeps a device busy for seconds after it arrived from its previous command
+
+        Returns:
+            float: The perf_counter() when the device arrives
+        """
+        now = time.perf_counter()
+        arrival = max(now, self.busy_until.get(device, now)) + (seconds if self.realtime else 0)
+        self.busy_until[device] = arrival
+        return arrival
+
+    # camera
+
+    def snap_image(self) -> None:
+        """Exposes an image, once every device arrived"""
+        self._count("snap_image")
+        self.wait_for_system()
+        self._sleep(self.exposure / 1000)
+        x, y, width, height = self.roi
+        self.last_image = self.sensor[y : y + height, x : x + width].copy()
+
+    def _tags(self) -> dict:
+        return {
+            "Width": self.roi[2],
+            "Height": self.roi[3],
+            "PixelType": "GRAY8" if self.bit_depth <= 8 else "GRAY16",
+            "Exposure": self.exposure,
+            "ElapsedTime-ms": (time.perf_counter() - self.start_time) * 1000,
+            "XPositionUm": self.xy[0],
+            "YPositionUm": self.xy[1],
+            "ZPositionUm": self.z,
+        }
+
+    def get_tagged_image(self) -> SimulatedTaggedImage:
+        """Gets the last snapped image with its metadata"""
+        self._count("get_tagged_image")
+        assert self.last_image is not None, "Snap an image first"
+        return SimulatedTaggedImage(pix=self.last_image.ravel(), tags=self._tags())
+
+    def get_image(self) -> np.ndarray:
+        """Gets the pixels of the last snapped image"""
+        self._count("get_image")
+        assert self.last_image is not None, "Snap an image first"
+        return self.last_image.ravel()
+
+    def get_image_width(self) -> int:
+        """The width of camera images in pixels"""
+        return self.roi[2]
+
+    def get_image_height(self) -> int:
+        """The height of camera images in pixels"""
+        return self.roi[3]
+
+    def get_number_of_camera_channels(self) -> int:
+        """The number of cameras read out per snap"""
+        return self.cameras
+
+    def get_camera_channel_name(self, index: int) -> str:
+        """The name of a camera"""
+        return f"Camera-{index + 1}"
+
+    def get_bytes_per_pixel(self) -> int:
+        """The bytes per pixel of camera images"""
+        return 1 if self.bit_depth <= 8 else 2
+
+    def get_image_bit_depth(self) -> int:
+        """The bit depth of camera images"""
+        return self.bit_depth
+
+    def get_exposure(self) -> float:
+        """The exposure in ms"""
+        return self.exposure
+
+    def set_exposure(self, exposure: float) -> None:
+        """Sets the exposure in ms"""
+        self._count("set_exposure")
+        self.exposure = exposure
+
+    def set_roi(self, x: int, y: int, width: int, height: int) -> None:
+        """Crops the camera"""
+        self._count("set_roi")
+        self._sleep(self.roi_latency)
+        assert (
+            x + width <= self.sensor_width and y + height <= self.sensor_height
+        ), "ROI exceeds the sensor"
+        self.roi = (x, y, width, height)
+
+    def clear_roi(self) -> None:
+        """Uncrops the camera"""
+        self._count("clear_roi")
+        self._sleep(self.roi_latency)
+        self.roi = (0, 0, self.sensor_width, self.sensor_height)
+
+    def get_roi(self) -> "SimulatedRectangle":
+        """Gets the camera ROI"""
+        return SimulatedRectangle(*self.roi)
+
+    def clear_circular_buffer(self) -> None:
+        """Drops the images of the running sequence that were not popped yet"""
+        self.sequence_consumed = self._sequence_produced()
+
+    # sequences
+
+    def _sequence_produced(self) -> int:
+        if self.sequence_started is None:
+            return self.sequence_consumed
+        if not self.realtime:
+            produced = self.sequence_consumed + 1
+        else:
+            produced = int((time.perf_counter() - self.sequence_started) / self.sequence_interval)
+        return produced if self.sequence_count is None else min(produced, self.sequence_count)
+
+    def start_continuous_sequence_acquisition(self, interval_ms: float) -> None:
+        """Starts a sequence that runs until it is stopped"""
+        self._count("start_continuous_sequence_acquisition")
+        self.sequence_interval = max(interval_ms, self.exposure, 1) / 1000
+        self.sequence_started = time.perf_counter()
+        self.sequence_consumed = 0
+
+    def start_sequence_acquisition(
+        self, count: int, interval_ms: float, stop_on_overflow: bool
+    ) -> None:
+        """Starts a sequence of count images"""
+        self._count("start_sequence_acquisition")
+        self.start_continuous_sequence_acquisition(interval_ms)
+        self.sequence_count = count
+
+    def stop_sequence_acquisition(self) -> None:
+        """Stops the running sequence"""
+        self.sequence_started = None
+        self.sequence_count = None
+
+    def is_sequence_running(self) -> bool:
+        """Whether a sequence is running"""
+        return self.sequence_started is not None
+
+    def get_remaining_image_count(self) -> int:
+        """The number of sequence images that were not popped yet"""
+        return self._sequence_produced() - self.sequence_consumed
+
+    def get_last_image(self) -> np.ndarray:
+        """Reads out the camera"""
+        self._count("get_last_image")
+        x, y, width, height = self.roi
+        self.last_image = self.sensor[y : y + height, x : x + width].copy()
+        return self.last_image.ravel()
+
+    def pop_next_tagged_image(self) -> SimulatedTaggedImage:
+        """Pops the next sequence image with its metadata"""
+        self._count("pop_next_tagged_image")
+        if self.stage_sequence_running:
+            # the focus drive steps through the loaded sequence with every image
+            self.z = self.stage_sequence[self.sequence_consumed % len(self.stage_sequence)]
+        return SimulatedTaggedImage(pix=self.pop_next_image(), tags=self._tags())
+
+    def pop_next_image(self) -> np.ndarray:
+        """Pops the pixels of the next sequence image"""
+        self._count("pop_next_image")
+        self.sequence_consumed += 1
+        return self.get_last_image()
+
+    # stages
+
+    def get_x_position(self) -> float:
+        """The x position of the stage in um"""
+        self._count("get_x_position")
+        return self.xy[0]
+
+    def get_y_position(self) -> float:
+        """The y position of the stage in um"""
+        self._count("get_y_position")
+        return self.xy[1]
+
+    def set_xy_position(self, x: float, y: float) -> None:
+        """Starts moving the stage"""
+        self._count("set_xy_position")
+        distance = max(abs(x - self.xy[0]), abs(y - self.xy[1]))
+        arrival = self._start("XYStage", distance / self.stage_speed)
+        self.xy = (x, y)
+        self._disturb_focus(arrival)
+
+    def get_xy_stage_device(self) -> str:
+        """The label of the xy stage"""
+        return "XYStage"
+
+    def get_focus_device(self) -> str:
+        """The label of the focus drive"""
+        return "ZDrive"
+
+    def get_position(self, label: Optional[str] = None) -> float:
+        """The position of the focus drive in um"""
+        self._count("get_position")
+        return self.z
+
+    def set_position(self, *args) -> None:
+        """Moves the focus drive, with or without a device label"""
+        self._count("set_position")
+        self.z = float(args[-1])
+
+    def is_stage_sequenceable(self, label: str) -> bool:
+        """Whether the focus drive can run hardware sequences"""
+        return self.z_sequencing
+
+    def get_stage_sequence_max_length(self, label: str) -> int:
+        """The longest hardware sequence of the focus drive"""
+        return 1024 if self.z_sequencing else 0
+
+    def load_stage_sequence(self, label: str, positions: SimulatedVector[float]) -> None:
+        """Loads a hardware sequence into the focus drive"""
+        self._count("load_stage_sequence")
+        assert self.z_sequencing, f"{label} is not sequenceable"
+        self.stage_sequence = [float(positions.get(i)) for i in range(positions.size())]
+
+    def start_stage_sequence(self, label: str) -> None:
+        """Starts the loaded hardware sequence"""
+        self.stage_sequence_running = True
+
+    def stop_stage_sequence(self, label: str) -> None:
+        """Stops the hardware sequence"""
+        self.stage_sequence_running = False
+
+    def wait_for_device(self, label: str) -> None:
+        """Waits until a device arrived"""
+        self._count("wait_for_device")
+        self._sleep(self.busy_until.get(label, 0) - time.perf_counter())
+
+    def wait_for_system(self) -> None:
+        """Waits until every device arrived"""
+        self._sleep(max(self.busy_until.values(), default=0) - time.perf_counter())
+
+    # focus
+
+    def get_auto_focus_device(self) -> str:
+        """The label of the continuous focus device"""
+        return "PFS"
+
+    def set_property(self, device: str, name: str, value: str) -> None:
+        """Sets a device property"""
+        self.properties[(device, name)] = value
+
+    def get_property(self, device: str, name: str) -> str:
+        """Gets a device property"""
+        return self.properties.get((device, name), "")
+
+    def set_auto_focus_offset(self, offset: float) -> None:
+        """Sets the offset of the continuous focus"""
+        self.auto_focus_offset = offset
+        self._disturb_focus()
+
+    def get_auto_focus_offset(self) -> float:
+        """The offset of the continuous focus"""
+        return self.auto_focus_offset
+
+    def _disturb_focus(self, at: Optional[float] = None) -> None:
+        self.focus_disturbed_at = at or time.perf_counter()
+        self.focus_search = None
+
+    def focal_plane(self) -> float:
+        """The z position the sample is in focus at, at the current xy position"""
+        return self.focus_tilt[0] * self.xy[0] + self.focus_tilt[1] * self.xy[1]
+
+    def is_continuous_focus_locked(self) -> bool:
+        """Whether the continuous focus is locked"""
+        self._count("is_continuous_focus_locked")
+        if self.focus_search is None:
+            # the search starts from wherever the focus drive is when the lock is first checked
+            self.focus_search = (
+                abs(self.z - self.focal_plane()) / self.focus_search_speed
+                if any(self.focus_tilt)
+                else 0.0
+            )
+
+        locked = (
+            time.perf_counter() - self.focus_disturbed_at
+            >= self.focus_lock_latency + self.focus_search
+        )
+        if locked and any(self.focus_tilt) and self.focus_search > 0:
+            self.z = self.focal_plane()
+            self.focus_search = 0.0
+        return locked
+
+    # configs
+
+    def get_available_configs(self, group: str) -> SimulatedVector[str]:
+        """The configs of a group"""
+        return SimulatedVector(self.configs.get(group, []))
+
+    def get_current_config(self, group: str) -> str:
+        """The current config of a group"""
+        self._count("get_current_config")
+        return self.current_configs.get(group, "")
+
+    def set_config(self, group: str, config: str) -> None:
+        """Applies a config"""
+        self._count("set_config")
+        assert config in self.configs.get(group, []), f"{config} is not a config of {group}"
+        if not (self.channel_sequencing and group == "Channel"):
+            self._start(f"{group}Device", self.config_latency)
+        self.current_configs[group] = config
+        if group == "Objective":
+            self._disturb_focus(self.busy_until.get("ObjectiveDevice"))
+
+    def wait_for_config(self, group: str, config: str) -> None:
+        """Waits until the device of a config group arrived"""
+        self.wait_for_device(f"{group}Device")
+
+    def get_config_data(self, group: str, config: str) -> SimulatedConfiguration:
+        """The property settings of a config"""
+        return SimulatedConfiguration([SimulatedPropertySetting(f"{group}Device", "State")])
+
+    def is_property_sequenceable(self, device: str, name: str) -> bool:
+        """Whether a property can run hardware sequences"""
+        return self.channel_sequencing and device == "ChannelDevice"
+
+    def get_property_sequence_max_length(self, device: str, name: str) -> int:
+        """The longest hardware sequence of a property"""
+        return 1024 if self.is_property_sequenceable(device, name) else 0
+
+    def get_pixel_size_um(self) -> float:
+        """The pixel size in um"""
+        self._count("get_pixel_size_um")
+        return self.pixel_size
+
+    def get_pixel_size_affine(self) -> SimulatedVector[float]:
+        """The pixel size affine (a, b, tx, c, d, ty)"""
+        self._count("get_pixel_size_affine")
+        return SimulatedVector([self.pixel_size, 0.0, 0.0, 0.0, self.pixel_size, 0.0])
+
+
+class SimulatedStagePosition:
+    """Mimics the StagePosition of one stage at a position"""
+
+    def __init__(self, label: str, x: float, y: float = 0.0) -> None:
+        self.label = label
+        self.x = x
+        self.y = y
+
+    def get_stage_device_label(self) -> str:
+        """The label of the stage"""
+        return self.label
+
+
+class SimulatedMultiStagePosition:
+    """Mimics the MultiStagePosition of a position list entry"""
+
+    def __init__(self, label: str, x: float, y: float, z: Optional[float]) -> None:
+        self.label = label
+        self.stage_positions = [SimulatedStagePosition("XYStage", x, y)]
+        if z is not None:
+            # positions can be saved without the focus drive
+            self.stage_positions.append(SimulatedStagePosition("ZDrive", z))
+
+    def get_label(self) -> str:
+        """The label of the position"""
+        return self.label
+
+    def size(self) -> int:
+        """The number of stage positions"""
+        return len(self.stage_positions)
+
+    def get(self, index: int) -> SimulatedStagePosition:
+        """Gets a stage position"""
+        return self.stage_positions[index]
+
+
+class SimulatedPositionList:
+    """Mimics the PositionList of the studio"""
+
+    def __init__(self, positions: List[SimulatedMultiStagePosition]) -> None:
+        self.positions = positions
+
+    def get_number_of_positions(self) -> int:
+        """The number of positions"""
+        return len(self.positions)
+
+    def get_position(self, index: int) -> SimulatedMultiStagePosition:
+        """Gets a position"""
+        return self.positions[index]
+
+
+class SimulatedStudio:
+    """A stand-in for the pycromanager Studio, holding a position list"""
+
+    def __init__(
+        self, positions: Optional[List[Tuple[float, float, Optional[float]]]] = None
+    ) -> None:
+        self.position_list = SimulatedPositionList(
+            [
+                SimulatedMultiStagePosition(f"Pos{i}", x, y, z)
+                for i, (x, y, z) in enumerate(positions or [])
+            ]
+        )
+
+    def positions(self) -> "SimulatedStudio":
+        """The position manager"""
+        return self
+
+    def get_position_list(self) -> SimulatedPositionList:
+        """Gets the position list"""
+        return self.position_list
+
+
+class SimulatedSystem:
+    """A stand-in for java.lang.System"""
+
+    def gc(self) -> None:
+        """Runs the java garbage collector"""
+        pass
+
+
+class SimulatedRuntime:
+    """A stand-in for java.lang.Runtime with a fixed heap use"""
+
+    def __init__(self, used: int = 256 * 1024 * 1024, max: int = 4096 * 1024 * 1024) -> None:
+        self.used = used
+        self.max = max
+
+    def total_memory(self) -> int:
+        """The heap size in bytes"""
+        return self.used
+
+    def free_memory(self) -> int:
+        """The free heap in bytes"""
+        return 0
+
+    def max_memory(self) -> int:
+        """The maximum heap size in bytes"""
+        return self.max
+
+
+class SimulatedAcquisition:
+    """Runs acquisition events against a SimulatedCore
+
+    Mimics the parts of the pycromanager Acquisition the bridge uses: events
+    are executed one after another when they are submitted, and every image
+    is handed to the image process function with Micro-Manager style metadata.
+    """
+
+    def __init__(
+        self,
+        core: SimulatedCore,
+        image_process_fn: Optional[Callable[[np.ndarray, dict], object]] = None,
+        **kwargs,
+    ) -> None:
+        self.core = core
+        self.image_process_fn = image_process_fn
+        self.start_time = time.perf_counter()
+        self.aborted = False
+
+    def __enter__(self) -> "SimulatedAcquisition":
+        """Starts the acquisition"""
+        return self
+
+    def __exit__(self, *args) -> None:
+        """Finishes the acquisition"""
+        pass
+
+    def abort(self, exception: Optional[BaseException] = None) -> None:
+        """Skips the events that were not executed yet"""
+        self.aborted = True
+
+    def acquire(self, events: Union[dict, List[dict]]) -> None:
+        """Runs events, one after another"""
+        for event in events if isinstance(events, list) else [events]:
+            if self.aborted:
+                return
+            if "x" in event and "y" in event:
+                self.core.set_xy_position(event["x"], event["y"])
+            if "z" in event:
+                self.core.set_position(event["z"])
+            # like the acquisition engine, configs are only applied when they change
+            if (
+                "channel" in event
+                and self.core.current_configs.get(event["channel"]["group"])
+                != event["channel"]["config"]
+            ):
+                self.core.set_config(event["channel"]["group"], event["channel"]["config"])
+            if "exposure" in event:
+                self.core.set_exposure(event["exposure"])
+            if "min_start_time" in event:
+                elapsed = time.perf_counter() - self.start_time
+                self.core._sleep(event["min_start_time"] - elapsed)
+
+            self.core.snap_image()
+            for camera in range(self.core.get_number_of_camera_channels()):
+                tagged_image = self.core.get_tagged_image()
+                metadata = dict(tagged_image.tags)
+                metadata["Axes"] = dict(event["axes"])
+                metadata["Camera"] = self.core.get_camera_channel_name(camera)
+                image = np.reshape(tagged_image.pix, (metadata["Height"], metadata["Width"]))
+                if self.image_process_fn:
+                    self.image_process_fn(image, metadata)
+
+
+def simulated_bridge(
+    positions: Optional[List[Tuple[float, float, Optional[float]]]] = None, **kwargs
+) -> MMBridge:
+    """Creates a started MMBridge that drives a simulated microscope
+
+    Args:
+        positions (Optional[List[Tuple[float, float, Optional[float]]]], optional): The
+            (x, y, z) positions of the studio position list, z None for xy only positions.
+        **kwargs: Passed on to SimulatedCore
+
+    Returns:
+        MMBridge: The started bridge
+    """
+    bridge = MMBridge()
+    core = SimulatedCore(**kwargs)
+    bridge.start(
+        core=core,
+        studio=SimulatedStudio(positions),
+        lang=SimulatedSystem(),
+        runtime=SimulatedRuntime(),
+        acquisition_class=SimulatedAcquisition,
+        vector_class=SimulatedVector,
+    )
+    return bridge
@@ -0,0 +1,147 @@
+"""Phase timings of acquisitions"""
+import bisect
+import contextlib
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, Iterator, List, Optional
+
+import numpy as np
+from pydantic import BaseModel
+
+# upper bucket edges in ms, the last bucket catches everything above
+BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+
+
+class PhaseSummary(BaseModel):
+    """Timing statistics of one acquisition phase"""
+
+    count: int
+    "How often the phase ran"
+    total_ms: float
+    "The accumulated wall time in ms"
+    mean_ms: float
+    "The mean wall time in ms (recent window)"
+    p50_ms: float
+    "The median wall time in ms (recent window)"
+    p95_ms: float
+    "The 95th percentile wall time in ms (recent window)"
+    max_ms: float
+    "The longest wall time in ms"
+    histogram: List[int]
+    "Counts per bucket of BUCKETS_MS, the last bucket holds everything slower"
+
+
+class _Phase:
+    def __init__(self, window: int) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.recent: Deque[float] = deque(maxlen=window)
+        self.histogram = [0] * (len(BUCKETS_MS) + 1)
+
+    def record(self, ms: float) -> None:
+        self.count += 1
+        self.total += ms
+        self.max = max(self.max, ms)
+        self.recent.append(ms)
+        self.histogram[bisect.bisect_left(BUCKETS_MS, ms)] += 1
+
+    def summary(self) -> PhaseSummary:
+        recent = np.array(self.recent) if self.recent else np.zeros(1)
+        return PhaseSummary(
+            count=self.count,
+            total_ms=self.total,
+            mean_ms=float(recent.mean()),
+            p50_ms=float(np.percentile(recent, 50)),
+            p95_ms=float(np.percentile(recent, 95)),
+            max_ms=self.max,
+            histogram=list(self.histogram),
+        )
+
+
+class PhaseTimings:
+    """Wall time histograms of the phases of every acquisition
+
+    Phases are timed with ``with timings.phase("focus"): ...`` or recorded
+    directly. Every phase keeps a fixed bucket histogram over its whole
+    lifetime and a window of recent durations for the percentiles.
+    """
+
+    def __init__(self, window: int = 1000) -> None:
+        self.window = window
+        self._phases: Dict[str, _Phase] = {}
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Times the wrapped block as one run of the phase"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def ticker(self, name: str) -> Callable[..., None]:
+        """Gets a function that records the time since its previous call
+
+        Useful for per-plane timings inside image callbacks: the first tick
+        records the time since the ticker was created. Ticks can pass the
+        exposure of the plane in ms (its Exposure tag), the interval is then
+        split into "<name>:exposure" and "<name>:readout" (the rest of the
+        interval, e.g. readout, transfer and moves).
+        """
+        last = [time.perf_counter()]
+
+        def tick(exposure_ms: Optional[float] = None) -> None:
+            now = time.perf_counter()
+            interval = now - last[0]
+            self.record(name, interval)
+            if exposure_ms is not None:
+                exposure = min(float(exposure_ms) / 1000, interval)
+                self.record(f"{name}:exposure", exposure)
+                self.record(f"{name}:readout", interval - exposure)
+            last[0] = now
+
+        return tick
+
+    def record(self, name: str, seconds: float) -> None:
+        """Records one run of a phase
+
+        Args:
+            name (str): The phase
+            seconds (float): Its wall time in s
+        """
+        with self._lock:
+            if name not in self._phases:
+                self._phases[name] = _Phase(self.window)
+            self._phases[name].record(seconds * 1000)
+
+    def summary(self) -> Dict[str, PhaseSummary]:
+        """Gets the statistics of every phase"""
+        with self._lock:
+            return {name: phase.summary() for name, phase in self._phases.items()}
+
+    def report(self, histograms: bool = False) -> str:
+        """Formats the statistics of every phase as a table
+
+        Args:
+            histograms (bool, optional): Add a table with the histogram of every phase.
+                Defaults to False.
+        """
+        summary = sorted(self.summary().items())
+        lines = [f"{'phase':<16}{'n':>7}{'mean':>10}{'p50':>10}{'p95':>10}{'max':>10}  (ms)"]
+        for name, s in summary:
+            lines.append(f"{name:<16}{s.count:>7}{s.mean_ms:>10.1f}{s.p50_ms:>10.1f}{s.p95_ms:>10.1f}{s.max_ms:>10.1f}")
+
+        if histograms:
+            edges = [f"<={edge}" for edge in BUCKETS_MS] + [f">{BUCKETS_MS[-1]}"]
+            lines += ["", f"{'phase':<16}" + "".join(f"{edge:>8}" for edge in edges) + "  (ms)"]
+            for name, s in summary:
+                lines.append(f"{name:<16}" + "".join(f"{count:>8}" for count in s.histogram))
+        return "\n".join(lines)
+
+    def reset(self) -> None:
+        """Forgets all recorded timings"""
+        with self._lock:
+            self._phases.clear()
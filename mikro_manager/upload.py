@@ -0,0 +1,163 @@
+"""Background uploads of acquired images"""
+import asyncio
+import contextvars
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, List, Optional, Tuple, Type
+
+from koil.vars import check_cancelled
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+try:
+    import botocore.exceptions
+except ImportError:
+    botocore = None
+
+logger = logging.getLogger(__name__)
+
+
+def network_errors() -> Tuple[Type[BaseException], ...]:
+    """Gets the errors of a dropped or timed out connection, of the http clients that are installed
+
+    Other OSErrors (e.g. a PermissionError or a FileNotFoundError of a spool
+    entry that was removed) are not transient and are not retried.
+    """
+    errors: List[Type[BaseException]] = [ConnectionError, TimeoutError, asyncio.TimeoutError]
+    if aiohttp is not None:
+        errors += [aiohttp.ClientConnectionError, aiohttp.ClientPayloadError]
+    if httpx is not None:
+        errors.append(httpx.TransportError)
+    if botocore is not None:
+        errors += [botocore.exceptions.ConnectionError, botocore.exceptions.HTTPClientError]
+    return tuple(errors)
+
+
+class UploadQueue:
+    """A bounded queue of uploads, worked off by a pool of background threads
+
+    Submitting an upload returns a future right away, so the microscope can
+    start the next acquisition while earlier images are still being uploaded.
+    When ``maxsize`` uploads are waiting, submitting blocks until a worker
+    frees a slot (backpressure), so acquisitions can never run away from the
+    network. Uploads failing with a network error (see network_errors) are
+    retried with an exponential backoff.
+
+    Uploads run in a copy of the context they were submitted from, so the
+    mikro client of the submitting assignment is used.
+    """
+
+    def __init__(
+        self,
+        workers: int = 2,
+        maxsize: int = 4,
+        retries: int = 3,
+        backoff: float = 1.0,
+        transient: Optional[Tuple[Type[BaseException], ...]] = None,
+    ) -> None:
+        self.workers = workers
+        self.retries = retries
+        self.backoff = backoff
+        self.transient = transient if transient is not None else network_errors()
+        self._queue: "queue.Queue[Optional[tuple]]" = queue.Queue(maxsize=maxsize)
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._in_flight = 0
+
+    @property
+    def pending(self) -> int:
+        """The number of uploads that are queued or running"""
+        return self._queue.qsize() + self._in_flight
+
+    def start(self) -> None:
+        """Starts the worker threads (called on the first submit)"""
+        with self._lock:
+            while len(self._threads) < self.workers:
+                thread = threading.Thread(
+                    target=self._work, name=f"Upload-{len(self._threads)}", daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+
+    def stop(self) -> None:
+        """Lets the workers finish the queued uploads and stops them"""
+        with self._lock:
+            threads, self._threads = self._threads, []
+
+        for _ in threads:
+            self._queue.put(None)
+        for thread in threads:
+            thread.join()
+
+    def submit(
+        self, upload: Callable[[], object], on_done: Optional[Callable[[], None]] = None
+    ) -> Future:
+        """Queues an upload
+
+        Blocks while the queue is full.
+
+        Args:
+            upload (Callable[[], object]): Uploads and returns the result (e.g. a from_xarray call)
+            on_done (Optional[Callable[[], None]], optional): Called once the upload
+                finished or failed, e.g. to release its buffers.
+
+        Returns:
+            Future: Resolves to the result of the upload
+        """
+        self.start()
+        future: Future = Future()
+        item = (contextvars.copy_context(), upload, future, on_done)
+
+        while True:
+            try:
+                self._queue.put(item, timeout=0.1)
+                return future
+            except queue.Full:
+                check_cancelled()
+
+    def _work(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+
+            context, upload, future, on_done = item
+            with self._lock:
+                self._in_flight += 1
+
+            try:
+                if future.set_running_or_notify_cancel():
+                    self._run(context, upload, future)
+            finally:
+                with self._lock:
+                    self._in_flight -= 1
+                if on_done:
+                    on_done()
+
+    def _run(
+        self, context: contextvars.Context, upload: Callable[[], object], future: Future
+    ) -> None:
+        for attempt in range(self.retries + 1):
+            try:
+                future.set_result(context.run(upload))
+                return
+            except self.transient as e:
+                if attempt == self.retries:
+                    future.set_exception(e)
+                    return
+                logger.warning(f"Upload failed ({e}), retrying", exc_info=True)
+                time.sleep(self.backoff * 2**attempt)
+            except Exception as e:
+                future.set_exception(e)
+                return
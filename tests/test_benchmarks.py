@@ -0,0 +1,103 @@
+import pytest
+
+from mikro_manager.spool import Spool
+from mikro_manager.testing.fakemikro import FakeMikro
+from mikro_manager.testing.simulated import simulated_bridge
+
+# deselected by default, run with `pytest -m benchmark`
+pytestmark = pytest.mark.benchmark
+
+GRID = [(x * 1000.0, y * 1000.0, 0.0) for y in range(3) for x in range(3)]
+
+
+@pytest.fixture
+def mikro(monkeypatch):
+    return FakeMikro().install(monkeypatch)
+
+
+@pytest.fixture(params=[512, 2048], ids=["512px", "2048px"])
+def bridge(request, mikro, tmp_path):
+    bridge = simulated_bridge(positions=GRID, width=request.param, height=request.param, realtime=False)
+    bridge.spool = Spool(str(tmp_path / "spool"))
+    bridge.on_provide()
+    yield bridge
+    bridge.uploads.stop()
+
+
+def report_throughput(benchmark, bridge, frames: int) -> None:
+    mean = benchmark.stats.stats.mean
+    frame_bytes = bridge.core.get_image_width() * bridge.core.get_image_height() * bridge.core.get_bytes_per_pixel()
+    benchmark.extra_info["frames_per_s"] = frames / mean
+    benchmark.extra_info["MB_per_s"] = frames * frame_bytes / mean / 1e6
+
+
+@pytest.mark.benchmark(group="snap")
+def test_snap(benchmark, bridge, mikro):
+    benchmark(bridge.snap_image)
+    report_throughput(benchmark, bridge, 1)
+    assert mikro.uploaded_bytes
+
+
+@pytest.mark.benchmark(group="2d")
+def test_acquire_2d(benchmark, bridge):
+    position = bridge.retrieve_positions()[0]
+    channel = bridge.retrieve_channels()[0]
+
+    benchmark(bridge.acquire_2d, position, None, channel)
+    report_throughput(benchmark, bridge, 1)
+
+
+@pytest.mark.benchmark(group="3d")
+def test_acquire_3d(benchmark, bridge):
+    position = bridge.retrieve_positions()[0]
+    channel = bridge.retrieve_channels()[0]
+
+    image = benchmark(bridge.acquire_3d, position, None, channel, z_steps=10, z_step=0.5)
+    report_throughput(benchmark, bridge, 10)
+    assert image.shape[2] == 10
+    assert bridge.spool.entries() == []
+
+
+@pytest.mark.benchmark(group="3d-channels")
+@pytest.mark.parametrize("interleave", ["plane", "stack"])
+def test_acquire_3d_channels(benchmark, bridge, interleave):
+    channels = bridge.retrieve_channels()
+
+    image = benchmark(bridge.acquire_3d, None, None, None, z_steps=5, z_step=0.5, channels=channels, interleave=interleave)
+    report_throughput(benchmark, bridge, len(channels) * 5)
+    assert image.shape[0] == len(channels)
+
+
+@pytest.mark.benchmark(group="multi")
+def test_acquire_multi(benchmark, bridge):
+    positions = bridge.retrieve_positions()
+    channels = bridge.retrieve_channels()[:2]
+
+    images = benchmark(lambda: list(bridge.acquire_multi(positions, channels, z_steps=3)))
+    report_throughput(benchmark, bridge, len(positions) * len(channels) * 3)
+    assert len(images) == len(positions)
+
+
+@pytest.mark.benchmark(group="mosaic")
+def test_acquire_mosaic(benchmark, bridge):
+    pixel_size = bridge.pixel_size_um()
+    side = 3 * bridge.core.get_image_width() * pixel_size
+
+    images = benchmark(lambda: list(bridge.acquire_mosaic(side, side, overlap=0.1)))
+    report_throughput(benchmark, bridge, 16)
+    assert images[-1].name == "Mosaic"
+
+
+@pytest.mark.benchmark(group="timelapse")
+def test_acquire_timelapse(benchmark, bridge):
+    images = benchmark(lambda: list(bridge.acquire_timelapse(5, 0, z_steps=3, previews=0)))
+    report_throughput(benchmark, bridge, 5 * 3)
+    assert [image.name for image in images] == ["Timelapse"]
+    assert images[-1].shape[1] == 5
+
+
+@pytest.mark.benchmark(group="live")
+def test_live(benchmark, bridge):
+    previews = benchmark.pedantic(lambda: list(bridge.live(duration=1.0, binning=4)), rounds=3)
+    benchmark.extra_info["previews_per_s"] = len(previews) / 1.0
+    assert previews
@@ -0,0 +1,226 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from mikro_manager.bridge import AbstractAquisition
+from mikro_manager.focus import FocusLockTimeout
+from mikro_manager.spool import Spool
+from mikro_manager.testing.fakemikro import FakeMikro
+from mikro_manager.testing.simulated import simulated_bridge
+
+GRID = [(x * 1000.0, y * 1000.0, 0.0) for y in range(3) for x in range(3)]
+
+
+@pytest.fixture
+def mikro(monkeypatch):
+    return FakeMikro().install(monkeypatch)
+
+
+@pytest.fixture
+def make_bridge(mikro, tmp_path):
+    bridges = []
+
+    def make(**kwargs):
+        bridge = simulated_bridge(**{"positions": GRID, "width": 64, "height": 64, "realtime": False, **kwargs})
+        bridge.spool = Spool(str(tmp_path / "spool"))
+        bridge.on_provide()
+        bridges.append(bridge)
+        return bridge
+
+    yield make
+    for bridge in bridges:
+        bridge.uploads.stop()
+
+
+def acquisition_threads():
+    return [thread for thread in threading.enumerate() if thread.name.endswith("Acquisition")]
+
+
+def test_multi_keeps_the_focus_at_xy_only_positions(make_bridge, mikro):
+    bridge = make_bridge(positions=[(0.0, 0.0, None), (1000.0, 0.0, None)])
+    bridge.core.z = 12.0
+
+    positions = bridge.retrieve_positions()
+    assert all(position.z is None for position in positions)
+
+    images = list(bridge.acquire_multi(positions, bridge.retrieve_channels()[:1]))
+    assert len(images) == 2
+    assert bridge.core.z == 12.0
+
+
+def test_closing_multi_stops_the_microscope(make_bridge):
+    bridge = make_bridge(realtime=True)
+    positions = bridge.retrieve_positions()
+
+    images = bridge.acquire_multi(positions, bridge.retrieve_channels()[:1], z_steps=3)
+    next(images)
+    images.close()
+
+    assert acquisition_threads() == []
+    assert bridge.core.calls["snap_image"] < len(positions) * 3
+    assert bridge.spool.incomplete() == []
+
+
+def test_closing_mosaic_stops_the_scan(make_bridge):
+    bridge = make_bridge(realtime=True, exposure=50)
+    side = 4 * bridge.core.get_image_width() * bridge.pixel_size_um()
+
+    images = bridge.acquire_mosaic(side, side, overlap=0.1)
+    next(images)
+    images.close()
+
+    assert acquisition_threads() == []
+    assert bridge.core.calls["snap_image"] < 25
+
+
+def test_timelapse_is_uploaded_once(make_bridge, mikro):
+    bridge = make_bridge(realtime=True)
+
+    start = time.perf_counter()
+    images = list(bridge.acquire_timelapse(3, 0.2, z_steps=2, previews=0))
+    assert time.perf_counter() - start >= 0.4
+
+    assert [image.name for image in images] == ["Timelapse"]
+    assert images[0].shape[1] == 3
+    assert len(mikro.created["representations"]) == 1
+    assert bridge.spool.entries() == []
+
+
+def test_timelapse_previews(make_bridge):
+    bridge = make_bridge()
+
+    images = list(bridge.acquire_timelapse(3, 0, z_steps=3))
+    assert images[-1].name == "Timelapse"
+    assert all(image.name.endswith("(preview)") for image in images[:-1])
+    assert images[0].shape[-1] == bridge.core.get_image_width() // 4
+
+
+def test_closing_timelapse_stops_the_acquisition(make_bridge):
+    bridge = make_bridge(realtime=True)
+
+    images = bridge.acquire_timelapse(20, 0.1, previews=2)
+    next(images)
+    images.close()
+
+    assert acquisition_threads() == []
+    assert bridge.core.calls["snap_image"] < 20
+    assert bridge.spool.entries() == []
+
+
+def test_focus_is_preset_for_the_target_objective(make_bridge):
+    bridge = make_bridge()
+    bridge.focus_map.record("10x", 1000.0, 0.0, 5.0)
+    bridge.focus_map.record("60x", 1000.0, 0.0, 9.0)
+    assert bridge.current_config("Objective") == "10x"
+
+    bridge.start_move_xy(bridge.retrieve_positions()[1], objective="60x")
+    assert bridge.core.z == 9.0
+
+
+def test_repeated_snaps_are_uploaded_once(make_bridge, mikro):
+    bridge = make_bridge()
+
+    def uploaded(name):
+        return [image for image in mikro.created["representations"] if image.name == name]
+
+    first = bridge.snap_image(name="Dark")
+    assert bridge.snap_image(name="Dark").id == first.id
+    assert len(uploaded("Dark")) == 1
+
+    bridge.dedupe = False
+    assert bridge.snap_image(name="Dark").id != first.id
+    assert len(uploaded("Dark")) == 2
+
+
+def test_reconnecting_drops_the_acquisition_factories(make_bridge):
+    bridge = make_bridge()
+    AbstractAquisition.factories[(4827, id(object()))] = "factory of a closed core"
+
+    bridge.start(core=bridge.core, studio=bridge.studio, lang=bridge.lang, runtime=bridge.runtime)
+    assert AbstractAquisition.factories == {}
+
+
+def test_stage_moves_back_after_multi(make_bridge):
+    bridge = make_bridge()
+    positions = bridge.retrieve_positions()
+
+    bridge.move_to_position_xy(positions[0])
+    list(bridge.acquire_multi(positions, bridge.retrieve_channels()[:1]))
+    assert bridge.core.xy != (positions[0].x, positions[0].y)
+
+    bridge.move_to_position_xy(positions[0])
+    assert bridge.core.xy == (positions[0].x, positions[0].y)
+
+
+def test_z_sequence_matches_the_software_fallback(make_bridge):
+    z_sequence = 5.0 + np.linspace(-1, 1, 5)
+    stacks = {}
+    for z_sequencing in (True, False):
+        bridge = make_bridge(z_sequencing=z_sequencing)
+        bridge.core.z = 5.0
+        planes = []
+
+        def capture(image, metadata):
+            planes.append((metadata["Axes"]["z"], metadata["ZPositionUm"], image.copy()))
+            return image, metadata
+
+        assert bridge.can_sequence_z("ZDrive", len(z_sequence)) == z_sequencing
+        if z_sequencing:
+            bridge.acquire_z_sequence("ZDrive", z_sequence, capture)
+            assert bridge.core.z == 5.0
+        else:
+            bridge.run_events([{"axes": {"subset": 0, "z": index}, "z": z} for index, z in enumerate(z_sequence)], capture)
+        stacks[z_sequencing] = planes
+
+    assert [plane[:2] for plane in stacks[True]] == [plane[:2] for plane in stacks[False]]
+    assert all((sequenced[2] == fallback[2]).all() for sequenced, fallback in zip(stacks[True], stacks[False]))
+
+
+def test_acquire_3d_runs_the_z_sequence_in_hardware(make_bridge):
+    images = {}
+    for z_sequencing in (True, False):
+        bridge = make_bridge(z_sequencing=z_sequencing)
+        bridge.core.z = 5.0
+        images[z_sequencing] = bridge.acquire_3d(None, None, None, z_steps=5, z_step=0.5)
+
+        assert bridge.core.calls.get("start_sequence_acquisition", 0) == int(z_sequencing)
+        assert bridge.core.z == 5.0
+
+    assert images[True].shape == images[False].shape
+
+
+
+def lose_focus_on(bridge, monkeypatch, call):
+    calls = []
+
+    def ensure_focus():
+        calls.append(None)
+        if len(calls) == call:
+            raise FocusLockTimeout("lost")
+
+    monkeypatch.setattr(bridge, "ensure_focus", ensure_focus)
+    return calls
+
+
+def test_stack_without_focus_leaves_no_spool_entry(make_bridge, monkeypatch):
+    bridge = make_bridge()
+
+    # the first wait is for the environment, the second before the stack
+    lose_focus_on(bridge, monkeypatch, 2)
+    with pytest.raises(FocusLockTimeout):
+        bridge.submit_3d(None, None, None, z_steps=3)
+
+    assert bridge.spool.entries() == []
+    assert bridge.spool.incomplete() == []
+
+
+def test_focus_lost_after_the_stack_keeps_the_upload(make_bridge, monkeypatch):
+    bridge = make_bridge()
+
+    calls = lose_focus_on(bridge, monkeypatch, 3)
+    image = bridge.submit_3d(None, None, None, z_steps=3).result()
+
+    assert image.shape[2] == 3
+    assert len(calls) == 3
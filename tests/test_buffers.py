@@ -0,0 +1,31 @@
+import numpy as np
+from mikro_manager.buffers import Frame, FramePool
+
+
+def test_frames_reuse_preallocated_buffers():
+    pool = FramePool(depth=2)
+    pool.allocate(4, 5, np.uint16)
+    assert pool.nbytes == 2 * 4 * 5 * 2
+
+    pixels = np.arange(20, dtype=np.uint16)
+    with pool.copy_in(pixels, 4, 5) as frame:
+        first = frame
+        assert frame[1, 0] == 5
+
+    with pool.copy_in(pixels, 4, 5) as frame:
+        assert frame is first
+
+    assert pool.nbytes == 2 * 4 * 5 * 2
+
+
+def test_frame_fetches_tags_lazily():
+    fetched = []
+    pixels = np.arange(12, dtype=np.uint16)
+    frame = Frame(pixels.reshape(3, 4), fetch_tags=lambda: fetched.append(True) or {"Exposure": 10})
+
+    assert (frame.height, frame.width) == (3, 4)
+    assert np.shares_memory(frame.pixels, pixels)
+    assert not fetched
+    assert frame.tags["Exposure"] == 10
+    assert frame.tags["Exposure"] == 10
+    assert len(fetched) == 1
@@ -0,0 +1,75 @@
+import threading
+import time
+
+from mikro_manager.cache import FragmentCache
+
+
+def test_least_recently_used_keys_are_evicted():
+    cache = FragmentCache(maxsize=2)
+    cache.put("10x", "objective 10x")
+    cache.put("60x", "objective 60x")
+
+    # using 10x makes 60x the least recently used key
+    assert cache.get_or_create("10x", lambda: "created") == "objective 10x"
+    cache.put("100x", "objective 100x")
+
+    assert "60x" not in cache
+    assert "10x" in cache and "100x" in cache
+    assert len(cache) == 2
+
+
+def test_evicted_keys_are_created_again():
+    cache = FragmentCache()
+    created = []
+
+    def create():
+        created.append(True)
+        return f"channel {len(created)}"
+
+    assert cache.get_or_create("GFP", create) == "channel 1"
+    cache.evict("GFP")
+    assert cache.get_or_create("GFP", create) == "channel 2"
+
+    cache.put("DAPI", "channel DAPI")
+    cache.evict()
+    assert len(cache) == 0 and "DAPI" not in cache
+
+
+def test_concurrent_requests_create_a_key_once():
+    cache = FragmentCache()
+    created = []
+    start = threading.Barrier(8)
+    results = []
+
+    def create():
+        created.append(True)
+        time.sleep(0.05)
+        return object()
+
+    def request():
+        start.wait()
+        results.append(cache.get_or_create(("stage", 0.0, 0.0, 0.0), create))
+
+    threads = [threading.Thread(target=request) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(created) == 1
+    assert len(results) == 8 and all(result is results[0] for result in results)
+
+
+def test_failed_creations_are_retried():
+    cache = FragmentCache()
+
+    def fail():
+        raise ConnectionError("server unreachable")
+
+    try:
+        cache.get_or_create("GFP", fail)
+    except ConnectionError:
+        pass
+
+    assert "GFP" not in cache
+    assert cache.get_or_create("GFP", lambda: "channel GFP") == "channel GFP"
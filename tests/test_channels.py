@@ -0,0 +1,23 @@
+from mikro_manager.channels import ChannelAxis, Interleave, channel_events
+
+
+def test_events_interleave_channels_per_plane_or_per_stack():
+    plane = channel_events(["DAPI", "GFP"], [0.0, 1.0], "Channel", Interleave.PLANE, x=5.0)
+    assert [(e["channel"]["config"], e["axes"]["z"]) for e in plane] == [("DAPI", 0), ("GFP", 0), ("DAPI", 1), ("GFP", 1)]
+    assert plane[0]["x"] == 5.0 and plane[2]["z"] == 1.0
+
+    stack = channel_events(["DAPI", "GFP"], [0.0, 1.0], "Channel", Interleave.STACK, axes={"position": 3})
+    assert [(e["channel"]["config"], e["axes"]["z"]) for e in stack] == [("DAPI", 0), ("DAPI", 1), ("GFP", 0), ("GFP", 1)]
+    assert stack[0]["axes"]["position"] == 3
+
+
+def test_cameras_are_neighbours_on_the_channel_axis():
+    axis = ChannelAxis(["DAPI", "GFP"], ["Left", "Right"])
+    assert len(axis) == 4
+    assert axis.index({"Axes": {"channel": "GFP"}, "Camera": "Left"}) == 2
+    assert axis.index({"Axes": {"channel": "GFP", "camera": 1}}) == 3
+    assert axis.names() == ["DAPI (Left)", "DAPI (Right)", "GFP (Left)", "GFP (Right)"]
+
+    # a single camera is not an axis
+    axis = ChannelAxis(["DAPI"], ["Camera"])
+    assert len(axis) == 1 and axis.index({"Axes": {"channel": "DAPI"}, "Camera": "Camera"}) == 0
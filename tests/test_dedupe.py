@@ -0,0 +1,29 @@
+import numpy as np
+from mikro_manager.dedupe import UploadIndex, content_digest, plane_digest, upload_key
+
+
+def test_keys_ignore_the_acquisition_time():
+    planes = [plane_digest(np.full((4, 5), index, dtype=np.uint16)) for index in range(2)]
+    digest = content_digest(planes, (2, 4, 5), np.uint16)
+    assert digest != content_digest(planes[::-1], (2, 4, 5), np.uint16)
+
+    upload = {"name": "Dark", "shape": [2, 4, 5], "omero": {"positions": ["1"], "acquisitionDate": "2023-01-01T10:00:00"}}
+    again = {**upload, "omero": {**upload["omero"], "acquisitionDate": "2023-01-01T11:00:00"}}
+    elsewhere = {**upload, "omero": {**upload["omero"], "positions": ["2"]}}
+
+    assert upload_key(digest, upload) == upload_key(digest, again)
+    assert upload_key(digest, upload) != upload_key(digest, elsewhere)
+
+
+def test_index_survives_restarts_and_cut_off_lines(tmp_path):
+    path = str(tmp_path / "uploads.jsonl")
+    index = UploadIndex(path)
+    index.record("a", "1")
+    index.record("b", "2")
+    index.forget("b")
+    with open(path, "a") as f:
+        f.write('{"key": "c", "id"')  # cut off by a crash
+
+    index = UploadIndex(path)
+    assert index.get("a") == "1"
+    assert index.get("b") is None and index.get("c") is None
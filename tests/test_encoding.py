@@ -0,0 +1,31 @@
+import dask
+import dask.array as da
+import numpy as np
+import xarray as xr
+from mikro_manager.encoding import Codec, Encoder
+
+
+def test_encoding_attaches_the_compressor():
+    data = xr.DataArray(np.zeros((2, 8, 8), dtype=np.uint16), dims=["z", "y", "x"])
+
+    encoded = Encoder(codec=Codec.ZSTD, bitshuffle=True).encode(data)
+    assert encoded.encoding["compressor"].cname == "zstd"
+    assert "compressor" not in data.encoding
+    assert Encoder(codec="none").encode(data).encoding["compressor"] is None
+
+
+def test_previews_are_downsampled():
+    data = xr.DataArray(np.ones((1, 8, 6), dtype=np.uint16), dims=["z", "y", "x"])
+
+    previews = Encoder(preview_factors=(2, 4, 8)).previews(data)
+    assert [(factor, preview.shape) for factor, preview in previews] == [(2, (1, 4, 3)), (4, (1, 2, 1))]
+    assert previews[0][1].dtype == np.uint16
+
+
+def test_previews_leave_the_dask_config_alone():
+    data = xr.DataArray(da.ones((2, 8, 8), chunks=(1, 8, 8), dtype=np.uint16), dims=["z", "y", "x"])
+
+    previews = Encoder(workers=2).previews(data)
+    assert isinstance(previews[0][1].data, np.ndarray)
+    assert dask.config.get("scheduler", None) is None
+    assert dask.config.get("num_workers", None) is None
@@ -0,0 +1,73 @@
+import asyncio
+import os
+from types import SimpleNamespace
+
+from mikro_manager import export
+from mikro_manager.export import ExportJob, ExportManifest
+
+
+def test_manifest_resumes_only_intact_exports(tmp_path):
+    directory = str(tmp_path)
+    job = ExportJob(kind="store", id="1", source="zarr/1.zarr", target="stage/image_1.zarr")
+    os.makedirs(os.path.join(directory, job.target, "data"))
+    with open(os.path.join(directory, job.target, "data", "0.0"), "wb") as f:
+        f.write(b"x" * 10)
+
+    ExportManifest(directory).record(job, files=1, size=10)
+    with open(os.path.join(directory, "manifest.jsonl"), "a") as f:
+        f.write('{"kind": "store", "id"')  # cut off by a crash
+
+    manifest = ExportManifest(directory)
+    assert manifest.done(job, directory)
+
+    with open(os.path.join(directory, job.target, "data", "0.0"), "wb") as f:
+        f.write(b"x" * 5)
+    assert not manifest.done(job, directory)
+
+
+def fake_positions(monkeypatch, positions, requests):
+    async def aget_export_position_ids(id):
+        return [SimpleNamespace(id=position.id) for position in positions]
+
+    async def aget_export_positions(ids):
+        requests.append(ids)
+        # unordered, like the server
+        return [position for position in reversed(positions) if position.id in ids]
+
+    monkeypatch.setattr(export, "aget_export_position_ids", aget_export_position_ids)
+    monkeypatch.setattr(export, "aget_export_positions", aget_export_positions)
+
+
+def iter_positions(page_size):
+    async def collect():
+        return [
+            position async for position in export.aiter_export_positions("1", page_size=page_size)
+        ]
+
+    return asyncio.run(collect())
+
+
+def test_positions_are_fetched_page_by_page(monkeypatch):
+    positions = [SimpleNamespace(id=str(i), name=f"Position {i}") for i in (7, 10, 0, 3, 1, 2, 4)]
+    requests = []
+    fake_positions(monkeypatch, positions, requests)
+
+    assert [position.id for position in iter_positions(3)] == ["0", "1", "2", "3", "4", "7", "10"]
+    assert requests == [["0", "1", "2"], ["3", "4", "7"], ["10"]]
+
+
+def test_positions_changed_while_paging_are_yielded_once(monkeypatch):
+    positions = [SimpleNamespace(id=str(i), name=f"Position {i}") for i in range(6)]
+    requests = []
+    fake_positions(monkeypatch, positions, requests)
+
+    async def collect():
+        seen = []
+        async for position in export.aiter_export_positions("1", page_size=2):
+            seen.append(position.id)
+            if len(seen) == 1:
+                positions.insert(0, SimpleNamespace(id="6", name="Position 6"))
+                positions.remove(positions[-1])
+        return seen
+
+    assert asyncio.run(collect()) == ["0", "1", "2", "3", "4"]
@@ -0,0 +1,46 @@
+import time
+
+import pytest
+
+from mikro_manager.focus import FocusLock, FocusLockTimeout
+
+
+def lock_after(seconds: float):
+    start = time.perf_counter()
+    return lambda: time.perf_counter() - start >= seconds
+
+
+def test_lock_skipped_while_stable():
+    engaged = []
+    focus = FocusLock(timeout=1.0)
+
+    assert focus.ensure(lambda: engaged.append(True), lock_after(0.02), objective="10x") > 0
+    assert focus.ensure(lambda: engaged.append(True), lambda: True, objective="10x") == 0
+    assert len(engaged) == 1
+    assert focus.timings.summary()["lock:10x"].count == 1
+
+    focus.disturb()
+    focus.ensure(lambda: engaged.append(True), lock_after(0.01), objective="10x")
+    assert focus.timings.summary()["lock:10x"].count == 2
+
+
+def test_lost_lock_times_out():
+    focus = FocusLock(timeout=0.05)
+
+    with pytest.raises(FocusLockTimeout):
+        focus.ensure(lambda: None, lambda: False)
+
+    assert not focus.stable
+
+
+def test_lost_lock_is_engaged_again():
+    engaged = []
+    focus = FocusLock(timeout=0.05)
+
+    with pytest.raises(FocusLockTimeout):
+        focus.ensure(lambda: engaged.append(True), lambda: False)
+    assert not focus.maintaining
+
+    focus.ensure(lambda: engaged.append(True), lambda: True)
+    assert len(engaged) == 2
+    assert focus.maintaining and focus.stable
@@ -0,0 +1,29 @@
+import pytest
+from mikro_manager.focusmap import FocusMap
+
+
+def test_surface_follows_a_tilted_plate():
+    focus_map = FocusMap(merge_distance=10)
+    assert focus_map.predict("10x", 0, 0) is None
+
+    for x, y in [(0, 0), (1000, 0), (0, 1000), (1000, 1000)]:
+        focus_map.record("10x", x, y, 0.002 * x - 0.001 * y + 5)
+
+    assert focus_map.predict("10x", 500, 500) == pytest.approx(5.5)
+    assert focus_map.predict("10x", 2000, 0) == pytest.approx(9)
+    assert focus_map.tilt("10x") == pytest.approx((0.002, -0.001))
+    assert focus_map.predict("60x", 0, 0) is None
+
+
+def test_nearby_points_and_new_offsets_replace_old_points():
+    focus_map = FocusMap(merge_distance=10)
+    focus_map.record("10x", 0, 0, 1.0, offset=100)
+    focus_map.record("10x", 5, 0, 2.0, offset=100)
+    assert [point.z for point in focus_map.points("10x")] == [2.0]
+    assert focus_map.predict("10x", 500, 500) == pytest.approx(2.0)
+
+    focus_map.record("10x", 500, 500, 3.0, offset=120)
+    assert [point.z for point in focus_map.points("10x")] == [3.0]
+
+    focus_map.clear("10x")
+    assert focus_map.points("10x") == []
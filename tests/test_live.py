@@ -0,0 +1,56 @@
+import threading
+
+import numpy as np
+from mikro_manager.live import LiveStream, bin_frame
+
+
+class Camera:
+    """Produces three frames per poll"""
+
+    def __init__(self) -> None:
+        self.produced = 0
+        self.consumed = 0
+        self.running = False
+
+    def start_continuous_sequence_acquisition(self, interval_ms: float) -> None:
+        self.running = True
+
+    def stop_sequence_acquisition(self) -> None:
+        self.running = False
+
+    def is_sequence_running(self) -> bool:
+        return self.running
+
+    def get_remaining_image_count(self) -> int:
+        self.produced += 3
+        return self.produced - self.consumed
+
+    def get_last_image(self) -> np.ndarray:
+        return np.full(12, self.produced, dtype=np.uint16)
+
+    def clear_circular_buffer(self) -> None:
+        self.consumed = self.produced
+
+
+def test_stream_keeps_the_newest_frames():
+    camera = Camera()
+    stream = LiveStream(camera, lambda: (3, 4), depth=2, poll_interval=0)
+    stop = threading.Event()
+    thread = threading.Thread(target=stream.run, args=(stop,))
+    thread.start()
+
+    frame = stream.wait(after=10, timeout=5)
+    stop.set()
+    thread.join()
+
+    assert frame is not None and frame.index > 10
+    assert frame.pixels.shape == (3, 4)
+    assert len(stream.frames) == 2
+    assert stream.skipped == 2 * stream.received // 3
+    assert not camera.running
+
+
+def test_binning_averages_blocks():
+    pixels = np.arange(16, dtype=np.uint16).reshape(4, 4)
+    assert bin_frame(pixels, 2).tolist() == [[2, 4], [10, 12]]
+    assert bin_frame(pixels, 3).shape == (1, 1)
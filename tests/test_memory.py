@@ -0,0 +1,23 @@
+from mikro_manager.memory import MemoryGuard
+from mikro_manager.testing.simulated import SimulatedRuntime
+
+MB = 1024 * 1024
+
+
+def test_java_is_only_collected_above_the_threshold():
+    collected = []
+    guard = MemoryGuard(java_threshold=0.5, python_threshold_mb=1e9)
+
+    usage = guard.collect(SimulatedRuntime(used=100 * MB, max=1000 * MB), lambda: collected.append(True))
+    assert usage.java_used_mb == 100 and usage.java_max_mb == 1000
+    assert not collected
+
+    guard.collect(SimulatedRuntime(used=600 * MB, max=1000 * MB), lambda: collected.append(True))
+    assert collected and guard.java_collections == 1
+    assert guard.python_collections == 0
+
+
+def test_unknown_heap_is_always_collected():
+    collected = []
+    MemoryGuard().collect(None, lambda: collected.append(True))
+    assert collected
@@ -0,0 +1,45 @@
+import numpy as np
+from mikro_manager.mosaic import PyramidStore, tile_grid
+
+
+def test_tiles_cover_the_region_in_serpentine_order():
+    grid = tile_grid(1000, 600, tile_height=100, tile_width=200, pixel_size=1.0, center=(0, 0), overlap=0.1)
+
+    assert grid.height >= 600 and grid.width >= 1000
+    assert [tile.column for tile in grid.tiles[: grid.columns + 1]] == [*range(grid.columns), grid.columns - 1]
+    assert np.isclose(np.mean([tile.x for tile in grid.tiles]), 0)
+    assert np.isclose(np.mean([tile.y for tile in grid.tiles]), 0)
+
+
+def test_pyramid_is_stitched_tile_by_tile():
+    store = PyramidStore(300, 500, np.uint16, chunks=128, min_size=64)
+    store.write(0, 0, np.full((300, 250), 2, dtype=np.uint16))
+
+    preview = store.preview(size=128)
+    assert max(preview.shape) <= 128
+    assert preview[0, 0] == 2 and preview[0, -1] == 0
+
+    store.write(0, 250, np.full((300, 250), 2, dtype=np.uint16))
+    assert (store.to_dask(len(store.levels) - 1).compute() == 2).all()
+    store.close()
+
+
+def test_stage_moves_back_after_a_mosaic(monkeypatch, tmp_path):
+    from mikro_manager.spool import Spool
+    from mikro_manager.testing.fakemikro import FakeMikro
+    from mikro_manager.testing.simulated import simulated_bridge
+
+    FakeMikro().install(monkeypatch)
+    bridge = simulated_bridge(positions=[(0.0, 0.0, 0.0)], width=64, height=64, realtime=False)
+    bridge.spool = Spool(str(tmp_path))
+    bridge.on_provide()
+    [position] = bridge.retrieve_positions()
+
+    bridge.move_to_position_xy(position)
+    side = 3 * bridge.core.get_image_width() * bridge.pixel_size_um()
+    list(bridge.acquire_mosaic(side, side, overlap=0.1))
+    assert bridge.core.xy != (0.0, 0.0)
+
+    bridge.move_to_position_xy(position)
+    assert bridge.core.xy == (0.0, 0.0)
+    bridge.uploads.stop()
@@ -0,0 +1,28 @@
+from mikro_manager.moves import DeviceWaits
+
+
+def test_only_the_needed_devices_are_waited_for():
+    waited = []
+
+    def wait_for(device):
+        return lambda: waited.append(device)
+
+    devices = DeviceWaits()
+    for device in ("XYStage", "config:Channel"):
+        devices.started(device, wait_for(device))
+
+    devices.settle("XYStage", "ZDrive")
+    assert waited == ["XYStage"] and devices.pending == ["config:Channel"]
+
+    # a device is only waited for once per command
+    devices.settle("XYStage")
+    assert waited == ["XYStage"]
+
+    devices.settle()
+    assert waited == ["XYStage", "config:Channel"] and devices.pending == []
+    assert devices.timings.summary()["settle:XYStage"].count == 1
+
+    devices.started("XYStage", wait_for("XYStage"))
+    devices.clear()
+    devices.settle()
+    assert waited == ["XYStage", "config:Channel"]
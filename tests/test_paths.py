@@ -0,0 +1,24 @@
+import numpy as np
+from mikro_manager.paths import nearest_neighbour_order, plan_path, serpentine_order, travel_distance
+
+
+def test_serpentine_reverses_every_other_row():
+    points = np.array([[x, y] for y in [0, 10] for x in [0, 10, 20]], dtype=float)
+    assert serpentine_order(points) == [0, 1, 2, 5, 4, 3]
+
+
+def test_nearest_neighbour_starts_at_stage():
+    points = np.array([[0, 0], [100, 0], [10, 0]], dtype=float)
+    order = nearest_neighbour_order(points, start=(0, 0))
+    assert order == [0, 2, 1]
+    assert travel_distance(points, order) == 100
+
+
+def test_plan_path_never_gets_longer():
+    rng = np.random.default_rng(42)
+    points = rng.random((50, 2)) * 10000
+    plan = plan_path(points, start=(0, 0), time_budget=0.5)
+
+    assert sorted(plan.order) == list(range(50))
+    assert plan.distance_after <= plan.distance_before
+    assert plan.time_after <= plan.time_before
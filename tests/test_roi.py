@@ -0,0 +1,95 @@
+from types import SimpleNamespace
+
+import numpy as np
+
+from mikro_manager.roi import Crop, RoiManager, centered_crop
+
+
+class Camera:
+    """A 2000 x 1000 sensor"""
+
+    def __init__(self) -> None:
+        self.roi = (0, 0, 2000, 1000)
+        self.calls = {"set_roi": 0, "clear_roi": 0}
+
+    def set_roi(self, x: int, y: int, width: int, height: int) -> None:
+        self.calls["set_roi"] += 1
+        self.roi = (x, y, width, height)
+
+    def clear_roi(self) -> None:
+        self.calls["clear_roi"] += 1
+        self.roi = (0, 0, 2000, 1000)
+
+    def get_roi(self):
+        x, y, width, height = self.roi
+        return SimpleNamespace(get_x=lambda: x, get_y=lambda: y, get_width=lambda: width, get_height=lambda: height)
+
+    def get_image_width(self) -> int:
+        return self.roi[2]
+
+    def get_image_height(self) -> int:
+        return self.roi[3]
+
+
+def test_crop_uses_real_sensor_dimensions():
+    crop = centered_crop(1000, 2000, 0.5, physical_height=100, physical_width=300)
+    assert crop == Crop(x=700, y=400, width=600, height=200)
+
+    # a side that is not given spans the sensor
+    assert centered_crop(1000, 2000, 0.5, physical_width=300) == Crop(x=700, y=0, width=600, height=1000)
+    assert centered_crop(1000, 2000, 0.5) is None
+
+
+def test_crop_follows_a_rotated_affine():
+    # camera rotated by 90 degrees: stage x runs along the image rows
+    crop = centered_crop(1000, 2000, 0.5, affine=[0, 0.5, 0, 0.5, 0, 0], physical_height=100, physical_width=300)
+    assert (crop.width, crop.height) == (200, 600)
+
+
+def test_one_sided_crop_with_a_slightly_rotated_affine():
+    angle = np.deg2rad(0.5)
+    affine = [0.5 * np.cos(angle), -0.5 * np.sin(angle), 0, 0.5 * np.sin(angle), 0.5 * np.cos(angle), 0]
+
+    crop = centered_crop(1000, 2000, 0.5, affine=affine, physical_width=300)
+    assert crop.height == 1000
+    assert 600 <= crop.width < 620
+
+
+def test_roi_is_only_reconfigured_on_changes():
+    core = Camera()
+    core.set_roi(0, 0, 100, 100)  # set by the user in micro manager
+    changes = []
+    rois = RoiManager(on_change=lambda: changes.append(core.roi))
+    rois.attach(core)
+
+    assert not rois.apply(None)
+    assert core.roi == (0, 0, 100, 100)
+
+    crop = rois.crop(0.5, physical_height=100, physical_width=100)
+    assert rois.apply(crop)
+    assert not rois.apply(rois.crop(0.5, physical_height=100, physical_width=100))
+    assert core.roi == (900, 400, 200, 200)
+
+    # the roi of the user is restored
+    assert rois.apply(None)
+    assert core.roi == (0, 0, 100, 100)
+    assert not rois.apply(None)
+    assert core.calls["set_roi"] == 3 and core.calls["clear_roi"] == 1
+    assert len(changes) == 3
+
+
+def test_roi_of_the_user_is_restored_after_reading_the_sensor():
+    core = Camera()
+    core.set_roi(10, 10, 100, 100)
+    rois = RoiManager()
+    rois.attach(core)
+
+    assert rois.sensor_shape() == (1000, 2000)
+    assert rois.apply(None)
+    assert core.roi == (10, 10, 100, 100)
+
+    # without a roi of the user, reading the sensor leaves the camera as it is
+    core.clear_roi()
+    rois.attach(core)
+    rois.sensor_shape()
+    assert not rois.apply(None)
@@ -0,0 +1,52 @@
+import os
+import time
+
+import numpy as np
+from mikro_manager.spool import Spool
+from mikro_manager.stream import PlaneStream
+
+
+def test_committed_entries_survive_a_restart(tmp_path):
+    spool = Spool(str(tmp_path))
+    entry = spool.create()
+    stream = PlaneStream(depth=2, store=entry.store)
+    for index in range(2):
+        stream.write(index, np.full((4, 5), index, dtype=np.uint16))
+
+    interrupted = spool.create()
+    PlaneStream(depth=2, store=interrupted.store).write(0, np.zeros((4, 5), dtype=np.uint16))
+
+    # entries that are still being acquired are neither pending nor incomplete
+    assert spool.pending() == [] and spool.incomplete() == []
+    entry.commit({"name": "Stack", "shape": [2, 1, 4, 5]})
+
+    restarted = Spool(str(tmp_path))
+    [pending] = restarted.pending()
+    assert [e.id for e in restarted.incomplete()] == [interrupted.id]
+    assert pending.upload()["name"] == "Stack"
+    assert (pending.open().compute()[:, 0, 0] == [0, 1]).all()
+
+    assert restarted.claim(pending) and not restarted.claim(pending)
+    pending.remove()
+    restarted.release(pending)
+    assert restarted.pending() == []
+
+
+def test_interrupted_entries_are_discarded(tmp_path):
+    spool = Spool(str(tmp_path))
+    old, recent, committed = spool.create(), spool.create(), spool.create()
+    for entry in (old, recent, committed):
+        PlaneStream(depth=2, store=entry.store).write(0, np.zeros((4, 5), dtype=np.uint16))
+        spool.release(entry)
+    committed.commit({"name": "Stack", "shape": [2, 1, 4, 5]})
+
+    week_ago = time.time() - 7 * 24 * 3600
+    os.utime(old.store_path, (week_ago, week_ago))
+
+    assert [entry.id for entry in spool.discard_incomplete(max_age=24 * 3600)] == [old.id]
+    assert not os.path.exists(old.store_path)
+    assert [entry.id for entry in spool.incomplete()] == [recent.id]
+
+    spool.discard_incomplete()
+    assert spool.incomplete() == []
+    assert [entry.id for entry in spool.pending()] == [committed.id]
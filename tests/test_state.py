@@ -0,0 +1,53 @@
+import time
+
+from mikro_manager.state import HardwareState
+
+
+def test_values_are_read_once_until_they_expire():
+    reads = []
+
+    def read():
+        reads.append(True)
+        return len(reads)
+
+    state = HardwareState(ttl=60)
+    assert state.get("xy", read) == 1
+    assert state.get("xy", read) == 1
+    assert len(reads) == 1
+
+    expiring = HardwareState(ttl=0.01)
+    assert expiring.get("xy", read) == 2
+    time.sleep(0.02)
+    assert expiring.get("xy", read) == 3
+
+
+def test_peek_never_reads_from_the_core():
+    state = HardwareState(ttl=60)
+    assert state.peek("z") is None
+
+    state.set("z", 1.5)
+    assert state.peek("z") == 1.5
+    assert state.get("z", lambda: 2.0) == 1.5
+
+    expiring = HardwareState(ttl=0.01)
+    expiring.set("z", 1.5)
+    time.sleep(0.02)
+    assert expiring.peek("z") is None
+
+
+def test_invalidated_values_are_read_again():
+    state = HardwareState(ttl=60)
+    for key in ("xy", "z", "camera"):
+        state.set(key, key)
+
+    state.invalidate("xy", "z")
+    assert state.peek("xy") is None and state.peek("z") is None
+    assert state.peek("camera") == "camera"
+    assert state.get("z", lambda: 3.0) == 3.0
+
+    state.invalidate()
+    assert state.peek("camera") is None and state.peek("z") is None
+
+    disabled = HardwareState(ttl=0)
+    disabled.set("xy", (0, 0))
+    assert disabled.peek("xy") is None
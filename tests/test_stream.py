@@ -0,0 +1,28 @@
+import numpy as np
+from mikro_manager.stream import PlaneStream
+
+
+def test_planes_are_chunked_per_plane():
+    stream = PlaneStream(depth=3)
+    for index in [2, 0, 1]:
+        stream.write(index, np.full((4, 5), index, dtype=np.uint16))
+
+    assert stream.complete
+    data = stream.to_dask()
+    assert data.shape == (3, 4, 5)
+    assert data.chunks == ((1, 1, 1), (4,), (5,))
+    assert (data.compute()[:, 0, 0] == [0, 1, 2]).all()
+    stream.close()
+
+
+def test_digest_covers_the_content_of_the_stack():
+    digests = []
+    for value in [1, 1, 2]:
+        stream = PlaneStream(depth=2, digest=True)
+        stream.write(0, np.full((4, 5), value, dtype=np.uint16))
+        assert stream.content_digest() is None
+        stream.write(1, np.zeros((4, 5), dtype=np.uint16))
+        digests.append(stream.content_digest())
+        stream.close()
+
+    assert digests[0] == digests[1] != digests[2]
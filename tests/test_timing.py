@@ -0,0 +1,38 @@
+import pytest
+
+from mikro_manager.timing import BUCKETS_MS, PhaseTimings
+
+
+def test_phases_are_summarized_with_histograms():
+    timings = PhaseTimings(window=2)
+    for seconds in (0.0005, 0.003, 0.004, 20.0):
+        timings.record("snap", seconds)
+
+    snap = timings.summary()["snap"]
+    assert snap.count == 4 and snap.max_ms == pytest.approx(20000)
+    assert snap.total_ms == pytest.approx(20007.5)
+    assert snap.p50_ms == pytest.approx(10002)  # of the recent window
+    assert len(snap.histogram) == len(BUCKETS_MS) + 1
+    assert snap.histogram[0] == 1 and snap.histogram[2] == 2 and snap.histogram[-1] == 1
+
+    assert "<=1" not in timings.report()
+    report = timings.report(histograms=True).splitlines()
+    assert ">10000" in report[3]
+    assert report[4].split() == ["snap", "1", "0", "2", *["0"] * 10, "1"]
+
+    timings.reset()
+    assert timings.summary() == {}
+
+
+def test_planes_are_split_into_exposure_and_readout():
+    timings = PhaseTimings()
+    tick = timings.ticker("plane")
+    tick(0.0)
+    tick(1e9)  # the exposure can not be longer than the interval
+    tick()
+
+    summary = timings.summary()
+    assert summary["plane"].count == 3
+    assert summary["plane:exposure"].count == summary["plane:readout"].count == 2
+    assert summary["plane:exposure"].max_ms <= summary["plane"].max_ms
+    assert summary["plane:readout"].max_ms <= summary["plane"].max_ms
@@ -0,0 +1,77 @@
+import threading
+
+import pytest
+
+from mikro_manager.upload import UploadQueue
+
+
+@pytest.fixture
+def uploads():
+    uploads = UploadQueue(workers=1, maxsize=1, backoff=0)
+    yield uploads
+    uploads.stop()
+
+
+def test_full_queue_blocks_the_acquisition(uploads):
+    started, release = threading.Event(), threading.Event()
+
+    def slow():
+        started.set()
+        release.wait()
+        return "slow"
+
+    running = uploads.submit(slow)
+    assert started.wait(5)
+    queued = uploads.submit(lambda: "queued")
+
+    submitted = threading.Event()
+    threading.Thread(target=lambda: (uploads.submit(lambda: "blocked"), submitted.set()), daemon=True).start()
+    assert not submitted.wait(0.2)
+    assert uploads.pending == 2
+
+    release.set()
+    assert submitted.wait(5)
+    assert running.result(5) == "slow" and queued.result(5) == "queued"
+
+
+def test_only_network_errors_are_retried(uploads):
+    attempts = []
+
+    def flaky():
+        attempts.append(True)
+        if len(attempts) < 3:
+            raise ConnectionResetError("dropped")
+        return "uploaded"
+
+    assert uploads.submit(flaky).result(5) == "uploaded"
+    assert len(attempts) == 3
+
+    attempts.clear()
+
+    def removed():
+        attempts.append(True)
+        raise FileNotFoundError("entry was removed")
+
+    with pytest.raises(FileNotFoundError):
+        uploads.submit(removed).result(5)
+    assert len(attempts) == 1
+
+
+def test_buffers_are_released_after_every_upload(uploads):
+    released = []
+    release = threading.Event()
+
+    done = uploads.submit(lambda: release.wait(5), on_done=lambda: released.append("done"))
+    cancelled = uploads.submit(lambda: "never", on_done=lambda: released.append("cancelled"))
+    assert cancelled.cancel()
+    release.set()
+
+    assert done.result(5)
+    uploads.stop()
+    assert released == ["done", "cancelled"]
+
+    failing = UploadQueue(workers=1, retries=0)
+    with pytest.raises(ZeroDivisionError):
+        failing.submit(lambda: 1 / 0, on_done=lambda: released.append("error")).result(5)
+    failing.stop()
+    assert released[-1] == "error"